@@ -34,11 +34,9 @@ and export to a Prometheus Push Gateway
 
 #!/usr/bin/python3
 
-from time import sleep, time, perf_counter
+from time import sleep, perf_counter
 import math
-from prometheus_client import start_http_server, Summary, Histogram, Gauge, Counter, REGISTRY, CollectorRegistry, \
-    pushadd_to_gateway, push_to_gateway, delete_from_gateway
-import threading
+from prometheus_client import Gauge, CollectorRegistry, pushadd_to_gateway, delete_from_gateway
 import os
 import json
 
@@ -53,6 +51,7 @@ PUSHGATEWAY_IP = '172.17.0.1'
 PUSHGATEWAY_PORT = 9091
 PUSHGATEWAY_ADDR = ':'.join([PUSHGATEWAY_IP, str(PUSHGATEWAY_PORT)])
 
+CONFIG_FILE = '/config.txt'
 
 #general settings (ms)
 SAMPLE_PERIOD = int(os.environ['SAMPLE_PERIOD'])
@@ -60,8 +59,12 @@ TOTAL_PERIOD = int(os.environ['TOTAL_PERIOD'])
 
 # define global variables
 registry = CollectorRegistry()
-exported_metric = Gauge('skewness', 'Skewness of docker vnf resource usage',
-                                              ['vnf_id', 'vnf_name', 'vnf_metric'], registry=registry)
+LABELS = ['vnf_id', 'vnf_name', 'vnf_metric']
+exported_metric = Gauge('skewness', 'Skewness of docker vnf resource usage', LABELS, registry=registry)
+exported_kurtosis = Gauge('kurtosis', 'Excess kurtosis of docker vnf resource usage', LABELS, registry=registry)
+exported_mean = Gauge('resource_mean', 'Mean of docker vnf resource usage', LABELS, registry=registry)
+exported_variance = Gauge('resource_variance', 'Variance of docker vnf resource usage', LABELS, registry=registry)
+EXPORTED_METRICS = [exported_metric, exported_kurtosis, exported_mean, exported_variance]
 
 # find the VNFs to monitor
 # {metric_shortId: {VNF_NAME:<>,VNF_ID:<>,VNF_METRIC:<>}}
@@ -80,10 +83,55 @@ def export_metrics(key=None):
     except Exception as e:
         LOG.warning("Pushgateway not reachable: {0}".format(str(e)))
 
+
+class streaming_moments():
+    """
+    Running mean, variance, skewness and kurtosis of a series, updated per sample
+    (one-pass update of the central moments, no samples are kept).
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def add(self, x):
+        n1 = self.n
+        self.n += 1
+        n = self.n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    def variance(self):
+        return self.m2 / self.n
+
+    def skewness(self):
+        # adjusted Fisher-Pearson coefficient, raises ZeroDivisionError for constant or too short series
+        n = self.n
+        g1 = math.sqrt(n) * self.m3 / self.m2**1.5
+        return (math.sqrt(n * (n - 1)) / (n - 2)) * g1
+
+    def kurtosis(self):
+        # excess kurtosis
+        return self.n * self.m4 / (self.m2 * self.m2) - 3.0
+
+
 class skewness_monitor():
+    """
+    One monitored series (docker container and metric).
+    The cgroup file is kept open and read again on every tick of the scheduler.
+    """
     def __init__(self, docker_id, docker_name, metric):
-        # Prometheus metric to export
-        self.prom_skewness = exported_metric
         self.docker_id = docker_id
         self.docker_name = docker_name
         self.vnf_metric = metric
@@ -98,158 +146,147 @@ class skewness_monitor():
 
         self.fp = open(self.proc_file)
 
-        #monitoring thread
-        self.export_thread = None
-        self.monitor_stop = threading.Event()
-
-    # get statistics with certain frequency and export skewness for further analysis
-    def _calc_skewness(self):
-
-        cpu_count0 = 0
-        time0 = 0
-
-        #milliseconds
-        stat_delta = SAMPLE_PERIOD
-        sample_T = TOTAL_PERIOD
-
-        data = []
-        n = 0
-
-        moment1 = 0
-        moment2 = 0
-        moment3 = 0
-
-        fp = self.fp
-
-        #collect samples
-        for n in range(0,round(sample_T/stat_delta)):
-            # first measurement
-            if cpu_count0 <= 0 or time0 <= 0:
-                time0 = perf_counter()
-                cpu_count0 = int(fp.read().strip())
-                fp.seek(0)
-                sleep(stat_delta/1000)
-                continue
-
-
-            #perf_counter in seconds
-            time1 = perf_counter()
-
-            # cpu count in nanoseconds
-            cpu_count1 = int(fp.read().strip())
-            fp.seek(0)
-
-            cpu_delta = cpu_count1 - cpu_count0
-            cpu_count0 = cpu_count1
-
-            time_delta = time1 - time0
-            time0 = time1
-
+        self.moments = streaming_moments()
+        # last counter value and time, for the cpu rate
+        self.count0 = None
+        self.time0 = None
+
+    def _read(self):
+        self.fp.seek(0)
+        return int(self.fp.read().strip())
+
+    def sample(self, now):
+        """
+        Add a new sample to the running moments.
+        cpu: used cpu time per wall clock time (cores), mem: used bytes
+        """
+        count1 = self._read()
+        if self.vnf_metric == 'mem':
+            self.moments.add(float(count1))
+            return
+        if self.count0 is not None and now > self.time0:
             #work in nanoseconds
-            metric = (cpu_delta / (time_delta * 1e9))
-
-            data.append(metric)
-
-            #running calculation of sample moments
-            moment1 += metric
-            temp = metric * metric
-            moment2 += temp
-            moment3 += temp * metric
-
-
-            sleep(stat_delta/1000)
-
-        # calc skewness
-        M1 = (1 / n) * moment1
-        M2 = ((1 / n) * moment2) - M1**2
-        M3 = ((1 / n) * moment3) - (3 * M1 * ((1 / n) * moment2)) + (2 * M1**3)
+            self.moments.add((count1 - self.count0) / ((now - self.time0) * 1e9))
+        self.count0 = count1
+        self.time0 = now
+
+    def export(self):
+        """
+        Set the exported metrics from the moments of the last period and start a new period.
+        """
+        m = self.moments
+        labels = dict(vnf_id=self.docker_id, vnf_name=self.docker_name, vnf_metric=self.vnf_metric)
+        try:
+            values = [m.skewness(), m.kurtosis(), m.mean, m.variance()]
+            LOG.info("docker_name: {0} metric: {1} Nsamples: {2} skewness: {3:.2f}".format(
+                self.docker_name, self.vnf_metric, m.n, values[0]))
+        except (ZeroDivisionError, ValueError) as e:
+            values = [float('nan')] * len(EXPORTED_METRICS)
+            LOG.warning("{1}: Skewness cannot be calculated: {0}".format(str(e), self.docker_name))
+        for gauge, value in zip(EXPORTED_METRICS, values):
+            gauge.labels(**labels).set(value)
+        m.reset()
 
-        s2 = (math.sqrt(n*(n - 1))/(n - 2)) * (M3 / (M2)**1.5)
-
-        LOG.info("docker_name: {0} metric: {1}".format(self.docker_name, self.vnf_metric))
-        LOG.info("Nsamples: {0}".format(n))
-        LOG.info("skewness: {0:.2f}".format(s2))
-        LOG.info("\n")
-
-        return s2
-
-    def _export_skewness_loop(self, stop_event):
-        #loop until flag is set
-        while(not stop_event.is_set()):
-            try:
-                skewness = self._calc_skewness()
-                self.prom_skewness.labels(vnf_id=self.docker_id, vnf_name=self.docker_name, vnf_metric=self.vnf_metric)\
-                    .set(skewness)
-            except ZeroDivisionError as e:
-                self.prom_skewness.labels(vnf_id=self.docker_id, vnf_name=self.docker_name, vnf_metric=self.vnf_metric) \
-                    .set(float('nan'))
-                LOG.warning("{1}: Skewness cannot be calculated: {0}".format(str(e), self.docker_name))
-            except Exception as e:
-                LOG.warning("Skewness cannot be calculated, stop thread: {0}".format(str(e)))
-                self.monitor_stop.set()
-
-        # if while has ended, monitoring thread will stop
-        self.prom_skewness.labels(vnf_id=self.docker_id, vnf_name=self.docker_name, vnf_metric=self.vnf_metric) \
-            .set(float('nan'))
-
-    #start the monitoring thread
-    def start(self):
-            if self.export_thread is not None:
-                LOG.warning('monitor thread is already running for: {0}'.format(self.docker_name))
-                return
-
-            self.export_thread = threading.Thread(target=self._export_skewness_loop, args=(self.monitor_stop,))
-            self.export_thread.start()
-            LOG.info('started thread: {0}'.format(self.docker_name))
-
-    #stop the monitoring thread
     def stop(self):
-        self.monitor_stop.set()
-
-
-if __name__ == '__main__':
-
-    #started_vnfs {vnf_id:object}
-    vnfs_monitored = {}
-
-    # endless loop
-    while True:
-        #check config.txt for docker ids/names
-        configfile = open('/config.txt', 'r')
-        config = json.load(configfile)
-        vnfs_to_monitor = list(get_vnfs_to_monitor(config))
-
-        #for each new docker id in ENV start thread to monitor skewness
-        for vnf_id, vnf_name, vnf_metric in vnfs_to_monitor:
-            key = '_'.join([vnf_metric, vnf_id])
-            if key not in vnfs_monitored:
+        labels = dict(vnf_id=self.docker_id, vnf_name=self.docker_name, vnf_metric=self.vnf_metric)
+        for gauge in EXPORTED_METRICS:
+            gauge.labels(**labels).set(float('nan'))
+        self.fp.close()
+
+
+class skewness_scheduler():
+    """
+    Samples all monitored series in one loop: every SAMPLE_PERIOD all counters are read,
+    every TOTAL_PERIOD the moments are exported and pushed to the gateway.
+    The config file is only reloaded when it has changed.
+    """
+    def __init__(self, config_file=CONFIG_FILE, sample_period=SAMPLE_PERIOD, total_period=TOTAL_PERIOD):
+        self.config_file = config_file
+        # seconds
+        self.sample_period = sample_period / 1000.0
+        self.total_period = total_period / 1000.0
+        #vnfs_monitored {metric_id: skewness_monitor}
+        self.vnfs_monitored = {}
+        self.config_stamp = None
+
+    def _config_changed(self):
+        try:
+            st = os.stat(self.config_file)
+        except OSError:
+            return False
+        stamp = (st.st_mtime, st.st_size, st.st_ino)
+        if stamp == self.config_stamp:
+            return False
+        self.config_stamp = stamp
+        return True
+
+    def reload_config(self):
+        try:
+            with open(self.config_file, 'r') as configfile:
+                config = json.load(configfile)
+        except ValueError:
+            # file is just being written, try again on the next tick
+            self.config_stamp = None
+            return
+        vnfs_to_monitor = dict(('_'.join([vnf_metric, vnf_id]), (vnf_id, vnf_name, vnf_metric))
+                               for vnf_id, vnf_name, vnf_metric in get_vnfs_to_monitor(config))
+
+        #for each new docker id start monitoring
+        for key, (vnf_id, vnf_name, vnf_metric) in vnfs_to_monitor.items():
+            if key not in self.vnfs_monitored:
                 try:
-                    vnfs_monitored[key] = skewness_monitor(vnf_id, vnf_name, vnf_metric)
-                    vnfs_monitored[key].start()
+                    self.vnfs_monitored[key] = skewness_monitor(vnf_id, vnf_name, vnf_metric)
+                    LOG.info('started monitoring: {0} {1}'.format(vnf_name, vnf_metric))
                 except Exception as e:
                     LOG.warning("Monitor cannot be started: {0}".format(str(e)))
 
-         #for each removed docker id ENV, stop export
-        for vnf_key in list(vnfs_monitored):
-            vnf_keys_to_monitor = ['_'.join([vnf_metric, vnf_id]) for vnf_id, vnf_name, vnf_metric in vnfs_to_monitor]
-            if vnf_key not in vnf_keys_to_monitor:
-                vnfs_monitored[vnf_key].stop()
+        #for each removed docker id, stop export
+        removed = [key for key in self.vnfs_monitored if key not in vnfs_to_monitor]
+        for key in removed:
+            self._remove(key)
+        if removed:
+            # (Push Gateway remembers last pushed value, so this is not so useful)
+            delete_from_gateway(PUSHGATEWAY_ADDR, job='sonemu-skewmon')
+        LOG.info('monitored VNFs: {0}'.format([monitor.docker_name for monitor in self.vnfs_monitored.values()]))
+
+    def _remove(self, key):
+        monitor = self.vnfs_monitored.pop(key)
+        LOG.info('stop monitored VNFs: {0}'.format(monitor.docker_name))
+        monitor.stop()
+
+    def tick(self, now):
+        for key, monitor in list(self.vnfs_monitored.items()):
+            try:
+                monitor.sample(now)
+            except Exception as e:
+                # container is gone
+                LOG.warning("Skewness cannot be calculated, stop monitoring {1}: {0}".format(str(e), key))
+                self._remove(key)
 
-                vnf_name = vnfs_monitored[vnf_key].docker_name
-                vnf_metric, vnf_id = vnf_key.split('_')
-                LOG.info('stop monitored VNFs: {0}'.format(vnfs_monitored[vnf_key].docker_name))
-                del vnfs_monitored[vnf_key]
+    def export(self):
+        for monitor in self.vnfs_monitored.values():
+            monitor.export()
+        export_metrics()
 
-                # remove metric with labels from registry
-                # (Push Gateway remembers last pushed value, so this is not so useful)
-                # collector = registry._names_to_collectors['skewness']
-                # if (vnf_id, vnf_name, vnf_metric) in collector._metrics:
-                #     collector.remove(vnf_id, vnf_name, vnf_metric)
-                delete_from_gateway(PUSHGATEWAY_ADDR, job='sonemu-skewmon')
+    def run(self):
+        next_tick = perf_counter()
+        next_export = next_tick + self.total_period
+        while True:
+            if self._config_changed():
+                self.reload_config()
+            now = perf_counter()
+            self.tick(now)
+            if now >= next_export:
+                self.export()
+                next_export += self.total_period
+            # fixed schedule, do not drift by the time spent for sampling
+            next_tick += self.sample_period
+            delay = next_tick - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            else:
+                next_tick = perf_counter()
 
 
-        #push to Prometheus gateway
-        export_metrics()
-        LOG.info('monitored VNFs: {0}'.format([monitor.docker_name for key, monitor in vnfs_monitored.items()]))
-        # wait before checking  again
-        sleep(TOTAL_PERIOD/1000)
\ No newline at end of file
+if __name__ == '__main__':
+    skewness_scheduler().run()
@@ -27,7 +27,6 @@ partner consortium (www.sonata-nfv.eu).
 """
 import json
 import logging
-import copy
 
 from mininet.node import OVSSwitch
 
@@ -36,6 +35,8 @@ from flask import Response, request
 from flask_restful import Api, Resource
 from mininet.link import Link
 import uuid
+from emuvim.api.openstack.wsgi_server import ApiServer
+from emuvim.api.openstack.playbook import get_playbook_writer, PLAYBOOK_FILE
 
 
 class ChainApi(Resource):
@@ -51,7 +52,11 @@ class ChainApi(Resource):
         self.ip = inc_ip
         self.port = inc_port
         self.manage = manage
-        self.playbook_file = '/tmp/son-emu-requests.log'
+        # concurrent WSGI server (see wsgi_server for the server model and its settings)
+        self.http_server = ApiServer(self.app, self.ip, self.port)
+        self.playbook_file = PLAYBOOK_FILE
+        # shared with the OpenStack endpoints, writes in the background
+        self.playbook = get_playbook_writer(self.playbook_file)
         self.api.add_resource(ChainVersionsList, "/",
                               resource_class_kwargs={'api': self})
         self.api.add_resource(ChainList, "/v1/chain/list",
@@ -80,17 +85,20 @@ class ChainApi(Resource):
         logging.info("Starting %s endpoint @ http://%s:%d" % ("ChainDummyApi", self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
+
+    def stop(self):
+        """
+        Stop the chain API gracefully: running requests are finished, new connections are refused.
+
+        :return: True if the endpoint has been stopped in time
+        :rtype: ``bool``
+        """
+        return self.http_server.shutdown()
 
     def dump_playbook(self):
-        with self.manage.lock:
-            with open(self.playbook_file, 'a') as logfile:
-                if len(request.data) > 0:
-                    data = "# CHAIN API\n"
-                    data += "curl -X {type} -H \"Content-type: application/json\" -d '{data}' {url}".format(type=request.method,
-                                                                                            data=request.data,
-                                                                                            url=request.url)
-                    logfile.write(data + "\n")
+        if len(request.data) > 0:
+            self.playbook.record("CHAIN", request.method, request.data, request.url)
 
 
 class Shutdown(Resource):
@@ -807,63 +815,92 @@ class QueryTopology(Resource):
         """
         Answers GET requests for the current network topology at "/v1/topo".
         This will only return switches and datacenters and ignore currently deployed VNFs.
+        The topology is only serialized again after it has changed. Supports If-None-Match (ETag = topology
+        version) and "?since=<version>" to get only the switches and links added or removed since then.
 
-        :return: 200 if successful with the network graph as json dict, else 500
+        :return: 200 if successful with the network graph as json dict, 304 if the topology did not change,
+            400 if "since" is not an integer, else 500
 
         """
+        since = request.args.get("since")
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response(u"Invalid topology version: since=%s" % since, status=400,
+                                mimetype="application/json")
         try:
             logging.debug("Querying topology")
-            graph = self.api.manage.net.DCNetwork_graph
             net = self.api.manage.net
-            # root node is nodes
-            topology = {"nodes": list()}
-
-            for n in graph:
-                # remove root node as well as the floating switch fs1
-                if n != "root" and n != "fs1":
-                    # we only want to return switches!
-                    if not isinstance(net[n], OVSSwitch):
-                        continue
-                    node = dict()
-
-                    # get real datacenter label
-                    for dc in self.api.manage.net.dcs.values():
-                        if str(dc.switch) == str(n):
-                            node["name"] = str(n)
-                            node["type"] = "Datacenter"
-                            node["label"] = str(dc.label)
-                            break
-
-                    # node is not a datacenter. It has to be a switch
-                    if node.get("type", "") != "Datacenter":
-                        node["name"] = str(n)
-                        node["type"] = "Switch"
-
-                    node["links"] = list()
-                    # add links to the topology
-                    for graph_node, data in graph[n].items():
-                        # only add links to the topology that connect switches
-                        if isinstance(net[graph_node], OVSSwitch):
-                            # we allow multiple edges between switches, so add them all
-                            # with their unique keys
-                            link = copy.copy(data)
-                            for edge in link:
-                                # do not add any links to the floating switch to the topology!
-                                if graph_node == "fs1":
-                                    continue
-                                # the translator wants everything as a string!
-                                for key, value in link[edge].items():
-                                    link[edge][key] = str(value)
-                                # name of the destination
-                                link[edge]["name"] = graph_node
-                                node["links"].append(link)
-
-                    topology["nodes"].append(node)
-
-            return Response(json.dumps(topology),
-                            status=200, mimetype="application/json")
+            if since is not None:
+                changes = net.getTopologyChanges(since)
+                if changes is not None:
+                    return Response(json.dumps(self._delta(changes)), status=200, mimetype="application/json",
+                                    headers=self._headers(changes["version"]))
+
+            version, body = net.getTopologyView("chain_topology", self._topology)
+            if request.if_none_match.contains("topology-%d" % version):
+                return Response(status=304, headers=self._headers(version))
+            return Response(body, status=200, mimetype="application/json", headers=self._headers(version))
         except Exception as e:
             logging.exception(u"%s: Error querying topology.\n %s" %
                               (__name__, e))
             return Response(u"%s: Error querying topology.\n %s" %
                             (__name__, e), status=500, mimetype="application/json")
+
+    def _topology(self):
+        graph = self.api.manage.net.DCNetwork_graph
+        net = self.api.manage.net
+        # root node is nodes
+        topology = {"nodes": list()}
+        # only links that connect switches, but no links to the floating switch fs1
+        link_targets = set(n for n in graph if n != "fs1" and isinstance(net[n], OVSSwitch))
+        # we only want to return switches, but not the root node
+        switches = link_targets - set(["root"])
+        dc_labels = dict((str(dc.switch), str(dc.label)) for dc in self.api.manage.net.dcs.values())
+
+        for n in graph:
+            if n not in switches:
+                continue
+            node = self._node(n, dc_labels)
+            node["links"] = list()
+            # add links to the topology that connect switches
+            for graph_node, data in graph[n].items():
+                if graph_node not in link_targets:
+                    continue
+                # we allow multiple edges between switches, so add them all with their unique keys
+                # the translator wants everything as a string!
+                link = dict()
+                for edge, attrs in data.items():
+                    link[edge] = dict((key, str(value)) for key, value in attrs.items())
+                    # name of the destination
+                    link[edge]["name"] = graph_node
+                for edge in link:
+                    node["links"].append(link)
+            topology["nodes"].append(node)
+        return json.dumps(topology)
+
+    @staticmethod
+    def _node(name, dc_labels):
+        if name in dc_labels:
+            # get real datacenter label
+            return {"name": str(name), "type": "Datacenter", "label": dc_labels[name]}
+        # node is not a datacenter. It has to be a switch
+        return {"name": str(name), "type": "Switch"}
+
+    def _delta(self, changes):
+        def is_switch(name, node_type):
+            return node_type == "switch" and name != "fs1"
+
+        dc_labels = dict((str(dc.switch), str(dc.label)) for dc in self.api.manage.net.dcs.values())
+        delta = {"version": changes["version"], "since": changes["since"], "nodes": dict(), "links": dict()}
+        for op in ["added", "removed"]:
+            delta["nodes"][op] = [self._node(name, dc_labels) for name, node_type in changes["nodes"][op]
+                                  if is_switch(name, node_type) and name != "root"]
+            delta["links"][op] = [{"source": src, "target": dst} for src, dst, src_type, dst_type in changes["edges"][op]
+                                  if is_switch(src, src_type) and is_switch(dst, dst_type)]
+        return delta
+
+    @staticmethod
+    def _headers(version):
+        return {"ETag": '"topology-%d"' % version, "X-Topology-Version": str(version)}
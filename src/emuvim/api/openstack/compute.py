@@ -28,16 +28,36 @@ partner consortium (www.sonata-nfv.eu).
 from mininet.link import Link
 
 from resources import *
-from docker import DockerClient
+import functools
 import logging
 import threading
 import uuid
 import time
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 import ip_handler as IP
+from resource_index import ResourceIndex
+from image_catalog import get_image_catalog
+from stack_diff import StackDiff, REMOVE, UNCHANGED
+from emuvim.dcemulator.tracing import TRACER
 
 
 LOG = logging.getLogger("api.openstack.compute")
 
+# max. number of containers that are stopped or started at the same time during a stack update
+STACK_UPDATE_WORKERS = 8
+
+
+def _synchronized(method):
+    """
+    Calls the method while holding the lock of the compute object (see OpenstackCompute.lock).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class HeatApiStackInvalidException(Exception):
     """
@@ -62,37 +82,46 @@ class OpenstackCompute(object):
 
     def __init__(self):
         self.dc = None
+        # the dummy APIs serve their requests in parallel, stacks, servers, networks, ports, ... are only
+        # changed while holding this lock (API handlers hold it as well to check and change in one step)
+        self.lock = threading.RLock()
         self.stacks = dict()
-        self.computeUnits = dict()
+        # id -> resource, with additional indexes for the find_*_by_name_or_id lookups
+        # (call reindex(id) after renaming a stored resource)
+        self.computeUnits = ResourceIndex('name', 'template_name', 'full_name')
         self.routers = dict()
         self.flavors = dict()
-        self._images = dict()
-        self.nets = dict()
-        self.ports = dict()
-        self.port_pairs = dict()
-        self.port_pair_groups = dict()
-        self.flow_classifiers = dict()
-        self.port_chains = dict()
+        self.nets = ResourceIndex('name')
+        self.ports = ResourceIndex('name', 'template_name')
+        self.port_pairs = ResourceIndex('name')
+        self.port_pair_groups = ResourceIndex('name')
+        self.flow_classifiers = ResourceIndex('name')
+        self.port_chains = ResourceIndex('name')
         self.compute_nets = dict()
-        self.dcli = DockerClient(base_url='unix://var/run/docker.sock')
+        # shared by all data centers, refreshed on docker image events
+        self.image_catalog = get_image_catalog()
 
     @property
     def images(self):
         """
-        Updates the known images. Asks the docker daemon for a list of all known images and returns
-        the new dictionary.
+        The known images. Served from the image catalog, which only asks the docker daemon again
+        if the images have changed or the catalog is outdated.
+
+        :return: Returns the image dictionary.
+        :rtype: ``dict``
+        """
+        return self.image_catalog.images
+
+    def refresh_images(self):
+        """
+        Asks the docker daemon for a list of all known images now.
 
         :return: Returns the new image dictionary.
         :rtype: ``dict``
         """
-        for image in self.dcli.images.list():
-            if len(image.tags) > 0:
-                for t in image.tags:
-                    t = t.replace(":latest", "")  # only use short tag names for OSM compatibility
-                    if t not in self._images:
-                        self._images[t] = Image(t)
-        return self._images
+        return self.image_catalog.refresh()
 
+    @_synchronized
     def add_stack(self, stack):
         """
         Adds a new stack to the compute node.
@@ -105,6 +134,7 @@ class OpenstackCompute(object):
             raise HeatApiStackInvalidException("Stack did not pass validity checks")
         self.stacks[stack.id] = stack
 
+    @_synchronized
     def clean_broken_stack(self, stack):
         for port in stack.ports.values():
             if port.id in self.ports:
@@ -184,6 +214,7 @@ class OpenstackCompute(object):
         self.flavors[flavor.name] = flavor
         return flavor
 
+    @_synchronized
     def deploy_stack(self, stackid):
         """
         Deploys the stack and starts the emulation.
@@ -198,13 +229,17 @@ class OpenstackCompute(object):
             return False
 
         stack = self.stacks[stackid]
-        self.update_compute_dicts(stack)
-
-        # Create the networks first
-        for server in stack.servers.values():
-            self._start_compute(server)
+        # record the phases of this deployment (see: /restapi/tracing)
+        with TRACER.trace("stack", stack.stack_name, stack_id=stackid, datacenter=self.dc.label):
+            self.update_compute_dicts(stack)
+
+            # Create the networks first
+            for server in stack.servers.values():
+                with TRACER.span("start_compute", server=server.name):
+                    self._start_compute(server)
         return True
 
+    @_synchronized
     def delete_stack(self, stack_id):
         """
         Delete a stack and all its components.
@@ -230,10 +265,14 @@ class OpenstackCompute(object):
         del self.stacks[stack_id]
         return True
 
+    @_synchronized
     def update_stack(self, old_stack_id, new_stack):
         """
         Determines differences within the old and the new stack and deletes, create or changes only parts that
         differ between the two stacks.
+        Servers that did not change keep running, only the links of their changed ports are rebuilt.
+        Removed and changed servers are stopped, new and changed servers are started in parallel.
+        A summary of the changes is stored in ``new_stack.update_report``.
 
         :param old_stack_id: The ID of the old stack.
         :type old_stack_id: ``str``
@@ -247,6 +286,7 @@ class OpenstackCompute(object):
         if old_stack_id not in self.stacks:
             return False
         old_stack = self.stacks[old_stack_id]
+        start_time = time.time()
 
         # Update Stack IDs
         for server in old_stack.servers.values():
@@ -266,70 +306,62 @@ class OpenstackCompute(object):
             if router.name in new_stack.routers:
                 new_stack.routers[router.name].id = router.id
 
-        # Update the compute dicts to now contain the new_stack components
-        self.update_compute_dicts(new_stack)
-
         self.update_ip_addresses(old_stack, new_stack)
 
         # Update all interface names - after each port has the correct UUID!!
         for port in new_stack.ports.values():
             port.create_intf_name()
 
+        # nothing of the running stack has been touched so far
         if not self.check_stack(new_stack):
             return False
 
-        # Remove unnecessary networks
-        for net in old_stack.nets.values():
-            if not net.name in new_stack.nets:
-                self.delete_network(net.id)
-
-        # Remove all unnecessary servers
-        for server in old_stack.servers.values():
-            if server.name in new_stack.servers:
-                if not server.compare_attributes(new_stack.servers[server.name]):
-                    self.stop_compute(server)
-                else:
-                    # Delete unused and changed links
-                    for port_name in server.port_names:
-                        if port_name in old_stack.ports and port_name in new_stack.ports:
-                            if not old_stack.ports.get(port_name) == new_stack.ports.get(port_name):
-                                my_links = self.dc.net.links
-                                for link in my_links:
-                                    if str(link.intf1) == old_stack.ports[port_name].intf_name and \
-                                                    str(link.intf1.ip) == \
-                                                    old_stack.ports[port_name].ip_address.split('/')[0]:
-                                        self._remove_link(server.name, link)
-
-                                        # Add changed link
-                                        self._add_link(server.name,
-                                                       new_stack.ports[port_name].ip_address,
-                                                       new_stack.ports[port_name].intf_name,
-                                                       new_stack.ports[port_name].net_name)
-                                        break
-                        else:
-                            my_links = self.dc.net.links
-                            for link in my_links:
-                                if str(link.intf1) == old_stack.ports[port_name].intf_name and \
-                                   str(link.intf1.ip) == old_stack.ports[port_name].ip_address.split('/')[0]:
-                                    self._remove_link(server.name, link)
-                                    break
-
-                    # Create new links
-                    for port_name in new_stack.servers[server.name].port_names:
-                        if port_name not in server.port_names:
-                            self._add_link(server.name,
-                                           new_stack.ports[port_name].ip_address,
-                                           new_stack.ports[port_name].intf_name,
-                                           new_stack.ports[port_name].net_name)
-            else:
-                self.stop_compute(server)
-
-        # Start all new servers
-        for server in new_stack.servers.values():
-            if server.name not in self.dc.containers:
-                self._start_compute(server)
-            else:
-                server.emulator_compute = self.dc.containers.get(server.name)
+        diff = StackDiff(old_stack, new_stack)
+        LOG.info("Updating stack %s: %s" % (new_stack.stack_name, diff))
+        # delete_port and delete_network also remove the resources from old_stack, keep them for the cleanup
+        old_nets = dict(old_stack.nets)
+        old_ports = dict(old_stack.ports)
+        old_routers = dict(old_stack.routers)
+        with TRACER.trace("stack_update", new_stack.stack_name, stack_id=new_stack.id, datacenter=self.dc.label):
+            # Stop removed and changed servers, together with their ports
+            with TRACER.span("stop_computes"):
+                self._stop_computes(diff.servers_to_stop())
+
+            # Detach removed and changed ports of the servers that keep running
+            with TRACER.span("detach_ports"):
+                for server_name, (detach, attach) in diff.relinks.items():
+                    for port_name in detach:
+                        self.delete_port(old_ports[port_name].id)
+
+            # Remove unnecessary networks, ports and routers
+            for net_name in diff.nets[REMOVE]:
+                self.delete_network(old_nets[net_name].id)
+            for port_name in diff.ports[REMOVE]:
+                self.ports.pop(old_ports[port_name].id, None)
+            for router_name in diff.routers[REMOVE]:
+                self.routers.pop(old_routers[router_name].id, None)
+
+            # Update the compute dicts to now contain the new_stack components
+            self.update_compute_dicts(new_stack)
+
+            # Attach added and changed ports of the servers that keep running
+            with TRACER.span("attach_ports"):
+                for server_name, (detach, attach) in diff.relinks.items():
+                    for port_name in attach:
+                        port = new_stack.ports[port_name]
+                        self._add_link(server_name, port.ip_address, port.intf_name, port.net_name)
+
+            # Unchanged servers keep their containers
+            for server_name in diff.servers[UNCHANGED]:
+                new_stack.servers[server_name].emulator_compute = self.dc.containers.get(server_name)
+
+            # Start all new and changed servers
+            with TRACER.span("start_computes"):
+                self._run_parallel(self._start_compute, diff.servers_to_start())
+
+        diff.duration = time.time() - start_time
+        new_stack.update_report = diff.report()
+        LOG.info("Stack %s updated in %.3fs: %s" % (new_stack.stack_name, diff.duration, diff.operations()))
 
         del self.stacks[old_stack_id]
         self.stacks[new_stack.id] = new_stack
@@ -358,24 +390,36 @@ class OpenstackCompute(object):
         :param new_stack: The new created stack
         :type new_stack: :class:`heat.resources.stack`
         """
+        nets_by_name = dict()
         for net in new_stack.nets.values():
             net.reset_issued_ip_addresses()
+            nets_by_name[net.name] = net
 
         for old_port in old_stack.ports.values():
             for port in new_stack.ports.values():
                 if port.compare_attributes(old_port):
-                    for net in new_stack.nets.values():
-                        if net.name == port.net_name:
-                            if net.assign_ip_address(old_port.ip_address, port.name):
-                                port.ip_address = old_port.ip_address
-                                port.mac_address = old_port.mac_address
-                            else:
-                                port.ip_address = net.get_new_ip_address(port.name)
+                    net = nets_by_name.get(port.net_name)
+                    if net is not None:
+                        if net.assign_ip_address(old_port.ip_address, port.name):
+                            port.ip_address = old_port.ip_address
+                            port.mac_address = old_port.mac_address
+                        else:
+                            port.ip_address = net.get_new_ip_address(port.name)
 
+        # all new or changed ports of a network get their addresses in one step
+        new_ports = defaultdict(list)
         for port in new_stack.ports.values():
-            for net in new_stack.nets.values():
-                if port.net_name == net.name and not net.is_my_ip(port.ip_address, port.name):
-                    port.ip_address = net.get_new_ip_address(port.name)
+            net = nets_by_name.get(port.net_name)
+            if net is not None and not net.is_my_ip(port.ip_address, port.name):
+                new_ports[net.name].append(port)
+        for net_name, ports in new_ports.items():
+            net = nets_by_name[net_name]
+            addresses = net.get_new_ip_addresses([port.name for port in ports])
+            if addresses is None:
+                # not enough addresses left, give out the remaining ones port by port
+                addresses = [net.get_new_ip_address(port.name) for port in ports]
+            for port, address in zip(ports, addresses):
+                port.ip_address = address
 
     def update_subnet_cidr(self, old_stack, new_stack):
         """
@@ -397,12 +441,13 @@ class OpenstackCompute(object):
                     if IP.assign_cidr(old_subnet.get_cidr(), subnet.subnet_id):
                         subnet.set_cidr(old_subnet.get_cidr())
 
-        for subnet in new_stack.nets.values():
-            if IP.is_cidr_issued(subnet.get_cidr()):
-                continue
-
-            cird = IP.get_new_cidr(subnet.subnet_id)
-            subnet.set_cidr(cird)
+        subnets = [subnet for subnet in new_stack.nets.values() if not IP.is_cidr_issued(subnet.get_cidr())]
+        cidrs = IP.get_new_cidrs([subnet.subnet_id for subnet in subnets])
+        if cidrs is None:
+            # not enough cidrs left, give out the remaining ones subnet by subnet
+            cidrs = [IP.get_new_cidr(subnet.subnet_id) for subnet in subnets]
+        for subnet, cidr in zip(subnets, cidrs):
+            subnet.set_cidr(cidr)
         return
 
     def update_compute_dicts(self, stack):
@@ -460,17 +505,21 @@ class OpenstackCompute(object):
                                  properties=server.properties)
         server.emulator_compute = c
 
-        for intf in c.intfs.values():
+        with TRACER.span("interface_setup", server=server.name):
+            # look up the ports once, not for every interface
+            intf_ports = dict()
             for port_name in server.port_names:
                 port = self.find_port_by_name_or_id(port_name)
                 if port is not None:
-                    if intf.name == port.intf_name:
-                        # wait up to one second for the intf to come up
-                        self.timeout_sleep(intf.isUp, 1)
-                        if port.mac_address is not None:
-                            intf.setMAC(port.mac_address)
-                        else:
-                            port.mac_address = intf.MAC()
+                    intf_ports.setdefault(port.intf_name, list()).append(port)
+            for intf in c.intfs.values():
+                for port in intf_ports.get(intf.name, list()):
+                    # wait up to one second for the intf to come up
+                    self.timeout_sleep(intf.isUp, 1)
+                    if port.mac_address is not None:
+                        intf.setMAC(port.mac_address)
+                    else:
+                        port.mac_address = intf.MAC()
 
         # Start the real emulator command now as specified in the dockerfile
         # ENV SON_EMU_CMD
@@ -493,24 +542,86 @@ class OpenstackCompute(object):
         :type server: ``heat.resources.server``
         """
         LOG.debug("Stopping container %s with full name %s" % (server.name, server.full_name))
+        self._remove_server_links(server)
+        # Stop the server and the remaining connection to the datacenter switch
+        self.dc.stopCompute(server.name)
+        # Only now delete all its ports and the server itself
+        self._delete_server_resources(server)
+
+    def _stop_computes(self, servers):
+        """
+        Stops several servers like :func:`stop_compute`, but removes the containers in parallel.
+
+        :param servers: The servers that should be removed
+        :type servers: ``list``
+        """
+        for server in servers:
+            LOG.debug("Stopping container %s with full name %s" % (server.name, server.full_name))
+            self._remove_server_links(server)
+        self._run_parallel(lambda server: self.dc.stopCompute(server.name), servers)
+        for server in servers:
+            self._delete_server_resources(server)
+
+    def _remove_server_links(self, server):
+        """
+        Removes all self created links that connect the server to the main switch.
+
+        :param server: The server whose links should be removed
+        :type server: ``heat.resources.server``
+        """
         link_names = list()
         for port_name in server.port_names:
             prt = self.find_port_by_name_or_id(port_name)
             if prt is not None:
                 link_names.append(prt.intf_name)
-        my_links = self.dc.net.links
+        my_links = list(self.dc.net.links)
         for link in my_links:
             if str(link.intf1) in link_names:
-                # Remove all self created links that connect the server to the main switch
                 self._remove_link(server.name, link)
 
-        # Stop the server and the remaining connection to the datacenter switch
-        self.dc.stopCompute(server.name)
-        # Only now delete all its ports and the server itself
+    def _delete_server_resources(self, server):
+        """
+        Deletes the ports and the server from the compute dictionaries, after its container was stopped.
+
+        :param server: The stopped server
+        :type server: ``heat.resources.server``
+        """
         for port_name in server.port_names:
             self.delete_port(port_name)
         self.delete_server(server)
 
+    @staticmethod
+    def _run_parallel(function, servers):
+        """
+        Calls the function for each server with at most STACK_UPDATE_WORKERS threads.
+        If a call fails, the first error is raised after all calls are done.
+
+        :param function: function(server)
+        :type function: ``function``
+        :param servers: The servers to call the function for
+        :type servers: ``list``
+        """
+        if len(servers) < 1:
+            return
+
+        def call(server):
+            try:
+                function(server)
+                return None
+            except Exception as ex:
+                LOG.exception("Stack update operation on server %s failed." % server.name)
+                return ex
+
+        pool = ThreadPool(max(1, min(STACK_UPDATE_WORKERS, len(servers))))
+        try:
+            errors = pool.map(call, servers)
+        finally:
+            pool.close()
+            pool.join()
+        for ex in errors:
+            if ex is not None:
+                raise ex
+
     def find_server_by_name_or_id(self, name_or_id):
         """
         Tries to find the server by ID and if this does not succeed then tries to find it via name.
@@ -523,18 +634,16 @@ class OpenstackCompute(object):
         if name_or_id in self.computeUnits:
             return self.computeUnits[name_or_id]
 
-        if self._shorten_server_name(name_or_id) in self.computeUnits:
-            return self.computeUnits[name_or_id]
+        short_name = self._shorten_server_name(name_or_id)
+        if short_name in self.computeUnits:
+            return self.computeUnits[short_name]
 
-        for server in self.computeUnits.values():
-            if server.name == name_or_id or server.template_name == name_or_id or server.full_name == name_or_id:
-                return server
-            if (server.name == self._shorten_server_name(name_or_id)
-                or server.template_name ==  self._shorten_server_name(name_or_id)
-                or server.full_name == self._shorten_server_name(name_or_id)):
-                return server
-        return None
+        server = self.computeUnits.find(name_or_id)
+        if server is None and short_name != name_or_id:
+            server = self.computeUnits.find(short_name)
+        return server
 
+    @_synchronized
     def create_server(self, name, stack_operation=False):
         """
         Creates a server with the specified name. Raises an exception when a server with the given name already
@@ -583,26 +692,25 @@ class OpenstackCompute(object):
         return name
 
 
+    @_synchronized
     def delete_server(self, server):
         """
         Deletes the given server from the stack dictionary and the computeUnits dictionary.
 
         :param server: Reference of the server that should be deleted.
         :type server: :class:`heat.resources.server`
-        :return: * *False*: If the server name is not in the correct format ('datacentername_stackname_servername') \
-                or when no stack with the correct stackname was found.
+        :return: * *False*: If the server is not in the computeUnits dictionary.
             * *True*: Else
         :rtype: ``bool``
         """
         if server is None:
             return False
-        name_parts = server.name.split('_')
-        if len(name_parts) < 3:
-            return False
-
+        # shortened server names do not contain the stack name any more, the stacks store the server
+        # under its unshortened name
         for stack in self.stacks.values():
-            if stack.stack_name == name_parts[1]:
-                stack.servers.pop(server.id, None)
+            for name, s in stack.servers.items():
+                if s is server:
+                    del stack.servers[name]
         if self.computeUnits.pop(server.id, None) is None:
             return False
         return True
@@ -618,12 +726,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.nets:
             return self.nets[name_or_id]
-        for net in self.nets.values():
-            if net.name == name_or_id:
-                return net
-
-        return None
+        return self.nets.find(name_or_id)
 
+    @_synchronized
     def create_network(self, name, stack_operation=False):
         """
         Creates a new network with the given name. Raises an exception when a network with the given name already
@@ -645,6 +750,7 @@ class OpenstackCompute(object):
             self.nets[network.id] = network
         return network
 
+    @_synchronized
     def delete_network(self, name_or_id):
         """
         Deletes the given network.
@@ -661,6 +767,7 @@ class OpenstackCompute(object):
 
         self.nets.pop(net.id, None)
 
+    @_synchronized
     def create_port(self, name, stack_operation=False):
         """
         Creates a new port with the given name. Raises an exception when a port with the given name already
@@ -695,12 +802,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.ports:
             return self.ports[name_or_id]
-        for port in self.ports.values():
-            if port.name == name_or_id or port.template_name == name_or_id:
-                return port
-
-        return None
+        return self.ports.find(name_or_id)
 
+    @_synchronized
     def delete_port(self, name_or_id):
         """
         Deletes the given port. Raises an exception when the port was not found!
@@ -724,6 +828,7 @@ class OpenstackCompute(object):
         for stack in self.stacks.values():
             stack.ports.pop(port.name, None)
 
+    @_synchronized
     def create_port_pair(self, name, stack_operation=False):
         """
         Creates a new port pair with the given name. Raises an exception when a port pair with the given name already
@@ -757,12 +862,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.port_pairs:
             return self.port_pairs[name_or_id]
-        for port_pair in self.port_pairs.values():
-            if port_pair.name == name_or_id:
-                return port_pair
-
-        return None
+        return self.port_pairs.find(name_or_id)
 
+    @_synchronized
     def delete_port_pair(self, name_or_id):
         """
         Deletes the given port pair. Raises an exception when the port pair was not found!
@@ -776,6 +878,7 @@ class OpenstackCompute(object):
 
         self.port_pairs.pop(port_pair.id, None)
 
+    @_synchronized
     def create_port_pair_group(self, name, stack_operation=False):
         """
         Creates a new port pair group with the given name. Raises an exception when a port pair group
@@ -809,12 +912,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.port_pair_groups:
             return self.port_pair_groups[name_or_id]
-        for port_pair_group in self.port_pair_groups.values():
-            if port_pair_group.name == name_or_id:
-                return port_pair_group
-
-        return None
+        return self.port_pair_groups.find(name_or_id)
 
+    @_synchronized
     def delete_port_pair_group(self, name_or_id):
         """
         Deletes the given port pair group. Raises an exception when the port pair group was not found!
@@ -828,6 +928,7 @@ class OpenstackCompute(object):
 
         self.port_pair_groups.pop(port_pair_group.id, None)
 
+    @_synchronized
     def create_port_chain(self, name, stack_operation=False):
         """
         Creates a new port chain with the given name. Raises an exception when a port chain with the given name already
@@ -861,11 +962,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.port_chains:
             return self.port_chains[name_or_id]
-        for port_chain in self.port_chains.values():
-            if port_chain.name == name_or_id:
-                return port_chain
-        return None
+        return self.port_chains.find(name_or_id)
 
+    @_synchronized
     def delete_port_chain(self, name_or_id):
         """
         Deletes the given port chain. Raises an exception when the port chain was not found!
@@ -880,6 +979,7 @@ class OpenstackCompute(object):
 
         self.port_chains.pop(port_chain.id, None)
 
+    @_synchronized
     def create_flow_classifier(self, name, stack_operation=False):
         """
         Creates a new flow classifier with the given name. Raises an exception when a flow classifier with the given name already
@@ -913,12 +1013,9 @@ class OpenstackCompute(object):
         """
         if name_or_id in self.flow_classifiers:
             return self.flow_classifiers[name_or_id]
-        for flow_classifier in self.flow_classifiers.values():
-            if flow_classifier.name == name_or_id:
-                return flow_classifier
-
-        return None
+        return self.flow_classifiers.find(name_or_id)
 
+    @_synchronized
     def delete_flow_classifier(self, name_or_id):
         """
         Deletes the given flow classifier. Raises an exception when the flow classifier was not found!
@@ -963,11 +1060,13 @@ class OpenstackCompute(object):
         :param link: A reference of the link which should be removed.
         :type link: :class:`mininet.link`
         """
-        self.dc.switch.detach(link.intf2)
-        del self.dc.switch.intfs[self.dc.switch.ports[link.intf2]]
-        del self.dc.switch.ports[link.intf2]
-        del self.dc.switch.nameToIntf[link.intf2.name]
-        self.dc.net.removeLink(link=link)
+        # the switch is shared with containers that are started or stopped in parallel
+        with self.dc.net.topology_lock:
+            self.dc.switch.detach(link.intf2)
+            del self.dc.switch.intfs[self.dc.switch.ports[link.intf2]]
+            del self.dc.switch.ports[link.intf2]
+            del self.dc.switch.nameToIntf[link.intf2.name]
+            self.dc.net.removeLink(link=link)
         for intf_key in self.dc.net[server_name].intfs.keys():
             if self.dc.net[server_name].intfs[intf_key].link == link:
                 self.dc.net[server_name].intfs[intf_key].delete()
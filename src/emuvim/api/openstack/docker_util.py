@@ -27,7 +27,11 @@ partner consortium (www.sonata-nfv.eu).
 """
 from docker import DockerClient, APIClient
 import time
-import re
+
+from emuvim.dcemulator.cgroupstats import STATS_SAMPLER
+
+# total memory of the host in bytes, read once
+_MEM_TOTAL = None
 
 
 def docker_container_id(container_name):
@@ -46,6 +50,28 @@ def docker_container_id(container_name):
     return None
 
 
+def _counters(container_id):
+    c = STATS_SAMPLER.counters(container_id)
+    if c is None:
+        raise IOError("No cgroup found for container %s" % container_id)
+    return c
+
+
+def _mem_total():
+    global _MEM_TOTAL
+    if _MEM_TOTAL is None:
+        with open('/proc/meminfo', 'r') as f:
+            line = f.readline().split()
+        sys_value = int(line[1])
+        unit = line[2]
+        if unit == 'kB':
+            sys_value *= 1024
+        if unit == 'MB':
+            sys_value *= 1024 * 1024
+        _MEM_TOTAL = sys_value
+    return _MEM_TOTAL
+
+
 def docker_abs_cpu(container_id):
     """
     Returns the used CPU time since container startup and the system time in nanoseconds and returns the number
@@ -57,14 +83,8 @@ def docker_abs_cpu(container_id):
         CPU cores available.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/cpuacct/docker/' + container_id + '/cpuacct.usage_percpu', 'r') as f:
-        line = f.readline()
-    sys_time = int(time.time() * 1000000000)
-    numbers = [int(x) for x in line.split()]
-    cpu_usage = 0
-    for number in numbers:
-        cpu_usage += number
-    return {'CPU_used': cpu_usage, 'CPU_used_systime': sys_time, 'CPU_cores': len(numbers)}
+    cpu_usage, cores = _counters(container_id).cpu()
+    return {'CPU_used': cpu_usage, 'CPU_used_systime': int(time.time() * 1000000000), 'CPU_cores': cores}
 
 
 def docker_mem_used(container_id):
@@ -78,10 +98,9 @@ def docker_mem_used(container_id):
     :param container_id: The full ID of the docker container.
     :type container_id: ``str``
     :return: Returns the memory utilization in bytes.
-    :rtype: ``str``
+    :rtype: ``int``
     """
-    with open('/sys/fs/cgroup/memory/docker/' + container_id + '/memory.usage_in_bytes', 'r') as f:
-        return int(f.readline())
+    return _counters(container_id).memory()[0]
 
 
 def docker_max_mem(container_id):
@@ -91,23 +110,12 @@ def docker_max_mem(container_id):
     :param container_id: The full ID of the docker container.
     :type container_id: ``str``
     :return: Returns the bytes of memory the docker container could use.
-    :rtype: ``str``
+    :rtype: ``int``
     """
-    with open('/sys/fs/cgroup/memory/docker/' + container_id + '/memory.limit_in_bytes', 'r') as f:
-        mem_limit = int(f.readline())
-    with open('/proc/meminfo', 'r') as f:
-        line = f.readline().split()
-    sys_value = int(line[1])
-    unit = line[2]
-    if unit == 'kB':
-        sys_value *= 1024
-    if unit == 'MB':
-        sys_value *= 1024 * 1024
-
-    if sys_value < mem_limit:
-        return sys_value
-    else:
-        return mem_limit
+    mem_limit = _counters(container_id).memory()[1]
+    if mem_limit is None or _mem_total() < mem_limit:
+        return _mem_total()
+    return mem_limit
 
 
 def docker_mem(container_id):
@@ -129,7 +137,8 @@ def docker_mem(container_id):
 
 def docker_abs_net_io(container_id):
     """
-    Network traffic of all network interfaces within the controller.
+    Network traffic of all network interfaces within the container.
+    Read from /proc/<pid>/net/dev of the container's network namespace, nothing is executed in the container.
 
     :param container_id: The full ID of the docker container.
     :type container_id: ``str``
@@ -137,53 +146,21 @@ def docker_abs_net_io(container_id):
         system time.
     :rtype: ``dict``
     """
-    c = APIClient()
-    command = c.exec_create(container_id, 'ifconfig')
-    ifconfig = c.exec_start(command['Id'])
-    sys_time = int(time.time() * 1000000000)
-
-    in_bytes = 0
-    m = re.findall('RX bytes:(\d+)', str(ifconfig))
-    if m:
-        for number in m:
-            in_bytes += int(number)
-    else:
-        in_bytes = None
-
-    out_bytes = 0
-    m = re.findall('TX bytes:(\d+)', str(ifconfig))
-    if m:
-        for number in m:
-            out_bytes += int(number)
-    else:
-        out_bytes = None
-
-    return {'NET_in': in_bytes, 'NET_out': out_bytes, 'NET_systime': sys_time}
+    in_bytes, out_bytes = _counters(container_id).network()
+    return {'NET_in': in_bytes, 'NET_out': out_bytes, 'NET_systime': int(time.time() * 1000000000)}
 
 
 def docker_block_rw(container_id):
     """
-    Determines the disk read and write access from the controller since startup.
+    Determines the disk read and write access from the container since startup.
 
     :param container_id: The full ID of the docker container.
     :type container_id: ``str``
     :return: Returns a dictionary with the total disc I/O since container startup, in bytes.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/blkio/docker/' + container_id + '/blkio.throttle.io_service_bytes', 'r') as f:
-        read = f.readline().split()
-        write = f.readline().split()
-    rw_dict = dict()
-    rw_dict['BLOCK_systime'] = int(time.time() * 1000000000)
-    if len(read) < 3:
-        rw_dict['BLOCK_read'] = 0
-    else:
-        rw_dict['BLOCK_read'] = read[2]
-    if len(write) < 3:
-        rw_dict['BLOCK_write'] = 0
-    else:
-        rw_dict['BLOCK_write'] = write[2]
-    return rw_dict
+    read, write = _counters(container_id).block_io()
+    return {'BLOCK_systime': int(time.time() * 1000000000), 'BLOCK_read': read or 0, 'BLOCK_write': write or 0}
 
 
 def docker_PIDS(container_id):
@@ -195,13 +172,14 @@ def docker_PIDS(container_id):
     :return: Returns the number of PIDS within a dictionary.
     :rtype: ``dict``
     """
-    with open('/sys/fs/cgroup/cpuacct/docker/' + container_id + '/tasks', 'r') as f:
-        return {'PIDS': len(f.read().split('\n')) - 1}
+    return {'PIDS': _counters(container_id).processes()}
 
 
 def monitoring_over_time(container_id):
     """
     Calculates the cpu workload and the network traffic per second.
+    The rates are computed from the last two samples of the shared container stats sampler,
+    so this does not block (except for the first request of a container).
 
     :param container_id: The full docker container ID
     :type container_id: ``str``
@@ -209,30 +187,8 @@ def monitoring_over_time(container_id):
         the cpu workload and the number of cpu cores available.
     :rtype: ``dict``
     """
-    first_cpu_usage = docker_abs_cpu(container_id)
-    first = docker_abs_net_io(container_id)
-    first_disk_io = docker_block_rw(container_id)
-    time.sleep(1)
-    second_cpu_usage = docker_abs_cpu(container_id)
-    second = docker_abs_net_io(container_id)
-    second_disk_io = docker_block_rw(container_id)
-
-    # Disk access
-    time_div = (int(second_disk_io['BLOCK_systime']) - int(first_disk_io['BLOCK_systime']))
-    read_div = int(second_disk_io['BLOCK_read']) - int(first_disk_io['BLOCK_read'])
-    write_div = int(second_disk_io['BLOCK_write']) - int(first_disk_io['BLOCK_write'])
-    out_dict = {'BLOCK_read/s': int(read_div * 1000000000 / float(time_div) + 0.5),
-                'BLOCK_write/s': int(write_div * 1000000000 / float(time_div) + 0.5)}
-
-    # Network traffic
-    time_div = (int(second['NET_systime']) - int(first['NET_systime']))
-    in_div = int(second['NET_in']) - int(first['NET_in'])
-    out_div = int(second['NET_out']) - int(first['NET_out'])
-    out_dict.update({'NET_in/s': int(in_div * 1000000000 / float(time_div) + 0.5),
-                     'NET_out/s': int(out_div * 1000000000 / float(time_div) + 0.5)})
-
-    # CPU utilization
-    time_div = (int(second_cpu_usage['CPU_used_systime']) - int(first_cpu_usage['CPU_used_systime']))
-    usage_div = int(second_cpu_usage['CPU_used']) - int(first_cpu_usage['CPU_used'])
-    out_dict.update({'CPU_%': usage_div / float(time_div), 'CPU_cores': first_cpu_usage['CPU_cores']})
-    return out_dict
+    rates = STATS_SAMPLER.rates(container_id)
+    if rates is None:
+        raise IOError("No stats available for container %s" % container_id)
+    return {key: rates[key] for key in ['BLOCK_read/s', 'BLOCK_write/s', 'NET_in/s', 'NET_out/s',
+                                        'CPU_%', 'CPU_cores']}
@@ -28,15 +28,24 @@ partner consortium (www.sonata-nfv.eu).
 from __future__ import print_function  # TODO remove when print is no longer needed for debugging
 from resources import *
 from datetime import datetime
+from collections import OrderedDict, deque
 import re
 import sys
 import uuid
+import json
+import hashlib
 import logging
+import threading
 import ip_handler as IP
 
 
 LOG = logging.getLogger("api.openstack.heat.parser")
 
+# number of templates whose resolved resource order is kept (repeated creates/updates of the same template)
+PLAN_CACHE_SIZE = 64
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
 
 class HeatParser:
     """
@@ -80,10 +89,19 @@ class HeatParser:
         # clear bufferResources
         self.bufferResource = list()
 
-        for resource in self.resources.values():
-            self.handle_resource(resource, stack, dc_label, stack_update=stack_update)
+        # create the resources in dependency order, so that each one is handled only once
+        order, errors = self.resolve_order(self.resources, self.parameters)
+        if errors:
+            print(str(len(errors)) + ' problems found in the dependencies of the HOT:')
+            for e in errors:
+                print(e)
+            return False
+
+        for name in order:
+            self.handle_resource(self.resources[name], stack, dc_label, stack_update=stack_update)
 
-        # This loop tries to create all classes which had unresolved dependencies.
+        # This loop tries to create all classes which had unresolved dependencies that are not visible
+        # in the template (should not be needed for valid templates).
         unresolved_resources_last_round = len(self.bufferResource) + 1
         while len(self.bufferResource) > 0 and unresolved_resources_last_round > len(self.bufferResource):
             unresolved_resources_last_round = len(self.bufferResource)
@@ -101,6 +119,140 @@ class HeatParser:
             return False
         return True
 
+    def resolve_order(self, resources, parameters=None):
+        """
+        Orders the resources of a template, so that every resource comes after the resources it depends on.
+        Dependencies are taken from the 'get_resource' references, ports and router interfaces that reference
+        a network additionally depend on the subnets of this network. The result is cached by template content.
+
+        :param resources: The resources dictionary of the template.
+        :type resources: ``dict``
+        :param parameters: The parameters dictionary of the template.
+        :type parameters: ``dict``
+        :return: Tuple (list of resource names in creation order, list of error strings).
+            If there are errors (dependency cycles), the order is incomplete.
+        :rtype: ``tuple``
+        """
+        resources = resources or dict()
+        parameters = parameters or dict()
+        digest = hashlib.sha1(json.dumps([resources, sorted(parameters.keys())],
+                                         sort_keys=True, default=str)).hexdigest()
+        with _plan_cache_lock:
+            if digest in _plan_cache:
+                plan = _plan_cache.pop(digest)
+                _plan_cache[digest] = plan
+                return list(plan[0]), list(plan[1])
+
+        names = sorted(resources.keys())
+        errors = list()
+
+        # subnets of each network
+        subnets = dict()
+        for name in names:
+            resource = resources[name]
+            if 'OS::Neutron::Subnet' in resource.get('type', ''):
+                for net_name in HeatParser._find_references(resource, 'get_resource'):
+                    subnets.setdefault(net_name, list()).append(name)
+
+        # name -> names of the resources it depends on
+        depends_on = dict()
+        for name in names:
+            resource = resources[name]
+            deps = list()
+            for ref in HeatParser._find_references(resource, 'get_resource'):
+                if ref == name or ref not in resources:
+                    # unknown references are created on the fly (e.g. ports of servers) or reported later
+                    continue
+                deps.append(ref)
+                if 'OS::Neutron::Net' in resources[ref].get('type', '') \
+                        and 'OS::Neutron::Subnet' not in resource.get('type', ''):
+                    deps.extend(s for s in subnets.get(ref, list()) if s != name)
+            depends_on[name] = set(deps)
+            for param in HeatParser._find_references(resource, 'get_param'):
+                if param not in parameters:
+                    LOG.warning("Resource %s references the unknown parameter %s." % (name, param))
+
+        # topological sort (Kahn)
+        dependents = dict((name, list()) for name in names)
+        missing = dict()
+        for name in names:
+            missing[name] = len(depends_on[name])
+            for dep in depends_on[name]:
+                dependents[dep].append(name)
+        ready = deque(name for name in names if missing[name] == 0)
+        order = list()
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in dependents[name]:
+                missing[dependent] -= 1
+                if missing[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) < len(names):
+            remaining = set(name for name in names if missing[name] > 0)
+            cycles = HeatParser._find_cycles(remaining, depends_on)
+            in_cycle = set()
+            for cycle in cycles:
+                errors.append("dependency cycle: " + " -> ".join(cycle + [cycle[0]]))
+                in_cycle.update(cycle)
+            for name in sorted(remaining - in_cycle):
+                errors.append("resource %s depends on a dependency cycle" % name)
+
+        with _plan_cache_lock:
+            _plan_cache[digest] = (order, errors)
+            while len(_plan_cache) > PLAN_CACHE_SIZE:
+                _plan_cache.popitem(last=False)
+        return list(order), list(errors)
+
+    @staticmethod
+    def _find_references(obj, function):
+        """
+        Collects the arguments of all intrinsic function calls (e.g. get_resource) within a resource.
+        """
+        refs = list()
+        stack = [obj]
+        while stack:
+            o = stack.pop()
+            if isinstance(o, dict):
+                for k, v in o.items():
+                    if k == function:
+                        # get_param can also be called with a list: [name, key, ...]
+                        ref = v[0] if isinstance(v, list) and len(v) > 0 else v
+                        if isinstance(ref, basestring):
+                            refs.append(ref)
+                    else:
+                        stack.append(v)
+            elif isinstance(o, list):
+                stack.extend(o)
+        return refs
+
+    @staticmethod
+    def _find_cycles(remaining, depends_on):
+        """
+        Finds the dependency cycles among the resources that could not be ordered.
+        Each of them depends on at least one other remaining resource, so following these
+        dependencies always runs into a cycle.
+
+        :return: list of cycles (lists of resource names)
+        """
+        cycles = list()
+        visited = set()
+        for start in sorted(remaining):
+            if start in visited:
+                continue
+            path = list()
+            position = dict()
+            name = start
+            while name not in visited and name not in position:
+                position[name] = len(path)
+                path.append(name)
+                name = min(d for d in depends_on[name] if d in remaining)
+            if name in position:
+                cycles.append(path[position[name]:])
+            visited.update(path)
+        return cycles
+
     def handle_resource(self, resource, stack, dc_label, stack_update=False):
         """
         This function will take a resource (from a heat template) and determines which type it is and creates
@@ -184,6 +336,7 @@ class HeatParser:
 
                 server.full_name = compute_name
                 server.template_name = str(resource['properties']['name'])
+                self.compute.computeUnits.reindex(server.id)
                 server.command = resource['properties'].get('command', '/bin/sh')
                 server.image = resource['properties']['image']
                 server.flavor = resource['properties']['flavor']
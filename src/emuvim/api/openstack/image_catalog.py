@@ -0,0 +1,128 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+import time
+from docker import DockerClient
+from resources.image import Image
+
+LOG = logging.getLogger("api.openstack.image_catalog")
+LOG.setLevel(logging.DEBUG)
+
+DOCKER_URL = 'unix://var/run/docker.sock'
+# max. age of the catalog in seconds before it is listed again (safety net if docker events are missed)
+IMAGE_CATALOG_TTL = 30
+# delay before the event watcher reconnects after the event stream broke
+EVENT_RECONNECT_DELAY = 5
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_image_catalog():
+    """
+    The image catalog shared by all OpenStack endpoints and data centers.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = DockerImageCatalog()
+        return _catalog
+
+
+class DockerImageCatalog(object):
+    """
+    Cache of the Docker images known to the local Docker daemon (short tag name -> Image).
+
+    The daemon is only asked again if an image event (pull, tag, delete, ...) was seen,
+    if the catalog is older than the TTL or if refresh() is called.
+    Image objects (and their ids) stay the same over refreshes.
+    """
+
+    def __init__(self, base_url=DOCKER_URL, ttl=IMAGE_CATALOG_TTL, watch_events=True):
+        self.dcli = DockerClient(base_url=base_url)
+        self.ttl = ttl
+        self._images = dict()
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._last_refresh = 0
+        self.refreshes = 0
+        if watch_events:
+            t = threading.Thread(target=self._watch_events, name="image-catalog-events")
+            t.daemon = True
+            t.start()
+
+    @property
+    def images(self):
+        """
+        :return: dict: image name -> Image (refreshed if needed)
+        """
+        if self._dirty or time.time() - self._last_refresh > self.ttl:
+            self.refresh()
+        return self._images
+
+    def refresh(self):
+        """
+        Ask the Docker daemon for the list of images now.
+        """
+        with self._lock:
+            # clear the flag first, so that an event during the listing triggers another refresh
+            self._dirty = False
+            try:
+                docker_images = self.dcli.images.list()
+            except Exception:
+                LOG.exception("Could not list the docker images.")
+                self._dirty = True
+                return self._images
+            for image in docker_images:
+                for t in image.tags:
+                    t = t.replace(":latest", "")  # only use short tag names for OSM compatibility
+                    if t not in self._images:
+                        self._images[t] = Image(t)
+            self._last_refresh = time.time()
+            self.refreshes += 1
+        return self._images
+
+    def invalidate(self):
+        """
+        Refresh the catalog on the next access.
+        """
+        self._dirty = True
+
+    def _watch_events(self):
+        while True:
+            try:
+                for event in self.dcli.events(decode=True, filters={"type": "image"}):
+                    LOG.debug("Docker image event: %s %s" % (event.get("Action", event.get("status")),
+                                                             event.get("id")))
+                    self.invalidate()
+            except Exception as ex:
+                LOG.debug("Docker event stream broke: %s" % ex)
+            # we might have missed events
+            self.invalidate()
+            time.sleep(EVENT_RECONNECT_DELAY)
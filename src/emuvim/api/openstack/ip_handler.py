@@ -26,16 +26,15 @@ acknowledge the contributions of their colleagues of the SONATA
 partner consortium (www.sonata-nfv.eu).
 """
 from resources.net import Net
-import threading
+from ip_pool import AddressPool
 
-lock = threading.Lock()
-
-__issued_ips = dict()
 __default_subnet_size = 256
 __default_subnet_bitmask = 24
 __first_ip = Net.ip_2_int('10.0.0.0')
 __last_ip = Net.ip_2_int('10.255.255.255')
-__current_ip = __first_ip
+
+# base address of the issued CIDRs -> subnet UUID, the pool does its own locking
+__issued_ips = AddressPool(__first_ip, __last_ip - 1, step=__default_subnet_size)
 
 
 def get_new_cidr(uuid):
@@ -47,20 +46,28 @@ def get_new_cidr(uuid):
     :return: Returns None if all available CIDR are used. Otherwise returns a valid CIDR.
     :rtype: ``str``
     """
-    global lock
-    lock.acquire()
+    int_ip = __issued_ips.allocate(uuid)
+    if int_ip is None:
+        return None
 
-    global __current_ip
-    while __first_ip <= __current_ip < __last_ip and __current_ip in __issued_ips:
-        __current_ip += __default_subnet_size
+    return Net.int_2_ip(int_ip) + '/' + str(__default_subnet_bitmask)
 
-    if __current_ip >= __last_ip or __current_ip < __first_ip or __current_ip in __issued_ips:
-        return None
 
-    __issued_ips[__current_ip] = uuid
-    lock.release()
+def get_new_cidrs(uuids):
+    """
+    Calculates unused cidrs for a list of subnets at once, e.g. for all subnets of a stack.
+
+    :param uuids: The UUIDs of the subnets
+    :type uuids: ``list``
+    :return: Returns None if there are not enough unused CIDRs left (none is issued then).
+        Otherwise returns a list of CIDRs (same order as uuids).
+    :rtype: ``list``
+    """
+    int_ips = __issued_ips.allocate_many(uuids)
+    if int_ips is None:
+        return None
 
-    return Net.int_2_ip(__current_ip) + '/' + str(__default_subnet_bitmask)
+    return [Net.int_2_ip(int_ip) + '/' + str(__default_subnet_bitmask) for int_ip in int_ips]
 
 
 def free_cidr(cidr, uuid):
@@ -77,20 +84,9 @@ def free_cidr(cidr, uuid):
     if cidr is None:
         return False
 
-    global __current_ip
     int_ip = Net.cidr_2_int(cidr)
 
-    global lock
-    lock.acquire()
-
-    if int_ip in __issued_ips and __issued_ips[int_ip] == uuid:
-        del __issued_ips[int_ip]
-        if int_ip < __current_ip:
-            __current_ip = int_ip
-        lock.release()
-        return True
-    lock.release()
-    return False
+    return __issued_ips.withdraw(int_ip, uuid)
 
 
 def is_cidr_issued(cidr):
@@ -131,7 +127,7 @@ def is_my_cidr(cidr, uuid):
     if not int_ip in __issued_ips:
         return False
 
-    if __issued_ips[int_ip] == uuid:
+    if __issued_ips.owner(int_ip) == uuid:
         return True
     return False
 
@@ -152,11 +148,4 @@ def assign_cidr(cidr, uuid):
 
     int_ip = Net.cidr_2_int(cidr)
 
-    if int_ip in __issued_ips:
-        return False
-
-    global lock
-    lock.acquire()
-    __issued_ips[int_ip] = uuid
-    lock.release()
-    return True
+    return __issued_ips.assign(int_ip, uuid)
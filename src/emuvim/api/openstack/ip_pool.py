@@ -0,0 +1,160 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import heapq
+import threading
+
+# withdraw an address regardless of its owner
+ANY_OWNER = object()
+
+
+class AddressPool(object):
+    """
+    Keeps track of the issued addresses (or subnet base addresses) of an address range.
+
+    Addresses are ints in [first, last] with a fixed step (e.g. 1 for host addresses,
+    256 for /24 subnets). New addresses are always the lowest free ones, as before,
+    but instead of probing from the start of the range on every call, the pool keeps
+    a counter for the part of the range that was never handed out and a heap of the
+    withdrawn addresses below it. Allocate, assign and withdraw are O(1) (O(log n) for
+    re-used addresses), filling a whole range costs linear time.
+    """
+
+    def __init__(self, first, last, step=1):
+        self.first = first
+        self.last = last
+        self.step = step
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Withdraw all addresses.
+        """
+        with self._lock:
+            # address -> owner
+            self._issued = dict()
+            # lowest address that was never considered by allocate
+            self._next = self.first
+            # withdrawn addresses below _next (may contain addresses that were assigned again)
+            self._free = list()
+
+    def allocate(self, owner):
+        """
+        Issue the lowest free address.
+        :param owner: e.g. the port name or subnet id
+        :return: address as int or None if the range is exhausted
+        """
+        with self._lock:
+            return self._allocate(owner)
+
+    def allocate_many(self, owners):
+        """
+        Issue one address per owner in a single step (e.g. for all ports of a stack).
+        Either all owners get an address or none.
+        :param owners: list of owners
+        :return: list of addresses (same order as owners) or None if the range is exhausted
+        """
+        with self._lock:
+            addresses = list()
+            for owner in owners:
+                address = self._allocate(owner)
+                if address is None:
+                    for a in addresses:
+                        self._withdraw(a)
+                    return None
+                addresses.append(address)
+            return addresses
+
+    def assign(self, address, owner):
+        """
+        Issue a specific address.
+        :return: False if the address is already issued
+        """
+        with self._lock:
+            if address in self._issued:
+                return False
+            self._issued[address] = owner
+            return True
+
+    def set_owner(self, address, owner):
+        """
+        Change the owner of an address (issues the address if it is not issued yet).
+        """
+        with self._lock:
+            self._issued[address] = owner
+
+    def withdraw(self, address, owner=ANY_OWNER):
+        """
+        Give an address back.
+        :param owner: if given, the address is only withdrawn if it belongs to this owner
+        :return: True if the address was withdrawn
+        """
+        with self._lock:
+            if address not in self._issued:
+                return False
+            if owner is not ANY_OWNER and self._issued[address] != owner:
+                return False
+            self._withdraw(address)
+            return True
+
+    def owner(self, address):
+        """
+        :return: owner of the address or None if it is not issued
+        """
+        return self._issued.get(address)
+
+    def __contains__(self, address):
+        return address in self._issued
+
+    def __len__(self):
+        return len(self._issued)
+
+    def _allocate(self, owner):
+        address = None
+        # lowest withdrawn address first, skip the ones that have been assigned again
+        while self._free:
+            candidate = heapq.heappop(self._free)
+            if candidate not in self._issued:
+                address = candidate
+                break
+        # then the part of the range that was never handed out
+        while address is None and self._next <= self.last:
+            candidate = self._next
+            self._next += self.step
+            if candidate not in self._issued:
+                address = candidate
+        if address is None:
+            return None
+        self._issued[address] = owner
+        return address
+
+    def _withdraw(self, address):
+        del self._issued[address]
+        # addresses above the counter are found by allocate anyway, unaligned ones are never allocated
+        if self.first <= address < self._next and (address - self.first) % self.step == 0:
+            heapq.heappush(self._free, address)
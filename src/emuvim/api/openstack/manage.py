@@ -36,11 +36,11 @@ partner consortium (www.sonata-nfv.eu).
 import logging
 import threading
 import uuid
-import networkx as nx
 import chain_api
 import json
 import random
 from emuvim.api.openstack.resources import Net, Port
+from emuvim.dcemulator.idpool import IdPool
 from mininet.node import OVSSwitch, RemoteController, Node
 
 
@@ -66,8 +66,8 @@ class OpenstackManage(object):
             self.init = True
 
         self.endpoints = dict()
-        self.cookies = set()
-        self.cookies.add(0)
+        # cookies are also used as table ids by the loadbalancers, so released ones are reused first
+        self.cookie_pool = IdPool("cookie", 1, 0xffffffff, recycle_first=True)
         self.ip = ip
         self.port = port
         self._net = None
@@ -82,6 +82,9 @@ class OpenstackManage(object):
         # flow groups could be handled for each switch separately, but this global group counter should be easier to
         # debug and to maintain
         self.flow_groups = dict()
+        self.flow_group_pool = IdPool("flow_group", 1, 0xffffff00, recycle_first=True)
+        # (src_vnf, src_intf) -> vlan tags used by the paths of a loadbalancer
+        self.lb_vlans = dict()
 
         # we want one global chain api. this should not be datacenter dependent!
         self.chain = chain_api.ChainApi(ip, port, self)
@@ -96,6 +99,8 @@ class OpenstackManage(object):
         self.floating_netmask = "192.168.100.0/24"
         self.floating_nodes = dict()
         self.floating_cookies = dict()
+        # cookie -> vlan tags used by the paths of a floating loadbalancer
+        self.floating_vlans = dict()
         self.floating_intf = None
         self.floating_links = dict()
 
@@ -168,9 +173,7 @@ class OpenstackManage(object):
         :return: Cookie
         :rtype: ``int``
         """
-        cookie = int(max(self.cookies) + 1)
-        self.cookies.add(cookie)
-        return cookie
+        return self.cookie_pool.allocate()
 
     def get_flow_group(self, src_vnf_name, src_vnf_interface):
         """
@@ -184,7 +187,7 @@ class OpenstackManage(object):
         :rtype: ``int``
         """
         if (src_vnf_name, src_vnf_interface) not in self.flow_groups:
-            grp = int(len(self.flow_groups) + 1)
+            grp = self.flow_group_pool.allocate()
             self.flow_groups[(src_vnf_name, src_vnf_interface)] = grp
         else:
             grp = self.flow_groups[(src_vnf_name, src_vnf_interface)]
@@ -249,8 +252,11 @@ class OpenstackManage(object):
                 else:
                     match = "dl_dst=%s" % dst_intf.MAC()
 
-            cookie = kwargs.get('cookie', self.get_cookie())
-            self.cookies.add(cookie)
+            cookie = kwargs.get('cookie')
+            if cookie is None:
+                cookie = self.get_cookie()
+            else:
+                self.cookie_pool.reserve(cookie)
             c = self.net.setChain(
                 vnf_src_name, vnf_dst_name,
                 vnf_src_interface=vnf_src_interface,
@@ -385,16 +391,10 @@ class OpenstackManage(object):
         """
         src_sw = None
         src_sw_inport_nr = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_interface or
-                            link_dict[link][
-                                'src_port_name'] == vnf_interface):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
+        switch_port = self.net.find_connected_switch_port(vnf_name, vnf_interface)
+        if switch_port is not None:
+            src_sw = switch_port.switch
+            src_sw_inport_nr = switch_port.port_nr
 
         return src_sw, src_sw_inport_nr
 
@@ -415,37 +415,18 @@ class OpenstackManage(object):
         :rtype: ``list``, ``str``, ``str``
         """
         # modified version of the _chainAddFlow from emuvim.dcemulator.net._chainAddFlow
-        src_sw = None
-        dst_sw = None
         logging.debug("Find shortest path from vnf %s to %s",
                       src_vnf, dst_vnf)
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(src_vnf):
-            link_dict = self.net.DCNetwork_graph[src_vnf][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == src_vnf_intf or
-                            link_dict[link][
-                                'src_port_name'] == src_vnf_intf):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    break
-
-        for connected_sw in self.net.DCNetwork_graph.neighbors(dst_vnf):
-            link_dict = self.net.DCNetwork_graph[connected_sw][dst_vnf]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == dst_vnf_intf or \
-                                link_dict[link][
-                                    'dst_port_name'] == dst_vnf_intf:
-                    # found the right link and connected
-                    dst_sw = connected_sw
-                    break
+        src_sw, _ = self._get_connected_switch_data(src_vnf, src_vnf_intf)
+        dst_sw, _ = self._get_connected_switch_data(dst_vnf, dst_vnf_intf)
         logging.debug("From switch %s to %s " % (src_sw, dst_sw))
 
         # get shortest path
         try:
             # returns the first found shortest path
             # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.net.DCNetwork_graph, src_sw, dst_sw)
+            path = self.net.getShortestPath(src_sw, dst_sw)
         except:
             logging.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 src_vnf, dst_vnf, src_sw, dst_sw))
@@ -488,13 +469,10 @@ class OpenstackManage(object):
             raise Exception(u"Source VNF %s or intfs %s does not exist" % (src_vnf_name, src_vnf_interface))
 
         # find the switch belonging to the source interface, as well as the inport nr
-        for connected_sw in net.DCNetwork_graph.neighbors(src_vnf_name):
-            link_dict = net.DCNetwork_graph[src_vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_name'] == src_vnf_interface:
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
+        switch_port = net.find_connected_switch_port(src_vnf_name, src_vnf_interface)
+        if switch_port is not None:
+            src_sw = switch_port.switch
+            src_sw_inport_nr = switch_port.port_nr
 
         if src_sw is None or src_sw_inport_nr == 0:
             raise Exception(u"Source VNF or interface can not be found.")
@@ -503,11 +481,9 @@ class OpenstackManage(object):
         for vnf_name in dest_intfs_mapping:
             if vnf_name not in net.DCNetwork_graph:
                 raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
+            switch_port = net.find_connected_switch_port(vnf_name, dest_intfs_mapping[vnf_name])
+            if switch_port is not None:
+                dest_vnf_outport_nrs.append(int(switch_port.port_nr))
         # get first switch
         if (src_vnf_name, src_vnf_interface) not in self.lb_flow_cookies:
             self.lb_flow_cookies[(src_vnf_name, src_vnf_interface)] = list()
@@ -579,9 +555,8 @@ class OpenstackManage(object):
 
             # choose free vlan if path contains more than 1 switch
             if len(path) > 1:
-                vlan = net.vlans.pop()
-                if vlan == 0:
-                    vlan = net.vlans.pop()
+                vlan = net.vlan_pool.allocate()
+                self.lb_vlans.setdefault((src_vnf_name, src_vnf_interface), list()).append(vlan)
             else:
                 vlan = None
 
@@ -753,11 +728,9 @@ class OpenstackManage(object):
         for vnf_name in dest_intfs_mapping:
             if vnf_name not in net.DCNetwork_graph:
                 raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
+            switch_port = net.find_connected_switch_port(vnf_name, dest_intfs_mapping[vnf_name])
+            if switch_port is not None:
+                dest_vnf_outport_nrs.append(int(switch_port.port_nr))
 
         if len(dest_vnf_outport_nrs) == 0:
             raise Exception("There are no paths specified for the loadbalancer")
@@ -787,6 +760,8 @@ class OpenstackManage(object):
 
             if isinstance(path, dict):
                 self.delete_flow_by_cookie(cookie)
+                for vlan in self.floating_vlans.pop(cookie, list()):
+                    net.vlan_pool.release(vlan)
                 raise Exception(u"Can not find a valid path. Are you specifying the right interfaces?.")
 
             intf = net[dst_vnf_name].nameToIntf[dst_vnf_interface]
@@ -795,7 +770,8 @@ class OpenstackManage(object):
             dst_sw_outport_nr = dest_vnf_outport_nrs[index]
             current_hop = src_sw
             switch_inport_nr = src_sw_inport_nr
-            vlan = net.vlans.pop()
+            vlan = net.vlan_pool.allocate()
+            self.floating_vlans.setdefault(cookie, list()).append(vlan)
 
             # iterate all switches on the path
             for i in range(0, len(path)):
@@ -984,7 +960,7 @@ class OpenstackManage(object):
             if self.net.controller == RemoteController:
                 self.net.ryu_REST('stats/flowentry/delete', data=flow)
 
-        self.cookies.remove(cookie)
+        self.cookie_pool.release(cookie)
         return True
 
     def delete_chain_by_intf(self, src_vnf_name, src_vnf_intf, dst_vnf_name, dst_vnf_intf):
@@ -1016,6 +992,8 @@ class OpenstackManage(object):
         if success:
             del self.chain_flow_cookies[target_flow]
             del self.full_chain_data[target_flow]
+            # the flowrules are gone, so the vlan tag of the chain can be reused
+            self.net.releaseChain(src_vnf_name, src_vnf_intf, dst_vnf_name, dst_vnf_intf)
             return True
         return False
 
@@ -1029,19 +1007,22 @@ class OpenstackManage(object):
         flows = list()
         # we have to call delete-group for each switch
         delete_group = list()
-        group_id = self.get_flow_group(vnf_src_name, vnf_src_interface)
+        target_pair = (vnf_src_name, vnf_src_interface)
+        group_id = self.flow_groups.get(target_pair)
+        lb_cookies = self.lb_flow_cookies.pop(target_pair, list())
         for node in self.net.switches:
-            for cookie in self.lb_flow_cookies[(vnf_src_name, vnf_src_interface)]:
+            for cookie in lb_cookies:
                 flow = dict()
                 flow["dpid"] = int(node.dpid, 16)
                 flow["cookie"] = cookie
                 flow['cookie_mask'] = int('0xffffffffffffffff', 16)
 
                 flows.append(flow)
-            group_del = dict()
-            group_del["dpid"] = int(node.dpid, 16)
-            group_del["group_id"] = group_id
-            delete_group.append(group_del)
+            if group_id is not None:
+                group_del = dict()
+                group_del["dpid"] = int(node.dpid, 16)
+                group_del["group_id"] = group_id
+                delete_group.append(group_del)
 
         for flow in flows:
             logging.debug("Deleting flowentry with cookie %d belonging to lb at %s:%s" % (
@@ -1054,12 +1035,15 @@ class OpenstackManage(object):
             if self.net.controller == RemoteController:
                 self.net.ryu_REST("stats/groupentry/delete", data=switch_del_group)
 
-        # unmap groupid from the interface
-        target_pair = (vnf_src_name, vnf_src_interface)
+        # unmap groupid from the interface and give all ids of the loadbalancer back
         if target_pair in self.flow_groups:
-            del self.flow_groups[target_pair]
+            self.flow_group_pool.release(self.flow_groups.pop(target_pair))
         if target_pair in self.full_lb_data:
             del self.full_lb_data[target_pair]
+        for cookie in lb_cookies:
+            self.cookie_pool.release(cookie)
+        for vlan in self.lb_vlans.pop(target_pair, list()):
+            self.net.vlan_pool.release(vlan)
 
     def delete_floating_lb(self, cookie):
         """
@@ -1073,8 +1057,10 @@ class OpenstackManage(object):
             raise Exception("Can not delete floating loadbalancer as the flowcookie is not known")
 
         self.delete_flow_by_cookie(cookie)
-        floating_ip = self.floating_cookies[cookie]
+        floating_ip = self.floating_cookies.pop(cookie)
         self.floating_network.withdraw_ip_address(floating_ip)
+        for vlan in self.floating_vlans.pop(cookie, list()):
+            self.net.vlan_pool.release(vlan)
 
     def set_arp_entry(self, vnf_name, vnf_interface, ip, mac):
         """
@@ -30,9 +30,11 @@ from openstack_dummies import *
 import logging
 import threading
 import compute
-import requests
-import socket
-import time
+from emuvim.dcemulator import startup
+
+
+# max. seconds to wait until an endpoint accepts connections
+PORT_WAIT_TIMEOUT = 10.0
 
 
 class OpenstackApiEndpoint():
@@ -87,6 +89,9 @@ class OpenstackApiEndpoint():
     def start(self, wait_for_port=False):
         """
         Start all connected OpenStack endpoints that are connected to this API endpoint.
+        All endpoints are started first, so they come up in parallel.
+
+        :param wait_for_port: wait until all endpoints accept connections
         """
         for component in self.openstack_endpoints.values():
             component.compute = self.compute
@@ -95,29 +100,25 @@ class OpenstackApiEndpoint():
             thread.daemon = True
             thread.name = component.__class__
             thread.start()
-            if wait_for_port:
+        if wait_for_port:
+            for component in self.openstack_endpoints.values():
                 self._wait_for_port(component.ip, component.port)
-                
 
     def stop(self):
         """
         Stop all connected OpenStack endpoints that are connected to this API endpoint.
+        The endpoints are stopped in parallel, each of them finishes its running requests first.
         """
+        threads = list()
         for component in self.openstack_endpoints.values():
-            url = "http://" + component.ip + ":" + str(component.port) + "/shutdown"
-            try:
-                requests.get(url)
-            except:
-                # seems to be stopped
-                pass
+            thread = threading.Thread(target=component.stop, args=())
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
 
     def _wait_for_port(self, ip, port):
-        for i in range(0, 10):
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(1)  # 1 Second Timeout
-            r = s.connect_ex((ip, port))
-            if r == 0:
-                break  # port is open proceed
-            else:
-                logging.warning("Waiting for {}:{} ... ({}/10)".format(ip, port, i + 1))
-            time.sleep(1)
+        # probe with a short backoff instead of 1s steps
+        if not startup.wait_for_port(ip, port, timeout=PORT_WAIT_TIMEOUT):
+            logging.warning("Endpoint {}:{} not reachable after {}s".format(ip, port, PORT_WAIT_TIMEOUT))
@@ -27,6 +27,8 @@ partner consortium (www.sonata-nfv.eu).
 """
 from flask import Flask, request
 from flask_restful import Api, Resource
+from emuvim.api.openstack.wsgi_server import ApiServer
+from emuvim.api.openstack.playbook import get_playbook_writer, PLAYBOOK_FILE
 import logging
 
 LOG = logging.getLogger("api.openstack.base")
@@ -42,26 +44,32 @@ class BaseOpenstackDummy(Resource):
         self.port = port
         self.compute = None
         self.manage = None
-        self.playbook_file = '/tmp/son-emu-requests.log'
-        with open(self.playbook_file, 'w'):
-            pass
+        self.playbook_file = PLAYBOOK_FILE
+        # shared by all endpoints, writes in the background
+        self.playbook = get_playbook_writer(self.playbook_file)
+        self.playbook.reset()
 
         # setup Flask
         self.app = Flask(__name__)
         self.api = Api(self.app)
+        # concurrent WSGI server (see wsgi_server for the server model and its settings)
+        self.http_server = ApiServer(self.app, self.ip, self.port)
 
     def _start_flask(self):
         LOG.info("Starting %s endpoint @ http://%s:%d" % (__name__, self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
+
+    def stop(self):
+        """
+        Stop the endpoint gracefully: running requests are finished, new connections are refused.
+
+        :return: True if the endpoint has been stopped in time
+        :rtype: ``bool``
+        """
+        return self.http_server.shutdown()
 
     def dump_playbook(self):
-        with self.manage.lock:
-            with open(self.playbook_file, 'a') as logfile:
-                if len(request.data) > 0:
-                    data = "# %s API\n" % str(self.__class__).split('.')[-1].rstrip('\'>')
-                    data += "curl -X {type} -H \"Content-type: application/json\" -d '{data}' {url}".format(type=request.method,
-                                                                                            data=request.data,
-                                                                                            url=request.url)
-                    logfile.write(data + "\n")
+        if len(request.data) > 0:
+            self.playbook.record(self.__class__.__name__, request.method, request.data, request.url)
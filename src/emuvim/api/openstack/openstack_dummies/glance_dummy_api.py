@@ -67,7 +67,7 @@ class GlanceDummyApi(BaseOpenstackDummy):
         LOG.info("Starting %s endpoint @ http://%s:%d" % ("GlanceDummyApi", self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
 
 
 class Shutdown(Resource):
@@ -180,8 +180,9 @@ class GlanceListImagesApi(Resource):
             img_is_public = True if "public" in body_data.get("visibility") else False
             img_container_format = body_data.get("container_format")
         # try to find ID of already existing image (matched by name)
+        # the image was probably just added to Docker, so do not rely on the cached catalog
         img_id = None
-        for image in self.api.compute.images.values():
+        for image in self.api.compute.refresh_images().values():
             if str(img_name) in image.name:
                 img_id = image.id
         LOG.debug("Image name: %s" % img_name)
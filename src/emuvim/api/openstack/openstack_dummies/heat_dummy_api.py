@@ -73,7 +73,7 @@ class HeatDummyApi(BaseOpenstackDummy):
         LOG.info("Starting %s endpoint @ http://%s:%d" % (__name__, self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
 
 
 class Shutdown(Resource):
@@ -130,33 +130,35 @@ class HeatCreateStack(Resource):
 
         try:
             stack_dict = json.loads(request.data)
-            for stack in self.api.compute.stacks.values():
-                if stack.stack_name == stack_dict['stack_name']:
-                    return [], 409
-            stack = Stack()
-            stack.stack_name = stack_dict['stack_name']
-
-            reader = HeatParser(self.api.compute)
-            if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
-                stack_dict['template'] = json.loads(stack_dict['template'])
-            if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label):
-                self.api.compute.clean_broken_stack(stack)
-                return 'Could not create stack.', 400
-
-            stack.template = stack_dict['template']
-            stack.creation_time = str(datetime.now())
-            stack.status = "CREATE_COMPLETE"
-
-            return_dict = {"stack": {"id": stack.id,
-                                     "links": [
-                                         {
-                                             "href": "http://%s:%s/v1/%s/stacks/%s"
-                                                     % (get_host(request), self.api.port, tenant_id, stack.id),
-                                             "rel": "self"
-                                         }]}}
-
-            self.api.compute.add_stack(stack)
-            self.api.compute.deploy_stack(stack.id)
+            # the name check and the creation of the stack have to be done in one step
+            with self.api.compute.lock:
+                for stack in self.api.compute.stacks.values():
+                    if stack.stack_name == stack_dict['stack_name']:
+                        return [], 409
+                stack = Stack()
+                stack.stack_name = stack_dict['stack_name']
+
+                reader = HeatParser(self.api.compute)
+                if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
+                    stack_dict['template'] = json.loads(stack_dict['template'])
+                if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label):
+                    self.api.compute.clean_broken_stack(stack)
+                    return 'Could not create stack.', 400
+
+                stack.template = stack_dict['template']
+                stack.creation_time = str(datetime.now())
+                stack.status = "CREATE_COMPLETE"
+
+                return_dict = {"stack": {"id": stack.id,
+                                         "links": [
+                                             {
+                                                 "href": "http://%s:%s/v1/%s/stacks/%s"
+                                                         % (get_host(request), self.api.port, tenant_id, stack.id),
+                                                 "rel": "self"
+                                             }]}}
+
+                self.api.compute.add_stack(stack)
+                self.api.compute.deploy_stack(stack.id)
             return Response(json.dumps(return_dict), status=201, mimetype="application/json")
 
         except Exception as ex:
@@ -355,34 +357,36 @@ class HeatUpdateStack(Resource):
             202, if everything worked out.
         """
         try:
-            old_stack = None
-            if stack_name_or_id in self.api.compute.stacks:
-                old_stack = self.api.compute.stacks[stack_name_or_id]
-            else:
-                for tmp_stack in self.api.compute.stacks.values():
-                    if tmp_stack.stack_name == stack_name_or_id:
-                        old_stack = tmp_stack
-            if old_stack is None:
-                return 'Could not resolve Stack - ID', 404
-
-            stack_dict = json.loads(request.data)
-
-            stack = Stack()
-            stack.stack_name = old_stack.stack_name
-            stack.id = old_stack.id
-            stack.creation_time = old_stack.creation_time
-            stack.update_time = str(datetime.now())
-            stack.status = "UPDATE_COMPLETE"
-
-            reader = HeatParser(self.api.compute)
-            if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
-                stack_dict['template'] = json.loads(stack_dict['template'])
-            if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label, stack_update=True):
-                return 'Could not create stack.', 400
-            stack.template = stack_dict['template']
-
-            if not self.api.compute.update_stack(old_stack.id, stack):
-                return 'Could not update stack.', 400
+            # the stack must not be changed or deleted by another request during the update
+            with self.api.compute.lock:
+                old_stack = None
+                if stack_name_or_id in self.api.compute.stacks:
+                    old_stack = self.api.compute.stacks[stack_name_or_id]
+                else:
+                    for tmp_stack in self.api.compute.stacks.values():
+                        if tmp_stack.stack_name == stack_name_or_id:
+                            old_stack = tmp_stack
+                if old_stack is None:
+                    return 'Could not resolve Stack - ID', 404
+
+                stack_dict = json.loads(request.data)
+
+                stack = Stack()
+                stack.stack_name = old_stack.stack_name
+                stack.id = old_stack.id
+                stack.creation_time = old_stack.creation_time
+                stack.update_time = str(datetime.now())
+                stack.status = "UPDATE_COMPLETE"
+
+                reader = HeatParser(self.api.compute)
+                if isinstance(stack_dict['template'], str) or isinstance(stack_dict['template'], unicode):
+                    stack_dict['template'] = json.loads(stack_dict['template'])
+                if not reader.parse_input(stack_dict['template'], stack, self.api.compute.dc.label, stack_update=True):
+                    return 'Could not create stack.', 400
+                stack.template = stack_dict['template']
+
+                if not self.api.compute.update_stack(old_stack.id, stack):
+                    return 'Could not update stack.', 400
 
             return Response(status=202, mimetype="application/json")
 
@@ -407,15 +411,17 @@ class HeatDeleteStack(Resource):
         """
         LOG.debug("API CALL: %s DELETE" % str(self.__class__.__name__))
         try:
-            if stack_name_or_id in self.api.compute.stacks:
-                self.api.compute.delete_stack(stack_name_or_id)
-                return Response('Deleted Stack: ' + stack_name_or_id, 204)
-
-            for stack in self.api.compute.stacks.values():
-                if stack.stack_name == stack_name_or_id:
-                    self.api.compute.delete_stack(stack.id)
+            # the stack must not be changed by another request during the deletion
+            with self.api.compute.lock:
+                if stack_name_or_id in self.api.compute.stacks:
+                    self.api.compute.delete_stack(stack_name_or_id)
                     return Response('Deleted Stack: ' + stack_name_or_id, 204)
 
+                for stack in self.api.compute.stacks.values():
+                    if stack.stack_name == stack_name_or_id:
+                        self.api.compute.delete_stack(stack.id)
+                        return Response('Deleted Stack: ' + stack_name_or_id, 204)
+
         except Exception as ex:
             LOG.exception("Heat: Delete Stack exception")
             return ex.message, 500
@@ -50,7 +50,7 @@ class KeystoneDummyApi(BaseOpenstackDummy):
         LOG.info("Starting %s endpoint @ http://%s:%d" % (__name__, self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
 
 
 class Shutdown(Resource):
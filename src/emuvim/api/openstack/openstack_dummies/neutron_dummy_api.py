@@ -141,7 +141,7 @@ class NeutronDummyApi(BaseOpenstackDummy):
         LOG.info("Starting %s endpoint @ http://%s:%d" % (__name__, self.ip, self.port))
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
 
 
 class Shutdown(Resource):
@@ -376,6 +376,7 @@ class NeutronUpdateNetwork(Resource):
                     pass  # tmp_network_dict["subnets"] = None
                 if "name" in network_dict["network"] and net.name != network_dict["network"]["name"]:
                     net.name = network_dict["network"]["name"]
+                    self.api.compute.nets.reindex(net.id)
                 if "admin_state_up" in network_dict["network"]:
                     pass  # tmp_network_dict["admin_state_up"] = True
                 if "tenant_id" in network_dict["network"]:
@@ -838,8 +839,8 @@ class NeutronUpdatePort(Resource):
 
             stack = None
             for s in self.api.compute.stacks.values():
-                for port in s.ports.values():
-                    if port.id == port_id:
+                for p in s.ports.values():
+                    if p.id == port_id:
                         stack = s
             if "admin_state_up" in port_dict["port"]:
                 pass
@@ -855,6 +856,8 @@ class NeutronUpdatePort(Resource):
                 port.mac_address = port_dict["port"]["mac_address"]
             if "name" in port_dict["port"] and port_dict["port"]["name"] != port.name:
                 port.set_name(port_dict["port"]["name"])
+                # the port is still stored under its old id
+                self.api.compute.ports.reindex(old_port.id)
                 if stack is not None:
                     if port.net_name in stack.nets:
                         stack.nets[port.net_name].update_port_name_for_ip_address(port.ip_address, port.name)
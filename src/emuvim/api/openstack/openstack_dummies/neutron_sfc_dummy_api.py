@@ -81,6 +81,7 @@ class PortPairsUpdate(SFC):
             port_pair = self.api.compute.find_port_pair_by_name_or_id(pair_id)
             if "name" in request_dict:
                 port_pair.name = request_dict["name"]
+                self.api.compute.port_pairs.reindex(port_pair.id)
             if "description" in request_dict:
                 port_pair.description = request_dict["description"]
 
@@ -171,6 +172,7 @@ class PortPairGroupUpdate(SFC):
             port_pair_group = self.api.compute.find_port_pair_group_by_name_or_id(group_id)
             if "name" in request_dict:
                 port_pair_group.name = request_dict["name"]
+                self.api.compute.port_pair_groups.reindex(port_pair_group.id)
             if "description" in request_dict:
                 port_pair_group.description = request_dict["description"]
             if "port_pairs" in request_dict:
@@ -282,6 +284,7 @@ class FlowClassifierUpdate(SFC):
             flow_classifier = self.api.compute.find_flow_classifier_by_name_or_id(flow_classifier_id)
             if "name" in request_dict:
                 flow_classifier.name = request_dict["name"]
+                self.api.compute.flow_classifiers.reindex(flow_classifier.id)
             if "description" in request_dict:
                 flow_classifier.description = request_dict["description"]
 
@@ -376,6 +379,7 @@ class PortChainUpdate(SFC):
         port_chain = self.api.compute.find_port_chain_by_name_or_id(chain_id)
         if "name" in request_dict:
             port_chain.name = request_dict["name"]
+            self.api.compute.port_chains.reindex(port_chain.id)
         if "description" in request_dict:
             port_chain.description = request_dict["description"]
         if "flow_classfiers" in request_dict:
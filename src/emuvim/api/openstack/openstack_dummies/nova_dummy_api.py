@@ -84,7 +84,7 @@ class NovaDummyApi(BaseOpenstackDummy):
         self.compute.add_flavor('m1.small', 1, 1024, "MB", 2, "GB")
         if self.app is not None:
             self.app.before_request(self.dump_playbook)
-            self.app.run(self.ip, self.port, debug=True, use_reloader=False)
+            self.http_server.serve_forever()
 
 
 class Shutdown(Resource):
@@ -254,6 +254,7 @@ class NovaListServersApi(Resource):
             server = self.api.compute.create_server(name)
             server.full_name = str(self.api.compute.dc.label) + "_man_" + server_dict["name"]
             server.template_name = server_dict["name"]
+            self.api.compute.computeUnits.reindex(server.id)
             if "metadata" in server_dict:
                 server.properties = server_dict["metadata"]
 
@@ -348,6 +349,7 @@ class NovaListServersDetailed(Resource):
 
         try:
             resp = {"servers": list()}
+            images = self.api.compute.images
             for server in self.api.compute.computeUnits.values():
                 s = server.create_server_dict(self.api.compute)
                 s['links'] = [{'href': "http://%s:%d/v2.1/%s/servers/%s" % (get_host(request),
@@ -367,7 +369,7 @@ class NovaListServersDetailed(Resource):
                         }
                     ]
                 }
-                image = self.api.compute.images[server.image]
+                image = images[server.image]
                 s['image'] = {
                     "id": image.id,
                     "links": [
@@ -0,0 +1,218 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+LOG = logging.getLogger("api.openstack.playbook")
+
+# default file of the request playbook (curl commands that replay all API requests with a body)
+PLAYBOOK_FILE = '/tmp/son-emu-requests.log'
+# record the requests at all
+PLAYBOOK_ENABLED = True
+# max. seconds between two writes of the background writer
+FLUSH_INTERVAL = 0.5
+# requests that are written in one go, the writer is woken up early once they are queued
+FLUSH_BATCH = 100
+# max. number of requests waiting to be written, further requests are dropped (and counted)
+MAX_PENDING = 10000
+# rotate the playbook when it gets bigger than this (bytes), 0 = never
+MAX_BYTES = 64 * 1024 * 1024
+# number of rotated playbooks that are kept (<file>.1 ... <file>.n)
+BACKUP_COUNT = 3
+
+_writers = dict()
+_writers_lock = threading.Lock()
+
+
+def get_playbook_writer(path=PLAYBOOK_FILE):
+    """
+    The playbook writer of the given file, shared by all API endpoints that record into it.
+    """
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = PlaybookWriter(path)
+        return _writers[path]
+
+
+class PlaybookWriter(object):
+    """
+    Records API requests as curl commands without blocking the requests.
+
+    record() only appends to a queue. A background thread writes the queued requests in batches
+    to the playbook file, which stays open, and rotates the file when it gets too big.
+    """
+
+    def __init__(self, path, enabled=None, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH,
+                 max_pending=MAX_PENDING, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = path
+        self.enabled = PLAYBOOK_ENABLED if enabled is None else enabled
+        self.flush_interval = flush_interval
+        self.flush_batch = max(1, flush_batch)
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.written = 0
+        self.dropped = 0
+        # appends and pops of a deque are atomic, the request threads never wait for the writer
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        # own lock for the file, independent of any other lock of the emulator
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="playbook-writer")
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, api_name, method, data, url):
+        """
+        Queue a request for the playbook.
+
+        :param api_name: name of the API, written as comment before the request
+        :param method: HTTP method
+        :param data: request body
+        :param url: request url
+        """
+        if not self.enabled or self._closed:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((api_name, method, data, url))
+        if len(self._pending) >= self.flush_batch:
+            self._wakeup.set()
+
+    def reset(self):
+        """
+        Start a new, empty playbook (the queued requests are written into the new one).
+        """
+        self._pending.append(None)
+        self._wakeup.set()
+
+    def flush(self, timeout=5.0):
+        """
+        Write all queued requests now.
+
+        :param timeout: max. seconds to wait for the writer
+        :return: True if the queue has been written
+        """
+        marker = _FlushMarker()
+        self._pending.append(marker)
+        self._wakeup.set()
+        marker.done.wait(timeout)
+        return marker.done.is_set()
+
+    def close(self):
+        """
+        Write the queued requests and close the playbook.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(1.0)
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._write_pending()
+            except Exception:
+                LOG.exception("Writing the request playbook %s failed." % self.path)
+
+    def _write_pending(self):
+        lines = list()
+        while self._pending:
+            entry = self._pending.popleft()
+            if entry is None:
+                # reset: write what came before, then truncate
+                self._write(lines)
+                lines = list()
+                self._truncate()
+                continue
+            if isinstance(entry, _FlushMarker):
+                self._write(lines)
+                lines = list()
+                entry.done.set()
+                continue
+            api_name, method, data, url = entry
+            lines.append("# %s API\n" % api_name)
+            lines.append("curl -X {type} -H \"Content-type: application/json\" -d '{data}' {url}\n".format(
+                type=method, data=data, url=url))
+        self._write(lines)
+
+    def _write(self, lines):
+        if not lines:
+            return
+        with self._file_lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write("".join(lines))
+            self._file.flush()
+            # two lines per request
+            self.written += len(lines) // 2
+            if self.max_bytes > 0 and self._file.tell() > self.max_bytes:
+                self._rotate()
+
+    def _truncate(self):
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, 'w')
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "%s.%d" % (self.path, i)
+                if os.path.exists(src):
+                    os.rename(src, "%s.%d" % (self.path, i + 1))
+            os.rename(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a')
+        LOG.debug("Rotated request playbook %s" % self.path)
+
+
+class _FlushMarker(object):
+    """
+    Queued by flush(), everything queued before it has been written when the writer gets there.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
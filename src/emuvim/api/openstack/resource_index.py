@@ -0,0 +1,127 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+
+class ResourceIndex(dict):
+    """
+    Dictionary of resources (id -> resource) with secondary indexes on some
+    attributes of the resources, e.g. name, template_name and full_name.
+
+    It is used like a normal dict, the indexes are updated whenever a resource is
+    added or removed. If an indexed attribute of a stored resource is changed,
+    reindex() has to be called with the key of the resource.
+    """
+
+    def __init__(self, *attrs):
+        dict.__init__(self)
+        self._attrs = attrs
+        # attr -> value -> set of keys
+        self._indexes = dict((attr, dict()) for attr in attrs)
+        # key -> values that were indexed for this key (needed to clean up after a rename)
+        self._indexed = dict()
+
+    def __setitem__(self, key, resource):
+        if key in self:
+            self._unindex(key)
+        dict.__setitem__(self, key, resource)
+        self._index(key, resource)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._unindex(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._unindex(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, resource = dict.popitem(self)
+        self._unindex(key)
+        return key, resource
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, resource in dict(*args, **kwargs).iteritems():
+            self[key] = resource
+
+    def clear(self):
+        dict.clear(self)
+        for index in self._indexes.values():
+            index.clear()
+        self._indexed.clear()
+
+    def reindex(self, key):
+        """
+        Update the indexes after an indexed attribute of the resource stored at key was changed.
+        """
+        if key in self:
+            self._unindex(key)
+            self._index(key, self[key])
+
+    def find(self, value, attrs=None):
+        """
+        Find a resource by one of the indexed attributes.
+
+        :param value: value to look for
+        :param attrs: attributes to check (in this order), default: all indexed attributes
+        :return: the resource or None
+        """
+        for attr in attrs or self._attrs:
+            for key in self._indexes[attr].get(value, ()):
+                resource = self.get(key)
+                # the attribute might have been changed without a reindex
+                if resource is not None and getattr(resource, attr, None) == value:
+                    return resource
+        return None
+
+    def _index(self, key, resource):
+        values = dict()
+        for attr in self._attrs:
+            value = getattr(resource, attr, None)
+            if value is None:
+                continue
+            try:
+                self._indexes[attr].setdefault(value, set()).add(key)
+            except TypeError:
+                # unhashable value, can only be found by id
+                continue
+            values[attr] = value
+        self._indexed[key] = values
+
+    def _unindex(self, key):
+        for attr, value in self._indexed.pop(key, dict()).items():
+            keys = self._indexes[attr].get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._indexes[attr][value]
@@ -26,6 +26,7 @@ acknowledge the contributions of their colleagues of the SONATA
 partner consortium (www.sonata-nfv.eu).
 """
 import re
+from emuvim.api.openstack.ip_pool import AddressPool
 
 
 class Net:
@@ -40,7 +41,8 @@ class Net:
         self.segmentation_id = None  # not set
         self._cidr = None
         self.start_end_dict = None
-        self._issued_ip_addresses = dict()
+        # issued ip addresses of the subnet (int -> port name), None if no cidr is set
+        self._ip_pool = None
 
     def get_short_id(self):
         """
@@ -60,20 +62,32 @@ class Net:
         :return: Returns a unused IP Address or none if all are in use.
         :rtype: ``str``
         """
-        if self.start_end_dict is None:
+        if self._ip_pool is None:
             return None
 
-        int_start_ip = Net.ip_2_int(self.start_end_dict['start']) + 2  # First address as network address not usable
-        # Second one is for gateways only
-        int_end_ip = Net.ip_2_int(self.start_end_dict['end']) - 1  # Last address for broadcasts
-        while int_start_ip in self._issued_ip_addresses and int_start_ip <= int_end_ip:
-            int_start_ip += 1
+        int_ip = self._ip_pool.allocate(port_name)
+        if int_ip is None:
+            return None
+        return Net.int_2_ip(int_ip) + '/' + self._cidr.rsplit('/', 1)[1]
+
+    def get_new_ip_addresses(self, port_names):
+        """
+        Calculates unused IP Addresses for a list of ports at once, e.g. for all ports of a stack.
 
-        if int_start_ip > int_end_ip:
+        :param port_names: Specifies the ports.
+        :type port_names: ``list``
+        :return: Returns a list of IP Addresses (same order as port_names) or None if there are not enough
+            unused addresses left.
+        :rtype: ``list``
+        """
+        if self._ip_pool is None:
             return None
 
-        self._issued_ip_addresses[int_start_ip] = port_name
-        return Net.int_2_ip(int_start_ip) + '/' + self._cidr.rsplit('/', 1)[1]
+        int_ips = self._ip_pool.allocate_many(port_names)
+        if int_ips is None:
+            return None
+        suffix = self._cidr.rsplit('/', 1)[1]
+        return [Net.int_2_ip(int_ip) + '/' + suffix for int_ip in int_ips]
 
     def assign_ip_address(self, cidr, port_name):
         """
@@ -87,7 +101,7 @@ class Net:
             * *True*: Else
         """
         int_ip = Net.cidr_2_int(cidr)
-        if int_ip in self._issued_ip_addresses:
+        if self._ip_pool is None or int_ip in self._ip_pool:
             return False
 
         int_start_ip = Net.ip_2_int(self.start_end_dict['start']) + 1  # First address as network address not usable
@@ -95,8 +109,7 @@ class Net:
         if int_ip < int_start_ip or int_ip > int_end_ip:
             return False
 
-        self._issued_ip_addresses[int_ip] = port_name
-        return True
+        return self._ip_pool.assign(int_ip, port_name)
 
     def is_my_ip(self, cidr, port_name):
         """
@@ -110,10 +123,10 @@ class Net:
         """
         int_ip = Net.cidr_2_int(cidr)
 
-        if not int_ip in self._issued_ip_addresses:
+        if self._ip_pool is None or not int_ip in self._ip_pool:
             return False
 
-        if self._issued_ip_addresses[int_ip] == port_name:
+        if self._ip_pool.owner(int_ip) == port_name:
             return True
         return False
 
@@ -132,14 +145,20 @@ class Net:
         else:
             address = ip_address
         int_ip_address = Net.ip_2_int(address)
-        if int_ip_address in self._issued_ip_addresses.keys():
-            del self._issued_ip_addresses[int_ip_address]
+        if self._ip_pool is not None:
+            self._ip_pool.withdraw(int_ip_address)
 
     def reset_issued_ip_addresses(self):
         """
         Resets all issued IP addresses.
         """
-        self._issued_ip_addresses = dict()
+        if not self.start_end_dict:
+            self._ip_pool = None
+            return
+        # First address as network address not usable, second one is for gateways only,
+        # last address for broadcasts
+        self._ip_pool = AddressPool(Net.ip_2_int(self.start_end_dict['start']) + 2,
+                                    Net.ip_2_int(self.start_end_dict['end']) - 1)
 
     def update_port_name_for_ip_address(self, ip_address, port_name):
         """
@@ -152,7 +171,8 @@ class Net:
         """
         address, suffix = ip_address.rsplit('/', 1)
         int_ip_address = Net.ip_2_int(address)
-        self._issued_ip_addresses[int_ip_address] = port_name
+        if self._ip_pool is not None:
+            self._ip_pool.set_owner(int_ip_address, port_name)
 
     def set_cidr(self, cidr):
         """
@@ -169,14 +189,14 @@ class Net:
                 import emuvim.api.openstack.ip_handler as IP
                 IP.free_cidr(self._cidr, self.subnet_id)
             self._cidr = None
-            self.reset_issued_ip_addresses()
             self.start_end_dict = dict()
+            self.reset_issued_ip_addresses()
             return True
         if not Net.check_cidr_format(cidr):
             return False
 
-        self.reset_issued_ip_addresses()
         self.start_end_dict = Net.calculate_start_and_end_dict(cidr)
+        self.reset_issued_ip_addresses()
         self._cidr = cidr
         return True
 
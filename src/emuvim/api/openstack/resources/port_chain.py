@@ -61,6 +61,12 @@ class PortChain(object):
                 pass
                 # TODO: for every flow classifier create match and pass it to setChain
 
+        # port name -> servers with this port, built once instead of scanning all servers per port pair
+        port_servers = dict()
+        for server in compute.computeUnits.values():
+            for port_name in server.port_names:
+                port_servers.setdefault(port_name, list()).append(server)
+
         for group_id in self.port_pair_groups:
             port_pair_group = compute.find_port_pair_group_by_name_or_id(group_id)
             for port_pair_id in port_pair_group.port_pairs:
@@ -68,10 +74,10 @@ class PortChain(object):
 
                 server_ingress = None
                 server_egress = None
-                for server in compute.computeUnits.values():
-                    if port_pair.ingress.name in server.port_names:
-                        server_ingress = server
-                    elif port_pair.egress.name in server.port_names:
+                for server in port_servers.get(port_pair.ingress.name, list()):
+                    server_ingress = server
+                for server in port_servers.get(port_pair.egress.name, list()):
+                    if port_pair.ingress.name not in server.port_names:
                         server_egress = server
 
                 # TODO: Not sure, if this should throw an error
@@ -39,6 +39,8 @@ class Stack:
         self.update_time = None
         self.status = None
         self.template = None
+        # summary of the last update (see: OpenstackCompute.update_stack)
+        self.update_report = None
         if id is None:
             self.id = str(uuid.uuid4())
         else:
@@ -0,0 +1,162 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+# plan actions
+ADD = "add"
+REMOVE = "remove"
+MODIFY = "modify"
+UNCHANGED = "unchanged"
+
+
+class StackDiff(object):
+    """
+    Compares a running stack with its updated version and derives the minimal set of changes.
+
+    Resources are matched by name (as Heat does). Servers are compared with ``compare_attributes``, all other
+    resources with ``==``, so the new stack must already hold the ids, interface names and addresses
+    that it takes over from the old stack.
+
+    A modified server has to be restarted. Servers that did not change keep their container, only the links
+    of their added, removed or changed ports are rebuilt (see ``relinks``).
+    """
+
+    def __init__(self, old_stack, new_stack):
+        """
+        :param old_stack: The currently running stack.
+        :type old_stack: :class:`heat.resources.stack`
+        :param new_stack: The updated stack.
+        :type new_stack: :class:`heat.resources.stack`
+        """
+        self.old_stack = old_stack
+        self.new_stack = new_stack
+        self.nets = StackDiff._diff(old_stack.nets, new_stack.nets, lambda old, new: old == new)
+        self.ports = StackDiff._diff(old_stack.ports, new_stack.ports, lambda old, new: old == new)
+        self.routers = StackDiff._diff(old_stack.routers, new_stack.routers, lambda old, new: old == new)
+        self.servers = StackDiff._diff(old_stack.servers, new_stack.servers,
+                                       lambda old, new: old.compare_attributes(new))
+
+        # server name -> (names of the ports to detach, names of the ports to attach)
+        self.relinks = dict()
+        changed_ports = set(self.ports[MODIFY])
+        for name in self.servers[UNCHANGED]:
+            old_ports = set(old_stack.servers[name].port_names)
+            new_ports = set(new_stack.servers[name].port_names)
+            changed = old_ports & new_ports & changed_ports
+            detach = sorted((old_ports - new_ports) | changed)
+            attach = sorted((new_ports - old_ports) | changed)
+            if detach or attach:
+                self.relinks[name] = (detach, attach)
+        self.duration = None
+
+    @staticmethod
+    def _diff(old, new, same):
+        """
+        :param old: name -> resource of the old stack
+        :param new: name -> resource of the new stack
+        :param same: function(old_resource, new_resource) that returns True if nothing changed
+        :return: dict: action -> sorted list of resource names
+        """
+        result = {ADD: list(), REMOVE: list(), MODIFY: list(), UNCHANGED: list()}
+        for name in old:
+            if name not in new:
+                result[REMOVE].append(name)
+            elif same(old[name], new[name]):
+                result[UNCHANGED].append(name)
+            else:
+                result[MODIFY].append(name)
+        result[ADD] = [name for name in new if name not in old]
+        for names in result.values():
+            names.sort()
+        return result
+
+    def servers_to_stop(self):
+        """
+        :return: The servers of the old stack that are removed or have to be restarted.
+        :rtype: ``list``
+        """
+        return [self.old_stack.servers[name] for name in self.servers[REMOVE] + self.servers[MODIFY]]
+
+    def servers_to_start(self):
+        """
+        :return: The servers of the new stack that are added or have to be restarted.
+        :rtype: ``list``
+        """
+        return [self.new_stack.servers[name] for name in self.servers[ADD] + self.servers[MODIFY]]
+
+    def is_empty(self):
+        """
+        :return: True if the update does not change anything.
+        :rtype: ``bool``
+        """
+        for changes in [self.nets, self.ports, self.routers, self.servers]:
+            if changes[ADD] or changes[REMOVE] or changes[MODIFY]:
+                return False
+        return True
+
+    def operations(self):
+        """
+        The plan in the order it is executed.
+
+        :return: list of (action, resource type, name) tuples
+        :rtype: ``list``
+        """
+        ops = list()
+        ops.extend([(REMOVE, "server", name) for name in self.servers[REMOVE]])
+        ops.extend([(MODIFY, "server", name) for name in self.servers[MODIFY]])
+        ops.extend([("relink", "server", name) for name in sorted(self.relinks)])
+        for kind, changes in [("net", self.nets), ("port", self.ports), ("router", self.routers)]:
+            ops.extend([(REMOVE, kind, name) for name in changes[REMOVE]])
+            ops.extend([(MODIFY, kind, name) for name in changes[MODIFY]])
+            ops.extend([(ADD, kind, name) for name in changes[ADD]])
+        ops.extend([(ADD, "server", name) for name in self.servers[ADD]])
+        return ops
+
+    def report(self):
+        """
+        Summary of the update, e.g. for logging or the stack description.
+
+        :return: dict: resource type -> {added, removed, modified: [names], unchanged: count},
+            plus the relinked servers and the duration of the update in seconds.
+        :rtype: ``dict``
+        """
+        report = dict()
+        for kind, changes in [("servers", self.servers), ("nets", self.nets), ("ports", self.ports),
+                              ("routers", self.routers)]:
+            report[kind] = {"added": list(changes[ADD]),
+                            "removed": list(changes[REMOVE]),
+                            "modified": list(changes[MODIFY]),
+                            "unchanged": len(changes[UNCHANGED])}
+        report["relinked"] = sorted(self.relinks)
+        report["duration"] = self.duration
+        return report
+
+    def __str__(self):
+        return "servers +%d -%d ~%d (relinked %d), nets +%d -%d ~%d, ports +%d -%d ~%d" % (
+            len(self.servers[ADD]), len(self.servers[REMOVE]), len(self.servers[MODIFY]), len(self.relinks),
+            len(self.nets[ADD]), len(self.nets[REMOVE]), len(self.nets[MODIFY]),
+            len(self.ports[ADD]), len(self.ports[REMOVE]), len(self.ports[MODIFY]))
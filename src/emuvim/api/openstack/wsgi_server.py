@@ -0,0 +1,217 @@
+"""
+Copyright (c) 2017 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+import time
+from Queue import Queue
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+LOG = logging.getLogger("api.openstack.wsgi_server")
+
+# "threaded": werkzeug WSGI server (without debugger) that hands the requests to a bounded pool of worker threads.
+#             A request that blocks (e.g. while the containers of a stack are started) does not hold up the others.
+#             Requests that change stacks, servers, networks or ports of a data center are serialized by the lock
+#             of its OpenstackCompute, read-only requests are not.
+# "gevent": gevent WSGIServer with a bounded greenlet pool, like the RestApiEndpoint. Cheap connections, but as
+#           nothing is monkey patched, requests only overlap while they wait for gevent I/O.
+SERVER_MODEL = "threaded"
+# max. number of requests that are handled at the same time by one endpoint
+MAX_WORKERS = 32
+# max. number of connections waiting to be accepted
+BACKLOG = 128
+# seconds to wait for running requests when an endpoint is stopped
+SHUTDOWN_TIMEOUT = 10.0
+# log every request (werkzeug/gevent access log)
+LOG_REQUESTS = False
+
+SERVER_MODELS = ["threaded", "gevent"]
+
+
+class ApiServer(object):
+    """
+    Concurrent WSGI server for the OpenStack dummy endpoints and the chain API.
+
+    serve_forever() blocks, so it is called in the thread of the endpoint. shutdown() can be called from any
+    thread: the server stops accepting connections and waits up to shutdown_timeout seconds for the
+    running requests. The apps can also stop their server with the 'werkzeug.server.shutdown' function
+    of the WSGI environment (see the /shutdown resources), regardless of the server model.
+    """
+
+    def __init__(self, app, ip, port, model=None, max_workers=None, backlog=None, shutdown_timeout=None):
+        """
+        :param app: WSGI application (Flask app)
+        :param ip: listen ip
+        :param port: listen port
+        :param model: "threaded" or "gevent", default: SERVER_MODEL
+        :param max_workers: max. number of concurrent requests, default: MAX_WORKERS
+        :param backlog: max. number of pending connections, default: BACKLOG
+        :param shutdown_timeout: seconds to wait for running requests on shutdown, default: SHUTDOWN_TIMEOUT
+        """
+        self.app = app
+        self.ip = ip
+        self.port = port
+        self.model = model or SERVER_MODEL
+        if self.model not in SERVER_MODELS:
+            raise Exception("Unknown server model: %r (use one of %r)" % (self.model, SERVER_MODELS))
+        self.max_workers = max(1, int(max_workers or MAX_WORKERS))
+        self.backlog = int(backlog or BACKLOG)
+        self.shutdown_timeout = SHUTDOWN_TIMEOUT if shutdown_timeout is None else shutdown_timeout
+        self._server = None
+        # wakes up the gevent hub of the serving thread on shutdown
+        self._gevent_wakeup = None
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._stopped = threading.Event()
+
+    def serve_forever(self):
+        """
+        Serve requests until shutdown() is called.
+        """
+        try:
+            with self._lock:
+                if self._shutdown:
+                    return
+                if self.model == "gevent":
+                    self._create_gevent_server()
+                else:
+                    self._server = _ThreadPoolWSGIServer(self.ip, self.port, self._wsgi,
+                                                         self.max_workers, self.backlog)
+            LOG.debug("Serving %s:%d (%s, %d workers)" % (self.ip, self.port, self.model, self.max_workers))
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+
+    def _create_gevent_server(self):
+        import gevent
+        from gevent.pool import Pool
+        from gevent.wsgi import WSGIServer
+
+        self._server = WSGIServer((self.ip, self.port), self._wsgi, spawn=Pool(self.max_workers),
+                                  backlog=self.backlog, log="default" if LOG_REQUESTS else None)
+        loop = gevent.get_hub().loop
+        # thread-safe watcher, the server itself must only be stopped by the hub of this thread
+        self._gevent_wakeup = getattr(loop, "async_", None) or getattr(loop, "async")
+        self._gevent_wakeup = self._gevent_wakeup()
+        # stop() waits for the running requests, so it cannot run in the callback of the hub
+        self._gevent_wakeup.start(lambda: gevent.spawn(self._server.stop, timeout=self.shutdown_timeout))
+
+    def shutdown(self, timeout=None):
+        """
+        Stop accepting connections and wait for the running requests.
+        :param timeout: max. seconds to wait, default: shutdown_timeout (+ some slack for the listener)
+        :return: True if the server has been stopped in time
+        """
+        with self._lock:
+            if self._shutdown:
+                return self._stopped.is_set()
+            self._shutdown = True
+            server = self._server
+        if server is None:
+            # not started yet, serve_forever() will return immediately
+            return True
+        LOG.info("Stopping endpoint @ http://%s:%d" % (self.ip, self.port))
+        timeout = self.shutdown_timeout + 1.0 if timeout is None else timeout
+        if self.model == "gevent":
+            self._gevent_wakeup.send()
+            stopped = self._stopped.wait(timeout)
+        else:
+            start = time.time()
+            # stops the accept loop, the workers finish the requests that are already queued
+            server.shutdown()
+            stopped = server.stop_workers(max(0.0, timeout - (time.time() - start)))
+        if not stopped:
+            LOG.warning("Endpoint @ http://%s:%d did not stop within %.1fs" % (self.ip, self.port, timeout))
+        return stopped
+
+    def _shutdown_async(self):
+        # called from within a request, which has to finish before the server can stop
+        t = threading.Thread(target=self.shutdown)
+        t.daemon = True
+        t.start()
+
+    def _wsgi(self, environ, start_response):
+        environ["werkzeug.server.shutdown"] = self._shutdown_async
+        return self.app(environ, start_response)
+
+
+class _ThreadPoolWSGIServer(BaseWSGIServer):
+    """
+    werkzeug's WSGI server, the accepted connections are served by a fixed number of worker threads.
+    """
+
+    def __init__(self, host, port, app, max_workers, backlog):
+        # used by listen() during the construction of the server
+        self.request_queue_size = backlog
+        BaseWSGIServer.__init__(self, host, port, app,
+                                handler=WSGIRequestHandler if LOG_REQUESTS else _QuietRequestHandler)
+        self._requests = Queue()
+        self._workers = list()
+        for i in range(max_workers):
+            t = threading.Thread(target=self._work, name="wsgi-%d-%d" % (port, i))
+            t.daemon = True
+            t.start()
+            self._workers.append(t)
+
+    def process_request(self, request, client_address):
+        self._requests.put((request, client_address))
+
+    def _work(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def stop_workers(self, timeout):
+        """
+        Let the workers finish the queued requests and stop them.
+        :param timeout: max. seconds to wait
+        :return: True if all workers have stopped
+        """
+        for _ in self._workers:
+            self._requests.put(None)
+        deadline = time.time() + timeout
+        for t in self._workers:
+            t.join(max(0.0, deadline - time.time()))
+        return not any(t.is_alive() for t in self._workers)
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    """
+    Request handler without access log.
+    """
+
+    def log_request(self, *args, **kwargs):
+        pass
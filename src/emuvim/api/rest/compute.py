@@ -39,6 +39,16 @@ CORS_HEADER = {'Access-Control-Allow-Origin': '*'}
 dcs = {}
 
 
+def _max_age():
+    """
+    Accepted staleness of the container status (url param max_age in seconds, default: status cache setting).
+    """
+    max_age = request.args.get("max_age")
+    if max_age is None:
+        return None
+    return float(max_age)
+
+
 class Compute(Resource):
     """
     Start a new compute instance: A docker container (note: zerorpc does not support keyword arguments)
@@ -83,7 +93,7 @@ class Compute(Resource):
         logging.debug("API CALL: compute status")
 
         try:
-            return dcs.get(dc_label).containers.get(compute_name).getStatus(), 200, CORS_HEADER
+            return dcs.get(dc_label).containers.get(compute_name).getStatus(max_age=_max_age()), 200, CORS_HEADER
         except Exception as ex:
             logging.exception("API error.")
             return ex.message, 500, CORS_HEADER
@@ -131,12 +141,14 @@ class ComputeList(Resource):
                     all_extSAPs += dc.listExtSAPs()
 
                 extSAP_list = [(sap.name, sap.getStatus()) for sap in all_extSAPs]
-                container_list = [(c.name, c.getStatus()) for c in all_containers]
+                max_age = _max_age()
+                container_list = [(c.name, c.getStatus(max_age=max_age)) for c in all_containers]
                 total_list = container_list + extSAP_list
                 return total_list, 200, CORS_HEADER
             else:
                 # return list of compute nodes for specified DC
-                container_list = [(c.name, c.getStatus()) for c in dcs.get(dc_label).listCompute()]
+                max_age = _max_age()
+                container_list = [(c.name, c.getStatus(max_age=max_age)) for c in dcs.get(dc_label).listCompute()]
                 extSAP_list = [(sap.name, sap.getStatus()) for sap in dcs.get(dc_label).listExtSAPs()]
                 total_list = container_list + extSAP_list
                 return total_list, 200, CORS_HEADER
@@ -51,6 +51,7 @@ class MonitorInterfaceAction(Resource):
     :param vnf_name: name of the VNF to be monitored
     :param vnf_interface: name of the VNF interface to be monitored
     :param metric: tx_bytes, rx_bytes, tx_packets, rx_packets
+    :param interval: polling interval in seconds (default: 1)
     :return: message string indicating if the monitor action is succesful or not
     """
     global net
@@ -65,12 +66,13 @@ class MonitorInterfaceAction(Resource):
         vnf_interface = data.get("vnf_interface", None)
         metric = data.get("metric", 'tx_packets')
         cookie = data.get("cookie")
+        interval = data.get("interval")
 
         try:
             if cookie:
-                c = net.monitor_agent.setup_flow(vnf_name, vnf_interface, metric, cookie)
+                c = net.monitor_agent.setup_flow(vnf_name, vnf_interface, metric, cookie, interval=interval)
             else:
-                c = net.monitor_agent.setup_metric(vnf_name, vnf_interface, metric)
+                c = net.monitor_agent.setup_metric(vnf_name, vnf_interface, metric, interval=interval)
             # return monitor message response
             return  str(c), 200, CORS_HEADER
         except Exception as ex:
@@ -107,6 +109,7 @@ class MonitorFlowAction(Resource):
     :param vnf_interface: name of the VNF interface to be monitored
     :param metric: tx_bytes, rx_bytes, tx_packets, rx_packets
     :param cookie: specific identifier of flows to monitor
+    :param interval: polling interval in seconds (default: 1)
     :return: message string indicating if the monitor action is succesful or not
     """
     global net
@@ -121,9 +124,10 @@ class MonitorFlowAction(Resource):
         vnf_interface = data.get("vnf_interface", None)
         metric = data.get("metric", 'tx_packets')
         cookie = data.get("cookie", 0)
+        interval = data.get("interval")
 
         try:
-            c = net.monitor_agent.setup_flow(vnf_name, vnf_interface, metric, cookie)
+            c = net.monitor_agent.setup_flow(vnf_name, vnf_interface, metric, cookie, interval=interval)
             # return monitor message response
             return str(c), 200, CORS_HEADER
         except Exception as ex:
@@ -149,6 +153,35 @@ class MonitorFlowAction(Resource):
             logging.exception("API error.")
             return ex.message, 500, CORS_HEADER
 
+class MonitorRateAction(Resource):
+    """
+    Get the live rates of the monitored interfaces and flows, calculated by the monitor itself
+    (no Prometheus query needed)
+    :param vnf_name: name of the VNF (optional)
+    :param vnf_interface: name of the VNF interface (optional)
+    :param metric: tx_bytes, rx_bytes, tx_packets, rx_packets (optional)
+    :return: list of rates: current rate, min, max and percentiles over the rate window
+    """
+    global net
+
+    def get(self):
+        logging.debug("REST CALL: get monitor rates")
+        # get URL parameters
+        data = request.args
+        if data is None:
+            data = {}
+        vnf_name = data.get("vnf_name")
+        vnf_interface = data.get("vnf_interface")
+        metric = data.get("metric")
+
+        try:
+            rates = net.monitor_agent.get_rates(vnf_name, vnf_interface, metric)
+            return rates, 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
+
+
 class MonitorLinkAction(Resource):
     """
     Add or remove flow monitoring on chains between VNFs.
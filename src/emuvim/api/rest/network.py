@@ -34,9 +34,8 @@ Networking and monitoring functions
 
 import logging
 from flask_restful import Resource
-from flask import request
+from flask import request, Response
 import json
-import networkx
 
 logging.basicConfig()
 
@@ -61,6 +60,7 @@ class NetworkAction(Resource):
     :param skip_vlan_tag: boolean to indicate whether a new vlan tag should be created for this chain
     :param monitor: boolean to indicate whether a new vlan tag should be created for this chain
     :param monitor_placement: 'tx'=place the monitoring flowrule at the beginning of the chain, 'rx'=place at the end of the chain
+    :param batch_mode: 'best-effort' or 'all-or-nothing' to install all flowrules of the chain in one batch
     :return: message string indicating if the chain action is succesful or not
     """
 
@@ -102,6 +102,7 @@ class NetworkAction(Resource):
             skip_vlan_tag = data.get("skip_vlan_tag")
             monitor = data.get("monitor")
             monitor_placement = data.get("monitor_placement")
+            batch_mode = data.get("batch_mode")
 
             c = net.setChain(
                 vnf_src_name, vnf_dst_name,
@@ -115,7 +116,8 @@ class NetworkAction(Resource):
                 priority=priority,
                 skip_vlan_tag=skip_vlan_tag,
                 monitor=monitor,
-                monitor_placement=monitor_placement)
+                monitor_placement=monitor_placement,
+                batch_mode=batch_mode)
             # return setChain response
             return str(c), 200, CORS_HEADER
         except Exception as ex:
@@ -124,29 +126,90 @@ class NetworkAction(Resource):
 
 
 class DrawD3jsgraph(Resource):
+    """
+    The DCNetwork graph in the node/link format of d3.js.
+    The serialized graph is cached until the topology changes.
+    Supports If-None-Match (ETag = topology version) and ?since=<version> to get only the nodes and links
+    that have been added or removed since then (links reference the nodes by name, not by index).
+    If the changes since this version are no longer known, the full graph is returned.
+    """
 
     global net
 
     def get(self):
+        since = request.args.get("since")
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return "Invalid topology version: since=%s" % since, 400, CORS_HEADER
+        try:
+            if since is not None:
+                changes = net.getTopologyChanges(since)
+                if changes is not None:
+                    return Response(json.dumps(DrawD3jsgraph._delta(changes)), status=200,
+                                    mimetype="application/json", headers=topology_headers(changes["version"]))
+
+            version, body = net.getTopologyView("d3js", DrawD3jsgraph._graph)
+            headers = topology_headers(version)
+            if request.if_none_match.contains(topology_etag(version)):
+                return Response(status=304, headers=headers)
+            return Response(body, status=200, mimetype="application/json", headers=headers)
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
+
+    @staticmethod
+    def _graph():
+        graph = net.DCNetwork_graph
         nodes = list()
-        nodes2 = list()
         links = list()
         # add all DCs
-        node_attr = networkx.get_node_attributes(net.DCNetwork_graph, 'type')
-        for node_name in net.DCNetwork_graph.nodes():
-            nodes2.append(node_name)
-            node_index = nodes2.index(node_name)
-            type = node_attr[node_name]
-            node_dict = {"name":node_name,"group":type}
-            nodes.append(node_dict)
+        node_index = dict()
+        for node_name, attr in graph.nodes_iter(data=True):
+            node_index[node_name] = len(nodes)
+            nodes.append({"name": node_name, "group": attr.get('type')})
 
         # add links between other DCs
-        for node1_name in net.DCNetwork_graph.nodes():
-            node1_index = nodes2.index(node1_name)
-            for node2_name in net.DCNetwork_graph.neighbors(node1_name):
-                node2_index = nodes2.index(node2_name)
-                edge_dict = {"source": node1_index, "target": node2_index, "value": 10}
-                links.append(edge_dict)
-
-        json = {"nodes":nodes, "links":links}
-        return json, 200, CORS_HEADER
+        for node1_name in graph.nodes_iter():
+            for node2_name in graph.neighbors(node1_name):
+                links.append({"source": node_index[node1_name], "target": node_index[node2_name], "value": 10})
+
+        return json.dumps({"nodes": nodes, "links": links})
+
+    @staticmethod
+    def _delta(changes):
+        delta = {"version": changes["version"], "since": changes["since"], "nodes": dict(), "links": dict()}
+        for op in ["added", "removed"]:
+            delta["nodes"][op] = [{"name": name, "group": node_type} for name, node_type in changes["nodes"][op]]
+            delta["links"][op] = [{"source": src, "target": dst, "value": 10}
+                                  for src, dst, src_type, dst_type in changes["edges"][op]]
+        return delta
+
+
+def topology_etag(version):
+    return "topology-%d" % version
+
+
+def topology_headers(version):
+    headers = {'ETag': '"%s"' % topology_etag(version),
+               'X-Topology-Version': str(version),
+               'Access-Control-Expose-Headers': 'ETag, X-Topology-Version'}
+    headers.update(CORS_HEADER)
+    return headers
+
+
+class IdPoolStats(Resource):
+    """
+    Utilization of the id pools (vlan tags, cookies, flow groups, subnets).
+    :return: dict: pool name -> {size, in_use, free, allocations, releases, peak}
+    """
+
+    global net
+
+    def get(self):
+        try:
+            return net.getIdPoolStats(), 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
@@ -38,10 +38,13 @@ from compute import dcs, ComputeList, Compute, ComputeResources, DatacenterList,
 
 # need to import total module to set its global variable net
 import network
-from network import NetworkAction, DrawD3jsgraph
+from network import NetworkAction, DrawD3jsgraph, IdPoolStats
 
 import monitor
-from monitor import MonitorInterfaceAction, MonitorFlowAction, MonitorLinkAction, MonitorSkewAction, MonitorTerminal
+from monitor import MonitorInterfaceAction, MonitorFlowAction, MonitorRateAction, MonitorLinkAction, \
+    MonitorSkewAction, MonitorTerminal
+
+from tracing import TraceList, Trace, TraceExport
 
 import pkg_resources
 from os import path
@@ -90,6 +93,8 @@ class RestApiEndpoint(object):
                               "/restapi/network")
         self.api.add_resource(DrawD3jsgraph,
                               "/restapi/network/d3jsgraph")
+        self.api.add_resource(IdPoolStats,
+                              "/restapi/network/idpools")
 
         # monitoring related actions
         # export a network interface traffic rate counter
@@ -98,6 +103,9 @@ class RestApiEndpoint(object):
         # export flow traffic counter, of a manually pre-installed flow entry, specified by its cookie
         self.api.add_resource(MonitorFlowAction,
                               "/restapi/monitor/flow")
+        # get the traffic rates (and min/max/percentiles) of the monitored interfaces and flows
+        self.api.add_resource(MonitorRateAction,
+                              "/restapi/monitor/rate")
         # install monitoring of a specific flow on a pre-existing link in the service.
         # the traffic counters of the newly installed monitor flow are exported
         self.api.add_resource(MonitorLinkAction,
@@ -110,6 +118,11 @@ class RestApiEndpoint(object):
         self.api.add_resource(MonitorTerminal,
                               "/restapi/monitor/term")
 
+        # instantiation traces of services and stacks
+        self.api.add_resource(TraceList, "/restapi/tracing")
+        self.api.add_resource(TraceExport, "/restapi/tracing/export")
+        self.api.add_resource(Trace, "/restapi/tracing/<trace_id>")
+
 
         logging.debug("Created API endpoint %s(%s:%d)" % (self.__class__.__name__, self.ip, self.port))
 
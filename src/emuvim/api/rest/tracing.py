@@ -0,0 +1,102 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import os
+from flask_restful import Resource
+from flask import request
+from emuvim.dcemulator.tracing import TRACER
+
+logging.basicConfig()
+
+CORS_HEADER = {'Access-Control-Allow-Origin': '*'}
+
+# trace files exported through the REST API are only written to this directory
+TRACE_EXPORT_DIR = "/tmp/son-emu-traces"
+
+
+class TraceList(Resource):
+    """
+    Get the recorded traces of service and stack instantiations.
+    Each trace contains the spans of all instantiation phases (placement, addDocker, addLink, setChain, ...)
+    :return: list of traces
+    """
+
+    def get(self):
+        logging.debug("REST CALL: get traces")
+        try:
+            return TRACER.get_traces(), 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
+
+
+class Trace(Resource):
+    """
+    Get a single trace.
+    :param trace_id: id of the trace (also stored in the service instance record of the dummy gatekeeper)
+    :return: trace
+    """
+
+    def get(self, trace_id):
+        logging.debug("REST CALL: get trace")
+        trace = TRACER.get_trace(trace_id)
+        if trace is None:
+            return "Trace %s not found." % trace_id, 404, CORS_HEADER
+        return trace, 200, CORS_HEADER
+
+
+class TraceExport(Resource):
+    """
+    Export the recorded traces as JSON trace file on the emulator host.
+    :param file: name of the JSON file, it is written to TRACE_EXPORT_DIR (no directories allowed)
+    :param trace_id: only export this trace (optional)
+    :return: message string indicating the number of exported traces
+    """
+
+    def put(self):
+        logging.debug("REST CALL: export traces")
+        data = request.json
+        if data is None:
+            data = request.args
+        if data is None:
+            data = {}
+        name = data.get("file")
+        trace_id = data.get("trace_id")
+        if not name:
+            return "No file given.", 400, CORS_HEADER
+        if not isinstance(name, basestring) or "/" in name or "\\" in name or name.startswith(".") or os.path.basename(name) != name:
+            return "Invalid file name %r, only a plain file name is allowed." % name, 400, CORS_HEADER
+        path = os.path.join(TRACE_EXPORT_DIR, name)
+        try:
+            if not os.path.isdir(TRACE_EXPORT_DIR):
+                os.makedirs(TRACE_EXPORT_DIR)
+            n = TRACER.export_json(path, trace_id=trace_id)
+            return "Exported %d traces to %s" % (n, path), 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
@@ -49,6 +49,9 @@ from random import randint
 import ipaddress
 import copy
 import time
+from multiprocessing.pool import ThreadPool
+from emuvim.dcemulator.tracing import TRACER
+from emuvim.dcemulator.idpool import IdPool
 
 logging.basicConfig()
 LOG = logging.getLogger("sonata-dummy-gatekeeper")
@@ -75,6 +78,15 @@ DEPLOY_SAP = False
 # flag to indicate if we use bidirectional forwarding rules in the automatic chaining process
 BIDIRECTIONAL_CHAIN = False
 
+# install the flowrules of all E-Lines of a service in a single batch: "best-effort", "all-or-nothing" or None (disabled)
+ELINE_FLOW_BATCH_MODE = "best-effort"
+
+# start the VNF containers of a service in parallel (network attachment is still serialized by the DCNetwork)
+PARALLEL_VNF_START = False
+
+# max. number of containers that are created at the same time if PARALLEL_VNF_START is enabled
+VNF_START_WORKERS = 8
+
 # override the management interfaces in the descriptors with default docker0 interfaces in the containers
 USE_DOCKER_MGMT = False
 
@@ -98,6 +110,10 @@ SAP_SUBNETS = generate_subnets('10.10', 0, subnet_size=50, mask=30)
 ELAN_SUBNETS = generate_subnets('10.20', 0, subnet_size=50, mask=24)
 # 10.30.xxx.0/30
 ELINE_SUBNETS = generate_subnets('10.30', 0, subnet_size=50, mask=30)
+# E-LAN and E-Line subnets are given back when a service instance is stopped
+# (the pools hand out indices into the subnet lists)
+ELAN_SUBNET_POOL = IdPool("elan_subnet", 0, len(ELAN_SUBNETS) - 1)
+ELINE_SUBNET_POOL = IdPool("eline_subnet", 0, len(ELINE_SUBNETS) - 1)
 
 # path to the VNFD for the SAP VNF that is deployed as internal SAP point
 SAP_VNFD=None
@@ -187,54 +203,127 @@ class Service(object):
         :return:
         """
         LOG.info("Starting service %r" % self.uuid)
+        # record the phases of this instantiation (see: /restapi/tracing)
+        with TRACER.trace("service", self.uuid, service_name=self.manifest.get("name") if self.manifest else None) \
+                as trace:
+            return self._start_service(trace)
+
+    def _start_service(self, trace):
+        timing = dict()
 
         # 1. each service instance gets a new uuid to identify it
         instance_uuid = str(uuid.uuid4())
+        trace.attributes["instance_uuid"] = instance_uuid
         # build a instances dict (a bit like a NSR :))
         self.instances[instance_uuid] = dict()
         self.instances[instance_uuid]["vnf_instances"] = list()
+        self.instances[instance_uuid]["timing"] = timing
+        self.instances[instance_uuid]["trace_id"] = trace.id
+        # ids that are given back when the instance is stopped
+        self.instances[instance_uuid]["eline_subnets"] = list()
+        self.instances[instance_uuid]["elan_subnets"] = list()
 
         # 2. compute placement of this service instance (adds DC names to VNFDs)
-        if not GK_STANDALONE_MODE:
-            #self._calculate_placement(FirstDcPlacement)
-            self._calculate_placement(RoundRobinDcPlacementWithSAPs)
-        # 3. start all vnfds that we have in the service (except SAPs)
-        for vnf_id in self.vnfds:
-            vnfd = self.vnfds[vnf_id]
-            vnfi = None
+        t = time.time()
+        with TRACER.span("placement"):
             if not GK_STANDALONE_MODE:
-                vnfi = self._start_vnfd(vnfd, vnf_id)
-            self.instances[instance_uuid]["vnf_instances"].append(vnfi)
+                #self._calculate_placement(FirstDcPlacement)
+                self._calculate_placement(RoundRobinDcPlacementWithSAPs)
+        timing["placement"] = time.time() - t
+
+        # 3. start all vnfds that we have in the service (except SAPs),
+        # this includes the links of the VNFs to their data center switches (set up by startCompute)
+        t = time.time()
+        with TRACER.span("container_start"):
+            if PARALLEL_VNF_START and not GK_STANDALONE_MODE:
+                vnfis = self._start_vnfds_parallel(self.vnfds.keys())
+            else:
+                vnfis = list()
+                for vnf_id in self.vnfds:
+                    vnfd = self.vnfds[vnf_id]
+                    vnfi = None
+                    if not GK_STANDALONE_MODE:
+                        with TRACER.span("vnf_start", vnf_id=vnf_id):
+                            vnfi = self._start_vnfd(vnfd, vnf_id)
+                    vnfis.append(vnfi)
+        self.instances[instance_uuid]["vnf_instances"].extend(vnfis)
+        timing["container_start"] = time.time() - t
+        # part of container_start, the links are added one after another by the DCNetwork
+        timing["vnf_link_setup"] = sum(s["duration"] for s in trace.to_dict()["spans"] if s["name"] == "addLink")
 
         # 4. start all SAPs in the service
-        for sap in self.saps:
-            self._start_sap(self.saps[sap], instance_uuid)
+        t = time.time()
+        with TRACER.span("sap_start"):
+            for sap in self.saps:
+                with TRACER.span("sap", sap=self.saps[sap].get("name")):
+                    self._start_sap(self.saps[sap], instance_uuid)
+        timing["sap_start"] = time.time() - t
 
         # 5. Deploy E-Line and E_LAN links
         # Attention: Only done if ""forwarding_graphs" section in NSD exists,
         # even if "forwarding_graphs" are not used directly.
-        if "virtual_links" in self.nsd and "forwarding_graphs" in self.nsd:
-            vlinks = self.nsd["virtual_links"]
-            # constituent virtual links are not checked
-            #fwd_links = self.nsd["forwarding_graphs"][0]["constituent_virtual_links"]
-            eline_fwd_links = [l for l in vlinks if (l["connectivity_type"] == "E-Line")]
-            elan_fwd_links = [l for l in vlinks if (l["connectivity_type"] == "E-LAN")]
+        t = time.time()
+        with TRACER.span("chaining"):
+            if "virtual_links" in self.nsd and "forwarding_graphs" in self.nsd:
+                vlinks = self.nsd["virtual_links"]
+                # constituent virtual links are not checked
+                #fwd_links = self.nsd["forwarding_graphs"][0]["constituent_virtual_links"]
+                eline_fwd_links = [l for l in vlinks if (l["connectivity_type"] == "E-Line")]
+                elan_fwd_links = [l for l in vlinks if (l["connectivity_type"] == "E-LAN")]
 
-            GK.net.deployed_elines.extend(eline_fwd_links)
-            GK.net.deployed_elans.extend(elan_fwd_links)
+                GK.net.deployed_elines.extend(eline_fwd_links)
+                GK.net.deployed_elans.extend(elan_fwd_links)
 
-            # 5a. deploy E-Line links
-            self._connect_elines(eline_fwd_links, instance_uuid)
+                # 5a. deploy E-Line links
+                self._connect_elines(eline_fwd_links, instance_uuid)
 
-            # 5b. deploy E-LAN links
-            self._connect_elans(elan_fwd_links, instance_uuid)
+                # 5b. deploy E-LAN links
+                self._connect_elans(elan_fwd_links, instance_uuid)
+        timing["chaining"] = time.time() - t
 
         # 6. run the emulator specific entrypoint scripts in the VNFIs of this service instance
-        self._trigger_emulator_start_scripts_in_vnfis(self.instances[instance_uuid]["vnf_instances"])
+        t = time.time()
+        with TRACER.span("start_scripts"):
+            self._trigger_emulator_start_scripts_in_vnfis(self.instances[instance_uuid]["vnf_instances"])
+        timing["start_scripts"] = time.time() - t
 
         LOG.info("Service started. Instance id: %r" % instance_uuid)
+        LOG.info("Service start timing (s): placement=%.3f container_start=%.3f (vnf_link_setup=%.3f) sap_start=%.3f "
+                 "chaining=%.3f start_scripts=%.3f"
+                 % (timing["placement"], timing["container_start"], timing["vnf_link_setup"], timing["sap_start"],
+                    timing["chaining"], timing["start_scripts"]))
         return instance_uuid
 
+    def _start_vnfds_parallel(self, vnf_ids):
+        """
+        Start the given VNFDs concurrently with a bounded number of workers.
+        The containers are created in parallel, their network attachment is serialized by the DCNetwork.
+        :param vnf_ids: list of vnf ids of this service
+        :return: list of vnf instances (same order as vnf_ids)
+        """
+        trace = TRACER.current()
+
+        def start(vnf_id):
+            try:
+                # the spans of the worker threads belong to the trace of the service
+                with TRACER.activate(trace), TRACER.span("vnf_start", vnf_id=vnf_id):
+                    return self._start_vnfd(self.vnfds[vnf_id], vnf_id), None
+            except Exception as ex:
+                LOG.exception("Starting VNF %r failed." % vnf_id)
+                return None, ex
+
+        pool = ThreadPool(max(1, min(VNF_START_WORKERS, len(vnf_ids))))
+        try:
+            results = pool.map(start, vnf_ids)
+        finally:
+            pool.close()
+            pool.join()
+        # report the first error after all workers are done (like the sequential start would have)
+        for vnfi, ex in results:
+            if ex is not None:
+                raise ex
+        return [vnfi for vnfi, ex in results]
+
     def stop_service(self, instance_uuid):
         """
         This method stops a running service instance.
@@ -266,9 +355,20 @@ class Service(object):
             # self._remove_placement(RoundRobinPlacement)
             None
 
+        # give the subnets of this instance back
+        self._release_network_ids(instance_uuid)
+
         # last step: remove the instance from the list of all instances
         del self.instances[instance_uuid]
 
+    def _release_network_ids(self, instance_uuid):
+        instance = self.instances[instance_uuid]
+        for idx in instance.get("eline_subnets", list()):
+            ELINE_SUBNET_POOL.release(idx)
+        for idx in instance.get("elan_subnets", list()):
+            ELAN_SUBNET_POOL.release(idx)
+        # the vlan tags of the E-LANs are given back by the network when their last VNF or SAP is removed
+
     def _start_vnfd(self, vnfd, vnf_id, **kwargs):
         """
         Start a single VNFD of this service
@@ -289,7 +389,9 @@ class Service(object):
             # 2. perform some checks to ensure we can start the container
             assert(docker_name is not None)
             assert(target_dc is not None)
-            if not self._check_docker_image_exists(docker_name):
+            with TRACER.span("image_check", image=docker_name):
+                image_exists = self._check_docker_image_exists(docker_name)
+            if not image_exists:
                 raise Exception("Docker image %r not found. Abort." % docker_name)
 
             # 3. get the resource limits
@@ -410,21 +512,21 @@ class Service(object):
         :param net_str: network configuration string, e.g., 1.2.3.4/24
         :return:
         """
+        with TRACER.span("reconfigure_network", vnf_name=vnfi.name, intf=if_name):
+            # assign new ip address
+            if net_str is not None:
+                intf = vnfi.intf(intf=if_name)
+                if intf is not None:
+                    intf.setIP(net_str)
+                    LOG.debug("Reconfigured network of %s:%s to %r" % (vnfi.name, if_name, net_str))
+                else:
+                    LOG.warning("Interface not found: %s:%s. Network reconfiguration skipped." % (vnfi.name, if_name))
 
-        # assign new ip address
-        if net_str is not None:
-            intf = vnfi.intf(intf=if_name)
-            if intf is not None:
-                intf.setIP(net_str)
-                LOG.debug("Reconfigured network of %s:%s to %r" % (vnfi.name, if_name, net_str))
-            else:
-                LOG.warning("Interface not found: %s:%s. Network reconfiguration skipped." % (vnfi.name, if_name))
-
-        if new_name is not None:
-            vnfi.cmd('ip link set', if_name, 'down')
-            vnfi.cmd('ip link set', if_name, 'name', new_name)
-            vnfi.cmd('ip link set', new_name, 'up')
-            LOG.debug("Reconfigured interface name of %s:%s to %s" % (vnfi.name, if_name, new_name))
+            if new_name is not None:
+                vnfi.cmd('ip link set', if_name, 'down')
+                vnfi.cmd('ip link set', if_name, 'name', new_name)
+                vnfi.cmd('ip link set', new_name, 'up')
+                LOG.debug("Reconfigured interface name of %s:%s to %s" % (vnfi.name, if_name, new_name))
 
 
 
@@ -590,6 +692,10 @@ class Service(object):
         # cookie is used as identifier for the flowrules installed by the dummygatekeeper
         # eg. different services get a unique cookie for their flowrules
         cookie = 1
+        # collect the flowrules of all E-Lines and push them to the controller at once
+        batch = None
+        if ELINE_FLOW_BATCH_MODE is not None:
+            batch = GK.net.newFlowBatch(mode=ELINE_FLOW_BATCH_MODE)
         for link in eline_fwd_links:
             # check if we need to deploy this link when its a management link:
             if USE_DOCKER_MGMT:
@@ -639,7 +745,9 @@ class Service(object):
                 src_vnfi = self._get_vnf_instance(instance_uuid, src_id)
                 dst_vnfi = self._get_vnf_instance(instance_uuid, dst_id)
                 if src_vnfi is not None and dst_vnfi is not None:
-                    eline_net = ELINE_SUBNETS.pop(0)
+                    subnet_idx = ELINE_SUBNET_POOL.allocate()
+                    self.instances[instance_uuid]["eline_subnets"].append(subnet_idx)
+                    eline_net = ELINE_SUBNETS[subnet_idx]
                     ip1 = "{0}/{1}".format(str(eline_net[1]), eline_net.prefixlen)
                     ip2 = "{0}/{1}".format(str(eline_net[2]), eline_net.prefixlen)
                     self._vnf_reconfigure_network(src_vnfi, src_if_name, ip1)
@@ -648,14 +756,25 @@ class Service(object):
 
             # Set the chaining
             if setChaining:
-                ret = GK.net.setChain(
-                    src_id, dst_id,
-                    vnf_src_interface=src_if_name, vnf_dst_interface=dst_if_name,
-                    bidirectional=BIDIRECTIONAL_CHAIN, cmd="add-flow", cookie=cookie, priority=10)
+                with TRACER.span("setChain", src=src_id, dst=dst_id):
+                    ret = GK.net.setChain(
+                        src_id, dst_id,
+                        vnf_src_interface=src_if_name, vnf_dst_interface=dst_if_name,
+                        bidirectional=BIDIRECTIONAL_CHAIN, cmd="add-flow", cookie=cookie, priority=10, batch=batch)
                 LOG.debug(
                     "Setting up E-Line link. (%s:%s) -> (%s:%s)" % (
                         src_id, src_if_name, dst_id, dst_if_name))
 
+        if batch is not None:
+            with TRACER.span("flow_batch_commit", flowrules=len(batch)):
+                result = batch.commit()
+            self.instances[instance_uuid]["eline_flow_batch"] = result
+            LOG.info("Installed %d of %d E-Line flowrules (%d failed, %d rolled back) in %.3fs" % (
+                result["installed"], result["total"], len(result["failed"]), result["rolled_back"],
+                result["duration"]))
+            if not result["success"] and ELINE_FLOW_BATCH_MODE == "all-or-nothing":
+                raise Exception("E-Line setup failed: %d flowrules could not be installed." % len(result["failed"]))
+
 
     def _connect_elans(self, elan_fwd_links, instance_uuid):
         """
@@ -679,7 +798,9 @@ class Service(object):
                 lan_hosts = list(lan_net.hosts())
                 sap_ip = str(lan_hosts.pop(0))
             else:
-                lan_net = ELAN_SUBNETS.pop(0)
+                subnet_idx = ELAN_SUBNET_POOL.allocate()
+                self.instances[instance_uuid]["elan_subnets"].append(subnet_idx)
+                lan_net = ELAN_SUBNETS[subnet_idx]
                 lan_hosts = list(lan_net.hosts())
 
             # generate lan ip address for all interfaces except external SAPs
@@ -714,7 +835,8 @@ class Service(object):
                     elan_vnf_list.append({'name': src_docker_name, 'interface': intf_name})
 
             # install the VLAN tags for this E-LAN
-            GK.net.setLAN(elan_vnf_list)
+            with TRACER.span("setLAN", vnfs=len(elan_vnf_list)):
+                GK.net.setLAN(elan_vnf_list)
 
 
     def _load_docker_files(self):
@@ -1155,6 +1277,10 @@ def reset_subnets():
     # 10.30.xxx.0/30
     global ELINE_SUBNETS
     ELINE_SUBNETS = generate_subnets('10.30', 0, subnet_size=50, mask=30)
+    global ELAN_SUBNET_POOL
+    ELAN_SUBNET_POOL = IdPool("elan_subnet", 0, len(ELAN_SUBNETS) - 1)
+    global ELINE_SUBNET_POOL
+    ELINE_SUBNET_POOL = IdPool("eline_subnet", 0, len(ELINE_SUBNETS) - 1)
 
 if __name__ == '__main__':
     """
@@ -88,6 +88,16 @@ class RestApiClient():
         response = put(url, params=params)
         pp.pprint(response.text)
 
+    def rate(self, args):
+        params = self._create_dict(
+            vnf_name=self._parse_vnf_name(args.get("vnf_name")) if args.get("vnf_name") else None,
+            vnf_interface=self._parse_vnf_interface(args.get("vnf_name")) if args.get("vnf_name") else None,
+            metric=args.get("metric"))
+
+        url = "{0}/restapi/monitor/rate".format(args.get("endpoint"))
+        response = get(url, params=params)
+        pp.pprint(response.json())
+
     def prometheus(self, args):
         # This functions makes it more user-friendly to create the correct prometheus query
         # <uuid> is replaced by the correct uuid of the deployed vnf container
@@ -124,8 +134,8 @@ class RestApiClient():
 parser = argparse.ArgumentParser(description='son-emu-cli monitor')
 parser.add_argument(
     "command",
-    choices=['setup_metric', 'stop_metric', 'setup_flow', 'stop_flow','prometheus'],
-    help="setup/stop a metric/flow to be monitored or query Prometheus")
+    choices=['setup_metric', 'stop_metric', 'setup_flow', 'stop_flow', 'rate', 'prometheus'],
+    help="setup/stop a metric/flow to be monitored, get the monitored rates or query Prometheus")
 parser.add_argument(
     "--vnf_name", "-vnf", dest="vnf_name",
     help="vnf name:interface to be monitored")
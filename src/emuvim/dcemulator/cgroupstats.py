@@ -0,0 +1,365 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+
+LOG = logging.getLogger("dcemulator.cgroupstats")
+LOG.setLevel(logging.DEBUG)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+PROC_ROOT = "/proc"
+# seconds between two samples of all containers
+SAMPLE_INTERVAL = 1.0
+# the sampler stops after this many seconds without a request (and is started again by the next one)
+IDLE_TIMEOUT = 300.0
+
+_CONTAINER_ID = re.compile("^(?:docker-)?([0-9a-f]{64})(?:\.scope)?$")
+
+
+def _cgroup_v2(root=CGROUP_ROOT):
+    return os.path.exists(os.path.join(root, "cgroup.controllers"))
+
+
+def _cgroup_parents(root):
+    if _cgroup_v2(root):
+        return [os.path.join(root, "docker"), os.path.join(root, "system.slice")]
+    return [os.path.join(root, "cpuacct", "docker"), os.path.join(root, "cpuacct", "system.slice"),
+            os.path.join(root, "cpu,cpuacct", "docker"), os.path.join(root, "cpu,cpuacct", "system.slice")]
+
+
+def find_container_cgroup(container_id, root=CGROUP_ROOT):
+    """
+    Cgroup directory of a single docker container, without scanning the other containers.
+    :return: cgroup directory (v2) or cpuacct directory (v1), or None if not found
+    """
+    for parent in _cgroup_parents(root):
+        for entry in [container_id, "docker-%s.scope" % container_id]:
+            path = os.path.join(parent, entry)
+            if os.path.isdir(path):
+                return path
+    return None
+
+
+def find_container_cgroups(root=CGROUP_ROOT):
+    """
+    Cgroup directories of all docker containers (cgroupfs and systemd cgroup driver, cgroup v1 and v2).
+    :return: dict: container id -> cgroup directory (v2) or cpuacct directory (v1)
+    """
+    result = dict()
+    for parent in _cgroup_parents(root):
+        try:
+            entries = os.listdir(parent)
+        except OSError:
+            continue
+        for entry in entries:
+            m = _CONTAINER_ID.match(entry)
+            if m is not None:
+                result.setdefault(m.group(1), os.path.join(parent, entry))
+    return result
+
+
+class ContainerCounters(object):
+    """
+    Counters of one container, read from the cgroup and from the network namespace of its first process.
+    The files are opened once and read again from the start for every sample.
+    """
+
+    def __init__(self, container_id, cgroup_dir, root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        self.container_id = container_id
+        self.v2 = _cgroup_v2(root)
+        self._files = dict()
+        if self.v2:
+            paths = {"cpu": os.path.join(cgroup_dir, "cpu.stat"),
+                     "mem_used": os.path.join(cgroup_dir, "memory.current"),
+                     "mem_limit": os.path.join(cgroup_dir, "memory.max"),
+                     "blkio": os.path.join(cgroup_dir, "io.stat"),
+                     "procs": os.path.join(cgroup_dir, "cgroup.procs")}
+        else:
+            # the other controllers use the same layout as cpuacct
+            memory_dir = cgroup_dir.replace(os.path.join(root, "cpuacct"), os.path.join(root, "memory"), 1)
+            memory_dir = memory_dir.replace(os.path.join(root, "cpu,cpuacct"), os.path.join(root, "memory"), 1)
+            blkio_dir = memory_dir.replace(os.path.join(root, "memory"), os.path.join(root, "blkio"), 1)
+            paths = {"cpu": os.path.join(cgroup_dir, "cpuacct.usage_percpu"),
+                     "mem_used": os.path.join(memory_dir, "memory.usage_in_bytes"),
+                     "mem_limit": os.path.join(memory_dir, "memory.limit_in_bytes"),
+                     "blkio": os.path.join(blkio_dir, "blkio.throttle.io_service_bytes"),
+                     "procs": os.path.join(cgroup_dir, "tasks")}
+        for key, path in paths.items():
+            try:
+                self._files[key] = open(path, "r")
+            except IOError:
+                self._files[key] = None
+        self.pid = None
+        self._net = None
+        self._proc_root = proc_root
+        self._open_net()
+
+    def _read(self, key):
+        f = self._files.get(key)
+        if f is None:
+            return None
+        f.seek(0)
+        return f.read()
+
+    def _open_net(self):
+        procs = self._read("procs")
+        if not procs:
+            return
+        self.pid = int(procs.split()[0])
+        try:
+            self._net = open(os.path.join(self._proc_root, str(self.pid), "net", "dev"), "r")
+        except IOError:
+            self._net = None
+
+    def cpu(self):
+        """
+        :return: (used cpu time in nanoseconds since the container was started, number of cpu cores)
+        """
+        data = self._read("cpu")
+        if data is None:
+            return None, None
+        if self.v2:
+            for line in data.splitlines():
+                if line.startswith("usage_usec"):
+                    return int(line.split()[1]) * 1000, multiprocessing.cpu_count()
+            return None, None
+        numbers = [int(x) for x in data.split()]
+        return sum(numbers), len(numbers)
+
+    def memory(self):
+        """
+        :return: (used bytes, limit in bytes or None if unlimited)
+        """
+        used = self._read("mem_used")
+        limit = self._read("mem_limit")
+        used = int(used) if used else None
+        if not limit or limit.strip() == "max":
+            return used, None
+        return used, int(limit)
+
+    def block_io(self):
+        """
+        :return: (bytes read, bytes written) by all devices
+        """
+        data = self._read("blkio")
+        if data is None:
+            return None, None
+        read = 0
+        write = 0
+        for line in data.splitlines():
+            fields = line.split()
+            if self.v2:
+                for field in fields[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "rbytes":
+                        read += int(value)
+                    elif key == "wbytes":
+                        write += int(value)
+            elif len(fields) == 3 and fields[1] == "Read":
+                read += int(fields[2])
+            elif len(fields) == 3 and fields[1] == "Write":
+                write += int(fields[2])
+        return read, write
+
+    def network(self):
+        """
+        :return: (bytes received, bytes sent) by all interfaces of the container
+        """
+        if self._net is None:
+            self._open_net()
+            if self._net is None:
+                return None, None
+        self._net.seek(0)
+        rx = 0
+        tx = 0
+        # skip the two header lines
+        for line in self._net.readlines()[2:]:
+            _, _, counters = line.partition(":")
+            fields = counters.split()
+            if len(fields) >= 9:
+                rx += int(fields[0])
+                tx += int(fields[8])
+        return rx, tx
+
+    def processes(self):
+        """
+        :return: number of processes (v2) or tasks (v1) in the container
+        """
+        data = self._read("procs")
+        return None if data is None else len(data.split())
+
+    def sample(self):
+        """
+        :return: dict with all counters and the time of the sample (t, nanoseconds)
+        """
+        s = dict()
+        s["t"] = int(time.time() * 1000000000)
+        s["cpu_used"], s["cpu_cores"] = self.cpu()
+        s["mem_used"], s["mem_limit"] = self.memory()
+        s["block_read"], s["block_write"] = self.block_io()
+        s["net_in"], s["net_out"] = self.network()
+        return s
+
+    def close(self):
+        for f in self._files.values() + [self._net]:
+            if f is not None:
+                f.close()
+        self._files = dict()
+        self._net = None
+
+
+def _rate(first, second, key):
+    if first.get(key) is None or second.get(key) is None or second["t"] <= first["t"]:
+        return None
+    return (second[key] - first[key]) * 1000000000 / float(second["t"] - first["t"])
+
+
+class ContainerStatsSampler(object):
+    """
+    Samples the counters of all docker containers on a fixed tick and keeps the last two samples of each,
+    so the current rates can be served instantly. The sampler thread is started by the first request
+    and stops again when nobody asked for stats for IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, idle_timeout=IDLE_TIMEOUT, root=CGROUP_ROOT, proc_root=PROC_ROOT):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.root = root
+        self.proc_root = proc_root
+        # container id -> ContainerCounters
+        self._counters = dict()
+        # container id -> (previous sample, last sample)
+        self._samples = dict()
+        self._lock = threading.Lock()
+        self._sampled = threading.Condition(self._lock)
+        self._thread = None
+        self._last_request = 0
+
+    def counters(self, container_id, cgroup_dir=None):
+        """
+        The (persistent) counters of a container, e.g. to read single values.
+        :param cgroup_dir: cgroup directory of the container if already known, default: looked up
+        :return: ContainerCounters or None if no cgroup was found for the container
+        """
+        with self._lock:
+            c = self._counters.get(container_id)
+        if c is not None:
+            return c
+        if cgroup_dir is None:
+            cgroup_dir = find_container_cgroup(container_id, self.root)
+            if cgroup_dir is None:
+                return None
+        c = ContainerCounters(container_id, cgroup_dir, root=self.root, proc_root=self.proc_root)
+        with self._lock:
+            if container_id in self._counters:
+                c.close()
+                return self._counters[container_id]
+            self._counters[container_id] = c
+        return c
+
+    def rates(self, container_id, timeout=None):
+        """
+        Current rates of a container. Served from the last two samples, only the first request
+        for a container waits for the samples (at most two ticks).
+        :param container_id: full container id
+        :param timeout: max. seconds to wait for the first samples, default: 2 * interval + 1
+        :return: dict: CPU_% (fraction of one core), CPU_cores, MEM_used, MEM_limit, NET_in/s, NET_out/s,
+            BLOCK_read/s, BLOCK_write/s (bytes/s), or None if the container is unknown
+        """
+        self._last_request = time.time()
+        self._ensure_running()
+        if self.counters(container_id) is None:
+            return None
+        timeout = 2 * self.interval + 1 if timeout is None else timeout
+        end = time.time() + timeout
+        with self._lock:
+            while len(self._samples.get(container_id, ())) < 2 and time.time() < end:
+                self._sampled.wait(max(0.0, min(self.interval, end - time.time())))
+            samples = self._samples.get(container_id)
+        if samples is None or len(samples) < 2:
+            return None
+        first, second = samples
+        result = {"CPU_%": _rate(first, second, "cpu_used"), "CPU_cores": second["cpu_cores"],
+                  "MEM_used": second["mem_used"], "MEM_limit": second["mem_limit"]}
+        for key, out in [("net_in", "NET_in/s"), ("net_out", "NET_out/s"),
+                         ("block_read", "BLOCK_read/s"), ("block_write", "BLOCK_write/s")]:
+            r = _rate(first, second, key)
+            result[out] = None if r is None else int(r + 0.5)
+        if result["CPU_%"] is not None:
+            result["CPU_%"] /= 1000000000.0
+        return result
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="cgroup-stats-sampler")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        LOG.debug("Container stats sampler started (interval=%.2fs)" % self.interval)
+        while time.time() - self._last_request < self.idle_timeout:
+            start = time.time()
+            try:
+                self._tick()
+            except Exception:
+                LOG.exception("Sampling container stats failed.")
+            time.sleep(max(0.0, self.interval - (time.time() - start)))
+        with self._lock:
+            self._thread = None
+            self._samples.clear()
+        LOG.debug("Container stats sampler stopped (idle)")
+
+    def _tick(self):
+        cgroups = find_container_cgroups(self.root)
+        with self._lock:
+            gone = [cid for cid in self._counters if cid not in cgroups]
+            for cid in gone:
+                self._counters.pop(cid).close()
+                self._samples.pop(cid, None)
+        for cid, cgroup_dir in cgroups.items():
+            c = self.counters(cid, cgroup_dir)
+            try:
+                s = c.sample()
+            except (IOError, ValueError):
+                # container is just going away
+                continue
+            with self._lock:
+                previous = self._samples.get(cid)
+                self._samples[cid] = (previous[-1], s) if previous else (s,)
+        with self._lock:
+            self._sampled.notify_all()
+
+
+# sampler shared by all stats requests
+STATS_SAMPLER = ContainerStatsSampler()
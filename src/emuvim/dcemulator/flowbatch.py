@@ -0,0 +1,202 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+import requests
+
+LOG = logging.getLogger("dcemulator.flowbatch")
+LOG.setLevel(logging.DEBUG)
+
+# install as many flow entries as possible, report the failed ones
+BEST_EFFORT = "best-effort"
+# stop on the first failure and remove all flow entries installed by this batch
+ALL_OR_NOTHING = "all-or-nothing"
+
+BATCH_MODES = [BEST_EFFORT, ALL_OR_NOTHING]
+
+# max. number of switches that are served in parallel during a commit
+DEFAULT_MAX_WORKERS = 16
+
+
+class RyuFlowBatch(object):
+    """
+    Collects flow-mods for the Ryu ofctl_rest API instead of sending
+    each of them in a separate, blocking REST call.
+
+    On commit, all flow-mods of one switch (dpid) are pushed in one burst
+    over a single keep-alive connection, while different switches are served in parallel.
+    The order of the flow-mods of a single switch is preserved.
+    """
+
+    def __init__(self, ryu_REST_api, mode=BEST_EFFORT, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param ryu_REST_api: base url of the Ryu REST API, e.g. http://localhost:8080
+        :param mode: BEST_EFFORT or ALL_OR_NOTHING
+        :param max_workers: max. number of switches that are programmed in parallel
+        """
+        if mode not in BATCH_MODES:
+            raise Exception("Unknown flow batch mode: %r (use one of %r)" % (mode, BATCH_MODES))
+        self.ryu_REST_api = ryu_REST_api
+        self.mode = mode
+        self.max_workers = max(1, int(max_workers))
+        self.committed = False
+        self._entries = list()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, prefix, flow):
+        """
+        Queue a single flow-mod.
+        :param prefix: Ryu REST prefix, e.g. 'stats/flowentry/add'
+        :param flow: flow dict as expected by Ryu (must contain 'dpid')
+        :return: None
+        """
+        with self._lock:
+            if self.committed:
+                raise Exception("Flow batch was already committed.")
+            self._entries.append((prefix, flow))
+
+    def commit(self):
+        """
+        Push all queued flow-mods to the controller.
+        :return: result dict: {mode, total, installed, failed: [{dpid, prefix, flow, status, reason}], rolled_back,
+                 duration, success}
+        """
+        with self._lock:
+            if self.committed:
+                raise Exception("Flow batch was already committed.")
+            self.committed = True
+            entries = list(self._entries)
+
+        start_time = time.time()
+        # group by switch, keep the order within a switch
+        per_dpid = OrderedDict()
+        for prefix, flow in entries:
+            per_dpid.setdefault(flow.get('dpid'), list()).append((prefix, flow))
+
+        abort = threading.Event()
+        sent = dict()
+        failed = dict()
+        dpids = list(per_dpid.iterkeys())
+        # serve at most max_workers switches at the same time
+        for i in range(0, len(dpids), self.max_workers):
+            threads = list()
+            for dpid in dpids[i:i + self.max_workers]:
+                sent[dpid] = list()
+                failed[dpid] = list()
+                t = threading.Thread(target=self._push_switch,
+                                     args=(per_dpid[dpid], sent[dpid], failed[dpid], abort))
+                t.daemon = True
+                t.start()
+                threads.append(t)
+            for t in threads:
+                t.join()
+
+        failures = [f for dpid in dpids for f in failed.get(dpid, [])]
+        installed = [e for dpid in dpids for e in sent.get(dpid, [])]
+
+        rolled_back = 0
+        if failures and self.mode == ALL_OR_NOTHING:
+            rolled_back = self._rollback(installed)
+            installed = list()
+
+        result = {
+            "mode": self.mode,
+            "total": len(entries),
+            "installed": len(installed),
+            "failed": failures,
+            "rolled_back": rolled_back,
+            "duration": time.time() - start_time,
+            "success": len(failures) == 0
+        }
+        LOG.debug("Flow batch committed: mode=%s total=%d installed=%d failed=%d rolled_back=%d in %.3fs" % (
+            self.mode, result["total"], result["installed"], len(failures), rolled_back, result["duration"]))
+        for f in failures:
+            LOG.warning("Flow-mod failed on dpid %r (%s): %s %s" % (f["dpid"], f["prefix"], f["status"], f["reason"]))
+        return result
+
+    def _push_switch(self, entries, sent, failed, abort):
+        """
+        Send all flow-mods of one switch over a single session.
+        Runs in its own thread.
+        """
+        session = requests.Session()
+        try:
+            for prefix, flow in entries:
+                if self.mode == ALL_OR_NOTHING and abort.is_set():
+                    return
+                status, reason = self._post(session, prefix, flow)
+                if status == requests.codes.ok:
+                    sent.append((prefix, flow))
+                else:
+                    failed.append({"dpid": flow.get('dpid'), "prefix": prefix, "flow": flow,
+                                   "status": status, "reason": reason})
+                    if self.mode == ALL_OR_NOTHING:
+                        abort.set()
+                        return
+        finally:
+            session.close()
+
+    def _post(self, session, prefix, flow):
+        url = self.ryu_REST_api + '/' + str(prefix)
+        try:
+            req = session.post(url, json=flow)
+            return req.status_code, req.reason
+        except Exception as ex:
+            return None, str(ex)
+
+    def _rollback(self, installed):
+        """
+        Remove all flow entries that have been added by this batch.
+        Only 'add' flow-mods can be undone, deletions are not restored.
+        :return: number of removed flow entries
+        """
+        session = requests.Session()
+        removed = 0
+        try:
+            for prefix, flow in reversed(installed):
+                if not prefix.endswith('flowentry/add'):
+                    continue
+                del_flow = deepcopy(flow)
+                del_flow.pop('actions', None)
+                if 'cookie' in del_flow:
+                    del_flow['cookie_mask'] = int('0xffffffffffffffff', 16)
+                status, reason = self._post(session, 'stats/flowentry/delete_strict', del_flow)
+                if status == requests.codes.ok:
+                    removed += 1
+                else:
+                    LOG.warning("Rollback of flow entry on dpid %r failed: %s %s" % (flow.get('dpid'), status, reason))
+        finally:
+            session.close()
+        return removed
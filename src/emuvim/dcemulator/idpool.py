@@ -0,0 +1,183 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+import weakref
+from collections import deque
+
+LOG = logging.getLogger("dcemulator.idpool")
+LOG.setLevel(logging.DEBUG)
+
+# all pools that are alive, used to report their utilization
+_POOLS = weakref.WeakSet()
+
+
+class IdPoolExhausted(Exception):
+    pass
+
+
+class IdPool(object):
+    """
+    Thread-safe pool of integer ids in the range [first, last],
+    e.g. VLAN tags, OpenFlow cookies or flow group ids.
+
+    allocate() and release() are O(1): ids that were never handed out are taken
+    from a counter, released ids are kept in a FIFO queue and are only handed out again
+    when the counter is exhausted, so a recycled id stays unused for as long as possible.
+    Ids that are used by someone else (e.g. a cookie that was given by the user)
+    can be marked with reserve().
+    With recycle_first=True, released ids are handed out before fresh ones,
+    which keeps the used ids small and dense (e.g. for cookies that are reused as table ids).
+    """
+
+    def __init__(self, name, first, last, recycle_first=False):
+        if last < first:
+            raise ValueError("Invalid id range [%r, %r] for pool %r" % (first, last, name))
+        self.name = name
+        self.first = first
+        self.last = last
+        self.recycle_first = recycle_first
+        self._next = first
+        self._free = deque()
+        self._used = set()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.releases = 0
+        self.peak = 0
+        _POOLS.add(self)
+
+    @property
+    def size(self):
+        return self.last - self.first + 1
+
+    def allocate(self):
+        """
+        Take a free id out of the pool.
+        :return: id
+        :raises IdPoolExhausted: if all ids are in use
+        """
+        with self._lock:
+            if self.recycle_first:
+                new_id = self._take_recycled()
+                if new_id is None:
+                    new_id = self._take_fresh()
+            else:
+                new_id = self._take_fresh()
+                if new_id is None:
+                    new_id = self._take_recycled()
+            if new_id is None:
+                raise IdPoolExhausted("No free id left in pool %r (%d ids in use)" % (self.name, len(self._used)))
+            self._take(new_id)
+            return new_id
+
+    def reserve(self, id):
+        """
+        Mark an id as used without allocating it, e.g. because it was chosen by the user.
+        Ids outside of the range of the pool are ignored.
+        :return: True if the id was free before
+        """
+        if not self.first <= id <= self.last:
+            return False
+        with self._lock:
+            if id in self._used:
+                return False
+            # the id stays in the free queue / counter range and is skipped when it comes up
+            self._take(id)
+            return True
+
+    def release(self, id):
+        """
+        Give an id back to the pool. Unknown ids (or ids that are already free) are ignored.
+        :return: True if the id was in use
+        """
+        with self._lock:
+            if id not in self._used:
+                return False
+            self._used.remove(id)
+            self.releases += 1
+            if id < self._next:
+                self._free.append(id)
+            return True
+
+    def in_use(self, id):
+        with self._lock:
+            return id in self._used
+
+    def stats(self):
+        """
+        Utilization counters of this pool.
+        """
+        with self._lock:
+            used = len(self._used)
+            return {
+                "name": self.name,
+                "size": self.size,
+                "in_use": used,
+                "free": self.size - used,
+                "allocations": self.allocations,
+                "releases": self.releases,
+                "peak": self.peak
+            }
+
+    def _take_fresh(self):
+        # skip the ids that have been reserved in the meantime
+        while self._next <= self.last:
+            candidate = self._next
+            self._next += 1
+            if candidate not in self._used:
+                return candidate
+        return None
+
+    def _take_recycled(self):
+        # skip the ids that have been reserved again since their release
+        while self._free:
+            candidate = self._free.popleft()
+            if candidate not in self._used:
+                return candidate
+        return None
+
+    def _take(self, id):
+        self._used.add(id)
+        self.allocations += 1
+        self.peak = max(self.peak, len(self._used))
+
+
+def get_pool_stats():
+    """
+    Utilization counters of all pools that are alive.
+    :return: dict: pool name -> stats (pools with the same name are summed up)
+    """
+    result = dict()
+    for pool in list(_POOLS):
+        s = pool.stats()
+        if s["name"] in result:
+            for k in ["size", "in_use", "free", "allocations", "releases", "peak"]:
+                result[s["name"]][k] += s[k]
+        else:
+            result[s["name"]] = s
+    return result
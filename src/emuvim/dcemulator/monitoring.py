@@ -32,13 +32,19 @@ from mininet.node import  OVSSwitch
 import ast
 import time
 from prometheus_client import start_http_server, Summary, Histogram, Gauge, Counter, REGISTRY, CollectorRegistry, \
-    pushadd_to_gateway, push_to_gateway, delete_from_gateway
+    pushadd_to_gateway, push_to_gateway, delete_from_gateway, generate_latest, CONTENT_TYPE_LATEST
 import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from multiprocessing.pool import ThreadPool
 from subprocess import Popen
 import os
 import docker
 import json
+import requests
 from copy import deepcopy
+from collections import deque
+from emuvim.dcemulator.cgroupstats import ContainerCounters, find_container_cgroup, CGROUP_ROOT
 
 logging.basicConfig()
 
@@ -47,15 +53,67 @@ class to read openflow stats from the Ryu controller of the DCNetwork
 """
 
 PUSHGATEWAY_PORT = 9091
+# port of the /metrics endpoint if the metrics are scraped directly from son-emu
+SCRAPE_PORT = 9092
 # we cannot use port 8080 because ryu-ofrest api  is already using that one
 CADVISOR_PORT = 8081
 
 COOKIE_MASK = 0xffffffff
 
+# the SDN metrics are pushed to the Prometheus pushgateway
+EXPORT_PUSH = "push"
+# the SDN metrics are served on an in-process /metrics endpoint to be scraped by Prometheus
+EXPORT_SCRAPE = "scrape"
+EXPORT_MODES = [EXPORT_PUSH, EXPORT_SCRAPE]
+
+# number of rate samples kept per monitored metric
+RATE_SAMPLES = 300
+# default time window (seconds) of the exported rate statistics
+RATE_WINDOW = 60
+RATE_PERCENTILES = [50, 90, 99]
+RATE_STATS = ['current', 'min', 'max'] + ['p{0}'.format(p) for p in RATE_PERCENTILES]
+
+# default polling interval of a monitored metric (seconds)
+MONITOR_INTERVAL = 1.0
+# max. number of parallel Ryu requests in a monitoring cycle
+MONITOR_WORKERS = 8
+
+# CPU and memory usage of the VNF containers are read from their cgroups by the monitor itself
+CONTAINER_STATS_BUILTIN = "builtin"
+# CPU and memory usage of all containers on the host are exported by an external cAdvisor container
+CONTAINER_STATS_CADVISOR = "cadvisor"
+# no container stats
+CONTAINER_STATS_NONE = None
+CONTAINER_STATS_MODES = [CONTAINER_STATS_BUILTIN, CONTAINER_STATS_CADVISOR, CONTAINER_STATS_NONE]
+# default sampling interval of the built-in container stats (seconds)
+CONTAINER_STATS_INTERVAL = 1.0
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
 class DCNetworkMonitor():
-    def __init__(self, net):
+    def __init__(self, net, export_mode=EXPORT_PUSH, scrape_port=SCRAPE_PORT, rate_window=RATE_WINDOW,
+                 container_stats=CONTAINER_STATS_CADVISOR, container_stats_interval=CONTAINER_STATS_INTERVAL):
+        """
+        :param net: the DCNetwork to be monitored
+        :param export_mode: EXPORT_PUSH (push to the pushgateway) or EXPORT_SCRAPE (serve /metrics on scrape_port)
+        :param scrape_port: port of the /metrics endpoint in scrape mode
+        :param rate_window: time window (seconds) of the min/max/percentile rate statistics
+        :param container_stats: CONTAINER_STATS_CADVISOR (start a cAdvisor container, default),
+            CONTAINER_STATS_BUILTIN (export the cgroup stats of the VNF containers, opt-in) or CONTAINER_STATS_NONE
+        :param container_stats_interval: sampling interval (seconds) of the built-in container stats
+        """
+        if export_mode not in EXPORT_MODES:
+            raise Exception("Unknown monitor export mode: %r (use one of %r)" % (export_mode, EXPORT_MODES))
+        if container_stats not in CONTAINER_STATS_MODES:
+            raise Exception("Unknown container stats mode: %r (use one of %r)" % (
+                container_stats, CONTAINER_STATS_MODES))
         self.net = net
         self.dockercli = docker.from_env()
+        self.export_mode = export_mode
+        self.metrics_server = None
+        self.rate_window = rate_window
 
         # pushgateway address
         self.pushgateway = 'localhost:{0}'.format(PUSHGATEWAY_PORT)
@@ -74,6 +132,20 @@ class DCNetworkMonitor():
         self.prom_metrics={'tx_packets':self.prom_tx_packet_count, 'rx_packets':self.prom_rx_packet_count,
                            'tx_bytes':self.prom_tx_byte_count,'rx_bytes':self.prom_rx_byte_count}
 
+        # rates, calculated from the counters and the switch timestamps
+        # stat: current rate or min, max, percentiles over the rate window
+        self.prom_tx_packet_rate = Gauge('sonemu_tx_rate_packets', 'Packets per second sent',
+                                         ['vnf_name', 'vnf_interface', 'flow_id', 'stat'], registry=self.registry)
+        self.prom_rx_packet_rate = Gauge('sonemu_rx_rate_packets', 'Packets per second received',
+                                         ['vnf_name', 'vnf_interface', 'flow_id', 'stat'], registry=self.registry)
+        self.prom_tx_bit_rate = Gauge('sonemu_tx_rate_bits', 'Bits per second sent',
+                                      ['vnf_name', 'vnf_interface', 'flow_id', 'stat'], registry=self.registry)
+        self.prom_rx_bit_rate = Gauge('sonemu_rx_rate_bits', 'Bits per second received',
+                                      ['vnf_name', 'vnf_interface', 'flow_id', 'stat'], registry=self.registry)
+
+        self.prom_rate_metrics = {'tx_packets': self.prom_tx_packet_rate, 'rx_packets': self.prom_rx_packet_rate,
+                                  'tx_bytes': self.prom_tx_bit_rate, 'rx_bytes': self.prom_rx_bit_rate}
+
         # list of installed metrics to monitor
         # each entry can contain this data
         '''
@@ -85,6 +157,10 @@ class DCNetworkMonitor():
         previous_monitor_time = 0
         metric_key = None
         mon_port = None
+        interval = MONITOR_INTERVAL
+        next_poll = 0
+        rate_samples = deque([(time, rate), ...])
+        rate_stats = {current, min, max, p50, p90, p99}
         }
         '''
         self.monitor_lock = threading.Lock()
@@ -93,45 +169,77 @@ class DCNetworkMonitor():
         self.flow_metrics = []
         self.skewmon_metrics = {}
 
+        # timing of the monitoring loop itself
+        self.prom_cycle_time = Gauge('sonemu_monitor_cycle_seconds', 'Duration of the last monitoring cycle',
+                                     registry=self.registry)
+        self.prom_poll_lag = Gauge('sonemu_monitor_poll_lag_seconds',
+                                   'Max. delay between scheduled and actual poll time in the last monitoring cycle',
+                                   registry=self.registry)
+        self.monitor_stats = {'cycles': 0, 'last_cycle_time': 0.0, 'max_cycle_time': 0.0,
+                              'last_poll_lag': 0.0, 'max_poll_lag': 0.0, 'skipped_polls': 0}
+
+        # cgroup stats of the VNF containers, sampled by the monitoring loop
+        self.container_stats = container_stats
+        self.container_stats_interval = container_stats_interval
+        self.cgroup_root = CGROUP_ROOT
+        self.prom_container_cpu_time = Gauge('sonemu_container_cpu_usage_seconds',
+                                             'CPU time used by the VNF container since its start',
+                                             ['vnf_name', 'datacenter'], registry=self.registry)
+        self.prom_container_cpu_load = Gauge('sonemu_container_cpu_load',
+                                             'CPU cores used by the VNF container in the last sampling interval',
+                                             ['vnf_name', 'datacenter'], registry=self.registry)
+        self.prom_container_mem_used = Gauge('sonemu_container_memory_usage_bytes',
+                                             'Memory used by the VNF container',
+                                             ['vnf_name', 'datacenter'], registry=self.registry)
+        self.prom_container_mem_limit = Gauge('sonemu_container_memory_limit_bytes',
+                                              'Memory limit of the VNF container',
+                                              ['vnf_name', 'datacenter'], registry=self.registry)
+        self.prom_container_metrics = [self.prom_container_cpu_time, self.prom_container_cpu_load,
+                                       self.prom_container_mem_used, self.prom_container_mem_limit]
+        # container id -> {counters, vnf_name, datacenter, cpu_used, time}
+        self._containers = dict()
+        self._container_stats_next = 0
+
+        # Ryu requests are done in parallel, each worker thread uses its own http session
+        self._worker_pool = ThreadPool(MONITOR_WORKERS)
+        self._sessions = threading.local()
+        # used to wake up the scheduler when metrics are added or the monitor is stopped
+        self._wakeup = threading.Event()
+
         # start monitoring thread
         self.start_monitoring = True
-        self.monitor_thread = threading.Thread(target=self.get_network_metrics)
+        self.monitor_thread = threading.Thread(target=self._monitor_loop)
         self.monitor_thread.start()
 
-        self.monitor_flow_thread = threading.Thread(target=self.get_flow_metrics)
-        self.monitor_flow_thread.start()
-
         # helper tools
         # cAdvisor, Prometheus pushgateway are started as external container, to gather monitoring metric in son-emu
-        self.pushgateway_process = self.start_PushGateway()
-        self.cadvisor_process = self.start_cAdvisor()
+        self.pushgateway_process = None
+        if self.export_mode == EXPORT_PUSH:
+            self.pushgateway_process = self.start_PushGateway()
+        else:
+            self.metrics_server = self.start_metrics_server(scrape_port)
+        self.cadvisor_process = None
+        if self.container_stats == CONTAINER_STATS_CADVISOR:
+            self.cadvisor_process = self.start_cAdvisor()
 
 
     # first set some parameters, before measurement can start
-    def setup_flow(self, vnf_name, vnf_interface=None, metric='tx_packets', cookie=0):
+    def setup_flow(self, vnf_name, vnf_interface=None, metric='tx_packets', cookie=0, interval=None):
 
         flow_metric = {}
 
-        # check if port is specified (vnf:port)
-        if vnf_interface is None:
-            # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+        # check if port is specified (vnf:port), take first interface by default
+        vnf_switch = None
+        switch_port = self.net.find_connected_switch_port(vnf_name, vnf_interface)
+        if switch_port is not None:
+            if vnf_interface is None:
+                vnf_interface = switch_port.intf_id
+            vnf_switch = switch_port.switch
+            flow_metric['mon_port'] = switch_port.port_nr
 
         flow_metric['vnf_name'] = vnf_name
         flow_metric['vnf_interface'] = vnf_interface
 
-        vnf_switch = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    vnf_switch = connected_sw
-                    flow_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
-
         if not vnf_switch:
             logging.exception("vnf switch of {0}:{1} not found!".format(vnf_name, vnf_interface))
             return "vnf switch of {0}:{1} not found!".format(vnf_name, vnf_interface)
@@ -153,10 +261,13 @@ class DCNetworkMonitor():
             flow_metric['switch_dpid'] = int(str(next_node.dpid), 16)
             flow_metric['metric_key'] = metric
             flow_metric['cookie'] = cookie
+            flow_metric['interval'] = float(interval or MONITOR_INTERVAL)
+            flow_metric['next_poll'] = time.time()
 
             self.monitor_flow_lock.acquire()
             self.flow_metrics.append(flow_metric)
             self.monitor_flow_lock.release()
+            self._wakeup.set()
 
             logging.info('Started monitoring flow:{3} {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie))
             return 'Started monitoring flow:{3} {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie)
@@ -170,9 +281,9 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            switch_port = self.net.find_connected_switch_port(vnf_name)
+            if switch_port is not None:
+                vnf_interface = switch_port.intf_id
 
         for flow_dict in self.flow_metrics:
             if flow_dict['vnf_name'] == vnf_name and flow_dict['vnf_interface'] == vnf_interface \
@@ -181,16 +292,12 @@ class DCNetworkMonitor():
                 self.monitor_flow_lock.acquire()
 
                 self.flow_metrics.remove(flow_dict)
-
-                # set metric to NaN
-                self.prom_metrics[flow_dict['metric_key']]. \
-                    labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=cookie). \
-                    set(float('nan'))
-
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
+                self._remove_series(flow_dict['metric_key'], vnf_name, vnf_interface, cookie)
 
                 self.monitor_flow_lock.release()
 
+                self._export_metrics()
+
                 logging.info('Stopped monitoring flow {3}: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie))
                 return 'Stopped monitoring flow {3}: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric, cookie)
 
@@ -198,28 +305,22 @@ class DCNetworkMonitor():
 
 
     # first set some parameters, before measurement can start
-    def setup_metric(self, vnf_name, vnf_interface=None, metric='tx_packets'):
+    def setup_metric(self, vnf_name, vnf_interface=None, metric='tx_packets', interval=None):
 
         network_metric = {}
 
-        # check if port is specified (vnf:port)
-        if vnf_interface is None or vnf_interface == '':
-            # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+        # check if port is specified (vnf:port), take first interface by default
+        if vnf_interface == '':
+            vnf_interface = None
+        switch_port = self.net.find_connected_switch_port(vnf_name, vnf_interface)
+        if switch_port is not None:
+            if vnf_interface is None:
+                vnf_interface = switch_port.intf_id
+            network_metric['mon_port'] = switch_port.port_nr
 
         network_metric['vnf_name'] = vnf_name
         network_metric['vnf_interface'] = vnf_interface
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    network_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
-
         if 'mon_port' not in network_metric:
             logging.exception("vnf interface {0}:{1} not found!".format(vnf_name,vnf_interface))
             return "vnf interface {0}:{1} not found!".format(vnf_name,vnf_interface)
@@ -229,16 +330,7 @@ class DCNetworkMonitor():
             if metric is None:
                 metric = 'tx_packets'
 
-            vnf_switch = self.net.DCNetwork_graph.neighbors(str(vnf_name))
-
-            if len(vnf_switch) > 1:
-                logging.info("vnf: {0} has multiple ports".format(vnf_name))
-                return
-            elif len(vnf_switch) == 0:
-                logging.info("vnf: {0} is not connected".format(vnf_name))
-                return
-            else:
-                vnf_switch = vnf_switch[0]
+            vnf_switch = switch_port.switch
             next_node = self.net.getNodeByName(vnf_switch)
 
             if not isinstance(next_node, OVSSwitch):
@@ -251,10 +343,13 @@ class DCNetworkMonitor():
 
             network_metric['switch_dpid'] = int(str(next_node.dpid), 16)
             network_metric['metric_key'] = metric
+            network_metric['interval'] = float(interval or MONITOR_INTERVAL)
+            network_metric['next_poll'] = time.time()
 
             self.monitor_lock.acquire()
             self.network_metrics.append(network_metric)
             self.monitor_lock.release()
+            self._wakeup.set()
 
 
             logging.info('Started monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric))
@@ -269,9 +364,9 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            switch_port = self.net.find_connected_switch_port(vnf_name)
+            if switch_port is not None:
+                vnf_interface = switch_port.intf_id
 
         for metric_dict in deepcopy(self.network_metrics):
             if metric_dict['vnf_name'] == vnf_name and metric_dict['vnf_interface'] == vnf_interface \
@@ -280,22 +375,13 @@ class DCNetworkMonitor():
                 self.monitor_lock.acquire()
 
                 self.network_metrics.remove(metric_dict)
-
-                # set values to NaN, prometheus api currently does not support removal of metrics
-                #self.prom_metrics[metric_dict['metric_key']].labels(vnf_name, vnf_interface).set(float('nan'))
-                self.prom_metrics[metric_dict['metric_key']]. \
-                    labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=None). \
-                    set(float('nan'))
-
-                # this removes the complete metric, all labels...
-                # 1 single monitor job for all metrics of the SDN controller
-                # we can only  remove from the pushgateway grouping keys(labels) which we have defined for the add_to_pushgateway
-                # we can not specify labels from the metrics to be removed
-                # if we need to remove the metrics seperatelty, we need to give them a separate grouping key, and probably a diffferent registry also
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
+                # only the series of this metric is removed, the other metrics of the SDN controller job stay
+                self._remove_series(metric_dict['metric_key'], vnf_name, vnf_interface, None)
 
                 self.monitor_lock.release()
 
+                self._export_metrics()
+
                 logging.info('Stopped monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric))
                 return 'Stopped monitoring: {2} on {0}:{1}'.format(vnf_name, vnf_interface, metric)
 
@@ -303,10 +389,11 @@ class DCNetworkMonitor():
             elif metric_dict['vnf_name'] == vnf_name and vnf_interface is None and metric is None:
                 self.monitor_lock.acquire()
                 self.network_metrics.remove(metric_dict)
+                self._remove_series(metric_dict['metric_key'], vnf_name, metric_dict['vnf_interface'], None)
                 logging.info('remove metric from monitor: vnf_name:{0} vnf_interface:{1} mon_port:{2}'.format(metric_dict['vnf_name'], metric_dict['vnf_interface'], metric_dict['mon_port']))
 
-                delete_from_gateway(self.pushgateway, job='sonemu-SDNcontroller')
                 self.monitor_lock.release()
+                self._export_metrics()
                 continue
 
         if vnf_interface is None and metric is None:
@@ -316,81 +403,319 @@ class DCNetworkMonitor():
             return 'Error stopping monitoring metric: {0} on {1}:{2}'.format(metric, vnf_name, vnf_interface)
 
 
-# get all metrics defined in the list and export it to Prometheus
-    def get_flow_metrics(self):
+    # get all metrics defined in the list and export it to Prometheus
+    def _monitor_loop(self):
+        """
+        Scheduler of the monitoring: every metric is polled at its own interval.
+        The Ryu requests of one cycle are done in parallel and without holding
+        the metric locks, so adding/removing metrics never waits for the controller.
+        """
         while self.start_monitoring:
+            self._wakeup.clear()
+            now = time.time()
 
-            self.monitor_flow_lock.acquire()
-
-            for flow_dict in self.flow_metrics:
-                data = {}
-
-                data['cookie'] = flow_dict['cookie']
-                data['cookie_mask'] = COOKIE_MASK
-
-                if 'tx' in flow_dict['metric_key']:
-                    data['match'] = {'in_port':flow_dict['mon_port']}
-                elif 'rx' in flow_dict['metric_key']:
-                    data['out_port'] = flow_dict['mon_port']
-
+            self.monitor_lock.acquire()
+            network_due, network_lag = self._take_due(self.network_metrics, now)
+            self.monitor_lock.release()
 
-                # query Ryu
-                ret = self.net.ryu_REST('stats/flow', dpid=flow_dict['switch_dpid'], data=data)
-                if isinstance(ret, dict):
-                    flow_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    flow_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    flow_stat_dict = None
+            self.monitor_flow_lock.acquire()
+            flow_due, flow_lag = self._take_due(self.flow_metrics, now)
+            self.monitor_flow_lock.release()
 
-                logging.debug('received flow stat:{0} '.format(flow_stat_dict))
+            container_due = self.container_stats == CONTAINER_STATS_BUILTIN and now >= self._container_stats_next
+            if container_due:
+                self._container_stats_next = now + self.container_stats_interval
+                self._sample_containers()
 
-                self.set_flow_metric(flow_dict, flow_stat_dict)
+            if network_due or flow_due:
+                self._monitor_cycle(network_due, flow_due, max(network_lag, flow_lag))
+            elif container_due:
+                self._export_metrics()
 
+            # sleep until the next metric is due (or a metric was added/the monitor stopped)
+            self._wakeup.wait(max(0, self._next_deadline() - time.time()))
 
+    def _take_due(self, metrics, now):
+        """
+        Select the metrics that need to be polled and schedule their next poll.
+        Should be called while holding the lock of the metric list.
+        :return: (list of due metrics, max. lag of these polls in seconds)
+        """
+        due = []
+        lag = 0.0
+        for metric_dict in metrics:
+            next_poll = metric_dict.get('next_poll', 0)
+            if next_poll > now:
+                continue
+            due.append(metric_dict)
+            lag = max(lag, now - next_poll)
+            interval = metric_dict.get('interval', MONITOR_INTERVAL)
+            # keep a fixed cadence, skip the polls that were missed
+            next_poll += interval
+            if next_poll <= now:
+                missed = int((now - next_poll) / interval) + 1
+                self.monitor_stats['skipped_polls'] += missed
+                next_poll += missed * interval
+            metric_dict['next_poll'] = next_poll
+        return due, lag
+
+    def _next_deadline(self):
+        deadline = time.time() + MONITOR_INTERVAL
+        if self.container_stats == CONTAINER_STATS_BUILTIN:
+            deadline = min(deadline, self._container_stats_next)
+        self.monitor_lock.acquire()
+        for metric_dict in self.network_metrics:
+            deadline = min(deadline, metric_dict.get('next_poll', 0))
+        self.monitor_lock.release()
+        self.monitor_flow_lock.acquire()
+        for metric_dict in self.flow_metrics:
+            deadline = min(deadline, metric_dict.get('next_poll', 0))
+        self.monitor_flow_lock.release()
+        return deadline
+
+    def _monitor_cycle(self, network_due, flow_due, poll_lag):
+        start_time = time.time()
+
+        # one port-stats and one flow-stats request per switch,
+        # the flow-stats reply is split locally over the monitored flows of that switch
+        port_dpids = list(set([m['switch_dpid'] for m in network_due]))
+        flow_dpids = list(set([m['switch_dpid'] for m in flow_due]))
+        jobs = [('stats/port', dpid, None) for dpid in port_dpids]
+        for dpid in flow_dpids:
+            cookies = set([self._cookie_value(m['cookie']) for m in flow_due if m['switch_dpid'] == dpid])
+            data = None
+            if len(cookies) == 1:
+                # all monitored flows of this switch share the same cookie, let the switch filter on it
+                data = {'cookie': cookies.pop(), 'cookie_mask': COOKIE_MASK}
+            jobs.append(('stats/flow', dpid, data))
+
+        results = self._worker_pool.map(self._query_ryu, jobs)
+        port_stats = dict(zip(port_dpids, results[:len(port_dpids)]))
+        flow_stats = dict(zip(flow_dpids, results[len(port_dpids):]))
+
+        # metrics that were removed in the meantime are not updated anymore
+        self.monitor_lock.acquire()
+        active = set(id(m) for m in self.network_metrics)
+        for metric_dict in network_due:
+            port_stat_dict = port_stats.get(metric_dict['switch_dpid'])
+            if port_stat_dict is None or id(metric_dict) not in active:
+                continue
+            self.set_network_metric(metric_dict, port_stat_dict)
+        self.monitor_lock.release()
+
+        self.monitor_flow_lock.acquire()
+        active = set(id(m) for m in self.flow_metrics)
+        for flow_dict in flow_due:
+            switch_flow_stats = flow_stats.get(flow_dict['switch_dpid'])
+            if switch_flow_stats is None or id(flow_dict) not in active:
+                continue
+            flow_stat_dict = self._filter_flow_stats(flow_dict, switch_flow_stats)
+            logging.debug('received flow stat:{0} '.format(flow_stat_dict))
+            self.set_flow_metric(flow_dict, flow_stat_dict)
+        self.monitor_flow_lock.release()
+
+        cycle_time = time.time() - start_time
+        self.prom_cycle_time.set(cycle_time)
+        self.prom_poll_lag.set(poll_lag)
+        self.monitor_stats['cycles'] += 1
+        self.monitor_stats['last_cycle_time'] = cycle_time
+        self.monitor_stats['max_cycle_time'] = max(self.monitor_stats['max_cycle_time'], cycle_time)
+        self.monitor_stats['last_poll_lag'] = poll_lag
+        self.monitor_stats['max_poll_lag'] = max(self.monitor_stats['max_poll_lag'], poll_lag)
+
+        self._export_metrics()
+
+    def _sample_containers(self):
+        """
+        Export CPU and memory usage of all containers of the emulated data centers, read from their cgroups.
+        The cgroup files of a container stay open as long as the container is deployed.
+        """
+        now = time.time()
+        deployed = dict()
+        for dc in list(self.net.dcs.values()):
+            for vnf_name, d in list(dc.containers.items()):
+                container_id = getattr(d, 'did', None)
+                if container_id is not None:
+                    deployed[container_id] = (vnf_name, dc.label)
+
+        for container_id in [cid for cid in self._containers if cid not in deployed]:
+            self._remove_container(container_id)
+
+        for container_id, (vnf_name, dc_label) in deployed.items():
+            c = self._containers.get(container_id)
+            if c is None:
+                cgroup_dir = find_container_cgroup(container_id, root=self.cgroup_root)
+                if cgroup_dir is None:
+                    # container is not started yet
+                    continue
+                c = {'counters': ContainerCounters(container_id, cgroup_dir, root=self.cgroup_root),
+                     'vnf_name': vnf_name, 'datacenter': dc_label, 'cpu_used': None, 'time': None}
+                self._containers[container_id] = c
             try:
-                if len(self.flow_metrics) > 0:
-                    pushadd_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
-            except Exception, e:
-                logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
-
-            self.monitor_flow_lock.release()
-            time.sleep(1)
-
-    def get_network_metrics(self):
-        while self.start_monitoring:
-
-            self.monitor_lock.acquire()
+                cpu_used, _ = c['counters'].cpu()
+                mem_used, mem_limit = c['counters'].memory()
+            except (IOError, ValueError) as ex:
+                logging.debug('cannot read cgroup stats of {0}: {1}'.format(vnf_name, ex))
+                continue
+            labels = (vnf_name, dc_label)
+            if cpu_used is not None:
+                self.prom_container_cpu_time.labels(*labels).set(cpu_used / 1e9)
+                if c['cpu_used'] is not None and now > c['time']:
+                    self.prom_container_cpu_load.labels(*labels).set(
+                        (cpu_used - c['cpu_used']) / ((now - c['time']) * 1e9))
+                c['cpu_used'] = cpu_used
+                c['time'] = now
+            if mem_used is not None:
+                self.prom_container_mem_used.labels(*labels).set(mem_used)
+            if mem_limit is not None:
+                self.prom_container_mem_limit.labels(*labels).set(mem_limit)
+
+    def _remove_container(self, container_id):
+        c = self._containers.pop(container_id)
+        c['counters'].close()
+        for gauge in self.prom_container_metrics:
+            try:
+                gauge.remove(c['vnf_name'], c['datacenter'])
+            except KeyError:
+                pass
 
-            # group metrics by dpid to optimize the rest api calls
-            dpid_list = [metric_dict['switch_dpid'] for metric_dict in self.network_metrics]
-            dpid_set = set(dpid_list)
+    def _remove_series(self, metric_key, vnf_name, vnf_interface, flow_id):
+        """
+        Remove a single labelled series from the registry.
+        Should be called while holding the lock of the metric list.
+        """
+        try:
+            self.prom_metrics[metric_key].remove(vnf_name, vnf_interface, flow_id)
+        except KeyError:
+            # series was never set (no stats received yet)
+            pass
+        for stat in RATE_STATS:
+            try:
+                self.prom_rate_metrics[metric_key].remove(vnf_name, vnf_interface, flow_id, stat)
+            except KeyError:
+                pass
 
-            for dpid in dpid_set:
+    def _export_metrics(self):
+        """
+        In push mode, replace the metrics of the SDN controller job on the pushgateway by the current registry,
+        so removed series also disappear from the pushgateway.
+        In scrape mode, nothing needs to be done, the registry is served on /metrics.
+        """
+        if self.export_mode != EXPORT_PUSH:
+            return
+        try:
+            push_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
+        except Exception, e:
+            logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
 
-                # query Ryu
-                ret = self.net.ryu_REST('stats/port', dpid=dpid)
-                if isinstance(ret, dict):
-                    port_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    port_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    port_stat_dict = None
+    def start_metrics_server(self, port=SCRAPE_PORT):
+        """
+        Serve the SDN metrics registry on http://<host>:<port>/metrics
+        :param port: port of the /metrics endpoint
+        :return: the http server (running in a background thread)
+        """
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ['/', '/metrics']:
+                    self.send_error(404)
+                    return
+                output = generate_latest(registry)
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+                self.end_headers()
+                self.wfile.write(output)
+
+            def log_message(self, format, *args):
+                # do not log every scrape on stderr
+                return
 
-                metric_list = [metric_dict for metric_dict in self.network_metrics
-                               if int(metric_dict['switch_dpid'])==int(dpid)]
+        server = _ThreadingHTTPServer(('', port), MetricsHandler)
+        t = threading.Thread(target=server.serve_forever)
+        t.daemon = True
+        t.start()
+        logging.info('Serving SDN metrics on port {0}/metrics'.format(port))
+        return server
 
-                for metric_dict in metric_list:
-                    self.set_network_metric(metric_dict, port_stat_dict)
+    @staticmethod
+    def _cookie_value(cookie):
+        if isinstance(cookie, basestring):
+            return int(cookie, 0)
+        return int(cookie)
 
+    def _filter_flow_stats(self, flow_dict, switch_flow_stats):
+        """
+        Select the flow entries of a monitored flow from the flow-stats reply of its switch,
+        the same selection Ryu would do for a stats/flow request with cookie and in_port/out_port.
+        :param flow_dict: monitored flow
+        :param switch_flow_stats: Ryu stats/flow reply of the switch: {dpid: [flow_stat, ...]}
+        :return: reply in the same format, only containing the matching flow entries
+        """
+        dpid = str(flow_dict['switch_dpid'])
+        cookie = self._cookie_value(flow_dict['cookie']) & COOKIE_MASK
+        mon_port = int(flow_dict['mon_port'])
+        selected = []
+        for flow_stat in switch_flow_stats.get(dpid, []):
+            if int(flow_stat.get('cookie', 0)) & COOKIE_MASK != cookie:
+                continue
+            if 'tx' in flow_dict['metric_key']:
+                in_port = flow_stat.get('match', {}).get('in_port')
+                if in_port is None or int(in_port) != mon_port:
+                    continue
+            elif 'rx' in flow_dict['metric_key']:
+                if mon_port not in self._output_ports(flow_stat):
+                    continue
+            selected.append(flow_stat)
+        return {dpid: selected}
+
+    @staticmethod
+    def _output_ports(flow_stat):
+        # Ryu returns the actions as 'OUTPUT:<port>' strings (or as dicts for newer OpenFlow versions)
+        ports = []
+        for action in flow_stat.get('actions', []):
+            if isinstance(action, dict):
+                if action.get('type') != 'OUTPUT':
+                    continue
+                port = action.get('port')
+            elif isinstance(action, basestring) and action.startswith('OUTPUT:'):
+                port = action.split(':', 1)[1]
+            else:
+                continue
             try:
-                if len(self.network_metrics) > 0:
-                    pushadd_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
-            except Exception, e:
-                logging.warning("Pushgateway not reachable: {0} {1}".format(Exception, e))
+                ports.append(int(port))
+            except (TypeError, ValueError):
+                # reserved ports like IN_PORT or CONTROLLER
+                pass
+        return ports
 
-            self.monitor_lock.release()
-            time.sleep(1)
+    def _query_ryu(self, job):
+        """
+        Runs in a worker thread of the monitor, each worker keeps its own http session.
+        :param job: (prefix, dpid, data)
+        :return: the parsed Ryu reply or None if the request failed
+        """
+        prefix, dpid, data = job
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._sessions.session = session
+        try:
+            ret = self.net.ryu_REST(prefix, dpid=dpid, data=data, session=session)
+            if isinstance(ret, dict):
+                return ret
+            elif isinstance(ret, basestring):
+                return ast.literal_eval(ret.rstrip())
+        except Exception as ex:
+            logging.warning("Ryu query {0} for dpid {1} failed: {2}".format(prefix, dpid, ex))
+        return None
+
+    def get_monitor_stats(self):
+        """
+        Timing information of the monitoring loop.
+        :return: dict with the number of cycles, last/max cycle time, last/max poll lag and the number of skipped polls
+        """
+        return dict(self.monitor_stats)
 
     # add metric to the list to export to Prometheus, parse the Ryu port-stats reply
     def set_network_metric(self, metric_dict, port_stat_dict):
@@ -415,23 +740,8 @@ class DCNetworkMonitor():
                     labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=None).\
                     set(this_measurement)
 
-                # also the rate is calculated here, but not used for now
-                # (rate can be easily queried from prometheus also)
-                if previous_monitor_time <= 0 or previous_monitor_time >= port_uptime:
-                    metric_dict['previous_measurement'] = int(port_stat[metric_key])
-                    metric_dict['previous_monitor_time'] = port_uptime
-                    # do first measurement
-                    #time.sleep(1)
-                    #self.monitor_lock.release()
-                    # rate cannot be calculated yet (need a first measurement)
-                    metric_rate = None
-
-                else:
-                    time_delta = (port_uptime - metric_dict['previous_monitor_time'])
-                    #metric_rate = (this_measurement - metric_dict['previous_measurement']) / float(time_delta)
-
-                metric_dict['previous_measurement'] = this_measurement
-                metric_dict['previous_monitor_time'] = port_uptime
+                # the rate is calculated from the switch timestamps, not from the (jittery) polling time
+                self._update_rate(metric_dict, this_measurement, port_uptime, None)
                 return
 
         logging.exception('metric {0} not found on {1}:{2}'.format(metric_key, vnf_name, vnf_interface))
@@ -451,20 +761,112 @@ class DCNetworkMonitor():
         cookie = metric_dict['cookie']
 
         counter = 0
+        flow_uptime = None
         for flow_stat in flow_stat_dict[str(switch_dpid)]:
             if 'bytes' in metric_key:
                 counter += flow_stat['byte_count']
             elif 'packet' in metric_key:
                 counter += flow_stat['packet_count']
-
-        # flow_uptime disabled for now (can give error)
-        #flow_stat = flow_stat_dict[str(switch_dpid)][0]
-        #flow_uptime = flow_stat['duration_sec'] + flow_stat['duration_nsec'] * 10 ** (-9)
+            # the oldest flow entry gives the time base of the summed counters
+            if 'duration_sec' in flow_stat:
+                uptime = flow_stat['duration_sec'] + flow_stat.get('duration_nsec', 0) * 10 ** (-9)
+                flow_uptime = max(flow_uptime, uptime)
 
         self.prom_metrics[metric_dict['metric_key']]. \
             labels(vnf_name=vnf_name, vnf_interface=vnf_interface, flow_id=cookie). \
             set(counter)
 
+        if flow_uptime is not None:
+            self._update_rate(metric_dict, counter, flow_uptime, cookie)
+
+    def _update_rate(self, metric_dict, measurement, timestamp, flow_id):
+        """
+        Calculate the rate since the previous measurement and update the rate statistics of a metric.
+        Should be called while holding the lock of the metric list.
+        :param metric_dict: monitored metric
+        :param measurement: current counter value
+        :param timestamp: switch timestamp of the counter (port or flow duration in seconds)
+        :param flow_id: flow_id label of the metric
+        :return: the current rate (packets/s or bits/s) or None if it cannot be calculated yet
+        """
+        metric_key = metric_dict['metric_key']
+        previous_measurement = metric_dict['previous_measurement']
+        previous_monitor_time = metric_dict['previous_monitor_time']
+        metric_dict['previous_measurement'] = measurement
+        metric_dict['previous_monitor_time'] = timestamp
+
+        # first measurement, or the port/flow was reset in the meantime
+        if previous_monitor_time <= 0 or previous_monitor_time >= timestamp or measurement < previous_measurement:
+            return None
+
+        metric_rate = (measurement - previous_measurement) / float(timestamp - previous_monitor_time)
+        if 'bytes' in metric_key:
+            metric_rate *= 8
+
+        now = time.time()
+        samples = metric_dict.get('rate_samples')
+        if samples is None:
+            samples = deque(maxlen=RATE_SAMPLES)
+            metric_dict['rate_samples'] = samples
+        samples.append((now, metric_rate))
+
+        rate_stats = self._rate_statistics([r for t, r in samples if t >= now - self.rate_window])
+        rate_stats['current'] = metric_rate
+        metric_dict['rate_stats'] = rate_stats
+
+        gauge = self.prom_rate_metrics[metric_key]
+        for stat in RATE_STATS:
+            gauge.labels(vnf_name=metric_dict['vnf_name'], vnf_interface=metric_dict['vnf_interface'],
+                         flow_id=flow_id, stat=stat).set(rate_stats[stat])
+        return metric_rate
+
+    @staticmethod
+    def _rate_statistics(rates):
+        # min, max and percentiles (nearest rank) of the rates in the window
+        rates = sorted(rates)
+        n = len(rates)
+        rate_stats = {'min': rates[0], 'max': rates[-1]}
+        for p in RATE_PERCENTILES:
+            rank = max(1, int(-(-p * n // 100)))
+            rate_stats['p{0}'.format(p)] = rates[rank - 1]
+        return rate_stats
+
+    def get_rates(self, vnf_name=None, vnf_interface=None, metric=None):
+        """
+        Current rates and rate statistics of the monitored metrics and flows.
+        :param vnf_name: only return the metrics of this VNF
+        :param vnf_interface: only return the metrics of this interface
+        :param metric: only return this metric (tx_packets, rx_packets, tx_bytes, rx_bytes)
+        :return: list of dicts: {vnf_name, vnf_interface, metric, flow_id, unit, window, samples, current, min, max, p50,
+                 p90, p99}
+        """
+        self.monitor_lock.acquire()
+        metrics = [(m, None) for m in self.network_metrics]
+        self.monitor_lock.release()
+        self.monitor_flow_lock.acquire()
+        metrics += [(m, m['cookie']) for m in self.flow_metrics]
+        self.monitor_flow_lock.release()
+
+        rates = []
+        for metric_dict, flow_id in metrics:
+            if vnf_name is not None and metric_dict['vnf_name'] != vnf_name:
+                continue
+            if vnf_interface is not None and metric_dict['vnf_interface'] != vnf_interface:
+                continue
+            if metric is not None and metric_dict['metric_key'] != metric:
+                continue
+            rate = {'vnf_name': metric_dict['vnf_name'],
+                    'vnf_interface': metric_dict['vnf_interface'],
+                    'metric': metric_dict['metric_key'],
+                    'flow_id': flow_id,
+                    'unit': 'bits/s' if 'bytes' in metric_dict['metric_key'] else 'packets/s',
+                    'window': self.rate_window,
+                    'samples': len(metric_dict.get('rate_samples', []))}
+            rate.update(dict((stat, None) for stat in RATE_STATS))
+            rate.update(metric_dict.get('rate_stats', {}))
+            rates.append(rate)
+        return rates
+
     def start_Prometheus(self, port=9090):
         # prometheus.yml configuration file is located in the same directory as this file
         cmd = ["docker",
@@ -515,8 +917,15 @@ class DCNetworkMonitor():
     def stop(self):
         # stop the monitoring thread
         self.start_monitoring = False
+        self._wakeup.set()
         self.monitor_thread.join()
-        self.monitor_flow_thread.join()
+        self._worker_pool.terminate()
+        for container_id in list(self._containers):
+            self._remove_container(container_id)
+
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
 
         # these containers are used for monitoring but are started now outside of son-emu
 
@@ -34,16 +34,24 @@ import re
 import requests
 import os
 import json
+import threading
+from collections import namedtuple
 
 from mininet.net import Containernet
 from mininet.node import Controller, DefaultController, OVSSwitch, OVSKernelSwitch, Docker, RemoteController
 from mininet.cli import CLI
 from mininet.link import TCLink
 from mininet.clean import cleanup
+from mininet.util import ipAdd, macColonHex
 import networkx as nx
 from emuvim.dcemulator.monitoring import DCNetworkMonitor
 from emuvim.dcemulator.node import Datacenter, EmulatorCompute, EmulatorExtSAP
 from emuvim.dcemulator.resourcemodel import ResourceModelRegistrar
+from emuvim.dcemulator.flowbatch import RyuFlowBatch
+from emuvim.dcemulator.pathcache import SwitchPathCache
+from emuvim.dcemulator.idpool import IdPool, get_pool_stats
+from emuvim.dcemulator.topologyjournal import TopologyJournal
+from emuvim.dcemulator.startup import StartupTimer, wait_for_port, wait_for_http
 
 LOG = logging.getLogger("dcemulator.net")
 LOG.setLevel(logging.DEBUG)
@@ -51,11 +59,21 @@ LOG.setLevel(logging.DEBUG)
 # default CPU period used for cpu percentage-based cfs values (microseconds)
 CPU_PERIOD = 1000000
 
+# OpenFlow port of the Ryu controller (official IANA-assigned port number, as used by Mininet)
+RYU_OF_PORT = 6653
+# port of the Ryu REST API (ofctl_rest)
+RYU_REST_PORT = 8080
+# max. seconds to wait until the Ryu controller accepts OpenFlow connections and REST calls
+RYU_STARTUP_TIMEOUT = 15.0
+
 # default priority setting for added flow-rules
 DEFAULT_PRIORITY = 1000
 # default cookie number for new flow-rules
 DEFAULT_COOKIE = 10
 
+# switch port a node interface is connected to (entry of the DCNetwork interface index)
+SwitchPort = namedtuple('SwitchPort', ['switch', 'port_nr', 'port_name', 'intf_id', 'intf_name'])
+
 class DCNetwork(Containernet):
     """
     Wraps the original Mininet/Containernet class and provides
@@ -65,6 +83,9 @@ class DCNetwork(Containernet):
     """
 
     def __init__(self, controller=RemoteController, monitor=False,
+                 monitor_export_mode="push",  # SDN metrics: "push" to the pushgateway or "scrape" from son-emu's /metrics endpoint
+                 monitor_container_stats="cadvisor",  # VNF cpu/mem usage: "cadvisor" container, "builtin" (read from the cgroups) or None
+                 monitor_container_stats_interval=1.0,  # sampling interval (seconds) of the built-in container stats
                  enable_learning=False, # learning switch behavior of the default ovs switches icw Ryu controller can be turned off/on, needed for E-LAN functionality
                  dc_emulation_max_cpu=1.0,  # fraction of overall CPU time for emulation
                  dc_emulation_max_mem=512,  # emulation max mem in MB
@@ -72,58 +93,96 @@ class DCNetwork(Containernet):
         """
         Create an extended version of a Containernet network
         :param dc_emulation_max_cpu: max. CPU time used by containers in data centers
+        :param monitor_export_mode: "push" (Prometheus pushgateway) or "scrape" (in-process /metrics endpoint)
+        :param monitor_container_stats: "cadvisor" (default), "builtin" (cgroup stats of the VNF containers only) or None
+        :param monitor_container_stats_interval: sampling interval (seconds) of the built-in container stats
         :param kwargs: path through for Mininet parameters
         :return:
         """
         # members
         self.dcs = {}
         self.ryu_process = None
+        # set when the OpenFlow port and the REST API of Ryu are up
+        self.ryu_ready = threading.Event()
+        self._ryu_probe_thread = None
+        # duration of the startup phases, logged when the network is started
+        self.startup_timer = StartupTimer("DCNetwork")
         #list of deployed nsds.E_Lines and E_LANs (uploaded from the dummy gatekeeper)
         self.deployed_nsds = []
         self.deployed_elines = []
         self.deployed_elans = []
         self.installed_chains = []
+        # serializes topology changes (Mininet port allocation, OVS port setup, graph and index updates),
+        # so that containers can be created in parallel
+        self.topology_lock = threading.RLock()
 
 
         # always cleanup environment before we start the emulator
-        self.killRyu()
-        cleanup()
+        # (an old Ryu is killed while Mininet cleans up)
+        with self.startup_timer.phase("cleanup"):
+            kill_thread = threading.Thread(target=self.killRyu)
+            kill_thread.start()
+            cleanup()
+            kill_thread.join()
+
+        # Ryu management
+        # Ryu boots while the rest of the network is set up, its readiness is probed in the background
+        if controller == RemoteController:
+            # start Ryu controller
+            self.startRyu(learning_switch=enable_learning)
+        else:
+            self.ryu_ready.set()
 
         # call original Docker.__init__ and setup default controller
-        Containernet.__init__(
-            self, switch=OVSKernelSwitch, controller=controller, **kwargs)
+        with self.startup_timer.phase("containernet_init"):
+            Containernet.__init__(
+                self, switch=OVSKernelSwitch, controller=controller, **kwargs)
 
         # default switch configuration
-        enable_ryu_learning = False
         if enable_learning :
             self.failMode = 'standalone'
-            enable_ryu_learning = True
         else:
             self.failMode = 'secure'
 
-        # Ryu management
+        # add the specified controller (Mininet checks if a remote controller is listening)
         if controller == RemoteController:
-            # start Ryu controller
-            self.startRyu(learning_switch=enable_ryu_learning)
-
-        # add the specified controller
+            with self.startup_timer.phase("ryu_openflow_wait"):
+                wait_for_port('127.0.0.1', RYU_OF_PORT, timeout=RYU_STARTUP_TIMEOUT, process=self.ryu_process)
         self.addController('c0', controller=controller)
 
         # graph of the complete DC network
         self.DCNetwork_graph = nx.MultiDiGraph()
+        # version and change log of the graph, cached views for the REST APIs
+        self.topology = TopologyJournal()
+
+        # index: (node name, interface id or name) -> SwitchPort the interface is connected to
+        self._intf_index = dict()
+        # node name -> list of SwitchPorts of this node (in the order the links were added)
+        self._node_intfs = dict()
+
+        # shortest paths between switches, computed on a switch-only view of the graph
+        self.path_cache = SwitchPathCache()
 
-        # initialize pool of vlan tags to setup the SDN paths
-        self.vlans = range(1, 4095)[::-1]
+        # pool of vlan tags to setup the SDN paths, tags are given back when a chain or E-LAN is removed
+        self.vlan_pool = IdPool("vlan", 1, 4094)
+        # vlan tag -> list of vnf names of the E-LANs set up by setLAN
+        self.installed_lans = dict()
+        # vlan tags taken from the pool by setChain (allocated or pre-defined by the caller),
+        # given back when the last chain using the tag is removed
+        self.chain_tags = set()
 
         # link to Ryu REST_API
         ryu_ip = 'localhost'
-        ryu_port = '8080'
+        ryu_port = str(RYU_REST_PORT)
         self.ryu_REST_api = 'http://{0}:{1}'.format(ryu_ip, ryu_port)
         self.RyuSession = requests.Session()
 
         # monitoring agent
         if monitor:
-            self.monitor_agent = DCNetworkMonitor(self)
+            with self.startup_timer.phase("monitor_init"):
+                self.monitor_agent = DCNetworkMonitor(self, export_mode=monitor_export_mode,
+                                                      container_stats=monitor_container_stats,
+                                                      container_stats_interval=monitor_container_stats_interval)
         else:
             self.monitor_agent = None
 
@@ -150,6 +209,10 @@ class DCNetwork(Containernet):
         Able to handle Datacenter objects as link
         end points.
         """
+        with self.topology_lock:
+            return self._addLink(node1, node2, **params)
+
+    def _addLink(self, node1, node2, **params):
         assert node1 is not None
         assert node2 is not None
 
@@ -221,7 +284,12 @@ class DCNetwork(Containernet):
                      'dst_port_id': node2_port_id, 'dst_port_nr': node2.ports[link.intf2],
                       'dst_port_name': node2_port_name}
         attr_dict2.update(attr_dict)
+        # nodes that are not part of the graph yet are added implicitly
+        for name in [node1.name, node2.name]:
+            if name not in self.DCNetwork_graph:
+                self._addGraphNode(name, None)
         self.DCNetwork_graph.add_edge(node1.name, node2.name, attr_dict=attr_dict2)
+        self._journalEdge(self.topology.edge_added, node1.name, node2.name)
 
         attr_dict2 = {'src_port_id': node2_port_id, 'src_port_nr': node2.ports[link.intf2],
                       'src_port_name': node2_port_name,
@@ -229,6 +297,18 @@ class DCNetwork(Containernet):
                       'dst_port_name': node1_port_name}
         attr_dict2.update(attr_dict)
         self.DCNetwork_graph.add_edge(node2.name, node1.name, attr_dict=attr_dict2)
+        self._journalEdge(self.topology.edge_added, node2.name, node1.name)
+
+        # switch-to-switch links are also part of the path cache topology
+        if isinstance(node1, OVSSwitch) and isinstance(node2, OVSSwitch):
+            self.path_cache.add_edge(node1.name, node2.name, attr_dict=attr_dict)
+            self.path_cache.add_edge(node2.name, node1.name, attr_dict=attr_dict)
+
+        # update the interface index in both directions
+        self._index_intf(node1.name, node1_port_id, node1_port_name,
+                         node2.name, node2.ports[link.intf2], node2_port_name)
+        self._index_intf(node2.name, node2_port_id, node2_port_name,
+                         node1.name, node1.ports[link.intf1], node1_port_name)
 
         LOG.debug("addLink: n1={0} intf1={1} -- n2={2} intf2={3}".format(
             str(node1),node1_port_name, str(node2), node2_port_name))
@@ -239,35 +319,107 @@ class DCNetwork(Containernet):
         """
         Remove the link from the Containernet and the networkx graph
         """
+        with self.topology_lock:
+            self._removeLink(link=link, node1=node1, node2=node2)
+
+    def _removeLink(self, link=None, node1=None, node2=None):
         if link is not None:
             node1 = link.intf1.node
             node2 = link.intf2.node
         assert node1 is not None
         assert node2 is not None
+        if link is None:
+            # same lookup as Containernet, we need the interfaces to update the index
+            for l in self.links:
+                if (l.intf1.node == node1 and l.intf2.node == node2) or \
+                        (l.intf1.node == node2 and l.intf2.node == node1):
+                    link = l
+                    break
+        if link is not None:
+            self._unindex_intf(link.intf1.node.name, link.intf1.name)
+            self._unindex_intf(link.intf2.node.name, link.intf2.name)
         Containernet.removeLink(self, link=link, node1=node1, node2=node2)
+        if isinstance(node1, OVSSwitch) and isinstance(node2, OVSSwitch):
+            self.path_cache.remove_edge(node1.name, node2.name)
+            self.path_cache.remove_edge(node2.name, node1.name)
         # TODO we might decrease the loglevel to debug:
         try:
             self.DCNetwork_graph.remove_edge(node2.name, node1.name)
+            self._journalEdge(self.topology.edge_removed, node2.name, node1.name)
         except:
             LOG.warning("%s, %s not found in DCNetwork_graph." % ((node2.name, node1.name)))
         try:
             self.DCNetwork_graph.remove_edge(node1.name, node2.name)
+            self._journalEdge(self.topology.edge_removed, node1.name, node2.name)
         except:
             LOG.warning("%s, %s not found in DCNetwork_graph." % ((node1.name, node2.name)))
 
+    def _addGraphNode(self, name, node_type):
+        """
+        Add a node to the graph and record the change in the topology journal.
+        """
+        self.DCNetwork_graph.add_node(name, type=node_type)
+        self.topology.node_added(name, node_type)
+
+    def _removeGraphNode(self, name):
+        """
+        Remove a node and its edges from the graph and record the changes in the topology journal.
+        """
+        if name not in self.DCNetwork_graph:
+            return
+        for src, dst in self.DCNetwork_graph.in_edges(name) + self.DCNetwork_graph.out_edges(name):
+            self._journalEdge(self.topology.edge_removed, src, dst)
+        node_type = self.DCNetwork_graph.node[name].get('type')
+        self.DCNetwork_graph.remove_node(name)
+        self.topology.node_removed(name, node_type)
+
+    def _journalEdge(self, record, src, dst):
+        node_attr = self.DCNetwork_graph.node
+        record(src, dst, node_attr.get(src, {}).get('type'), node_attr.get(dst, {}).get('type'))
+
     def addDocker( self, label, **params ):
         """
         Wrapper for addDocker method to use custom container class.
+        Does the same as Containernet.addDocker (Mininet.addHost), but only the Mininet bookkeeping
+        (next ip/mac, hosts, nameToNode) is done while holding the topology lock.
+        The container itself is created and started outside of the lock, so this can be called in parallel.
         """
-        self.DCNetwork_graph.add_node(label, type=params.get('type', 'docker'))
-        return Containernet.addDocker(self, label, cls=EmulatorCompute, **params)
+        with self.topology_lock:
+            self._addGraphNode(label, params.get('type', 'docker'))
+            defaults = self._nextHostDefaults()
+        defaults.update(params)
+        d = EmulatorCompute(label, **defaults)
+        with self.topology_lock:
+            self.hosts.append(d)
+            self.nameToNode[label] = d
+        return d
+
+    def _nextHostDefaults(self):
+        """
+        Default parameters of a new host as given by Mininet.addHost (ip, mac, cpu core).
+        Should be called while holding the topology lock.
+        """
+        defaults = {'ip': ipAdd(self.nextIP, ipBaseNum=self.ipBaseNum, prefixLen=self.prefixLen) +
+                          '/%s' % self.prefixLen}
+        if self.autoSetMacs:
+            defaults['mac'] = macColonHex(self.nextIP)
+        if self.autoPinCpus:
+            defaults['cores'] = self.nextCore
+            self.nextCore = (self.nextCore + 1) % self.numCores
+        self.nextIP += 1
+        return defaults
 
     def removeDocker( self, label, **params):
         """
         Wrapper for removeDocker method to update graph.
+        The Mininet host list is not thread-safe, so the container is removed while holding the topology lock.
         """
-        self.DCNetwork_graph.remove_node(label)
-        return Containernet.removeDocker(self, label, **params)
+        with self.topology_lock:
+            self._removeGraphNode(label)
+            self._unindex_node(label)
+        self._releaseChainsOf(label)
+        with self.topology_lock:
+            return Containernet.removeDocker(self, label, **params)
 
     def addExtSAP(self, sap_name, sap_ip, **params):
         """
@@ -275,16 +427,70 @@ class DCNetwork(Containernet):
         """
         # make sure that 'type' is set
         params['type'] = params.get('type','sap_ext')
-        self.DCNetwork_graph.add_node(sap_name, type=params['type'])
+        with self.topology_lock:
+            self._addGraphNode(sap_name, params['type'])
         return Containernet.addExtSAP(self, sap_name, sap_ip, **params)
 
     def removeExtSAP(self, sap_name, **params):
         """
         Wrapper for removeExtSAP method to remove SAP  also from graph.
         """
-        self.DCNetwork_graph.remove_node(sap_name)
+        with self.topology_lock:
+            self._removeGraphNode(sap_name)
+            self._unindex_node(sap_name)
+        self.path_cache.remove_switch(sap_name)
+        self._releaseChainsOf(sap_name)
         return Containernet.removeExtSAP(self, sap_name)
 
+    def _index_intf(self, node_name, intf_id, intf_name, peer_name, peer_port_nr, peer_port_name):
+        """
+        Add an interface of a node to the interface index.
+        The interface can later be found by its id or by its name.
+        """
+        sp = SwitchPort(peer_name, peer_port_nr, peer_port_name, intf_id, intf_name)
+        self._node_intfs.setdefault(node_name, list()).append(sp)
+        # first link wins if id and name of different interfaces collide (same as the old graph scan)
+        self._intf_index.setdefault((node_name, intf_id), sp)
+        self._intf_index.setdefault((node_name, intf_name), sp)
+
+    def _unindex_intf(self, node_name, intf_name):
+        """
+        Remove a single interface of a node from the interface index.
+        """
+        intfs = self._node_intfs.get(node_name, list())
+        for sp in [sp for sp in intfs if sp.intf_name == intf_name]:
+            intfs.remove(sp)
+            for key in [(node_name, sp.intf_id), (node_name, sp.intf_name)]:
+                if self._intf_index.get(key) is sp:
+                    del self._intf_index[key]
+            # remove the reverse entry at the peer
+            for peer_sp in list(self._node_intfs.get(sp.switch, list())):
+                if peer_sp.intf_name == sp.port_name and peer_sp.switch == node_name:
+                    self._unindex_intf(sp.switch, peer_sp.intf_name)
+        if not intfs and node_name in self._node_intfs:
+            del self._node_intfs[node_name]
+
+    def _unindex_node(self, node_name):
+        """
+        Remove all interfaces of a node (and their reverse entries) from the interface index.
+        """
+        for sp in list(self._node_intfs.get(node_name, list())):
+            self._unindex_intf(node_name, sp.intf_name)
+
+    def find_connected_switch_port(self, vnf_name, vnf_interface=None):
+        """
+        Find the switch port a node interface is connected to.
+        :param vnf_name: name of the vnf (or any other node)
+        :param vnf_interface: interface id or interface name, None = first interface of the vnf
+        :return: SwitchPort(switch, port_nr, port_name, intf_id, intf_name) or None if not found
+        """
+        if vnf_interface is None:
+            intfs = self._node_intfs.get(vnf_name)
+            if not intfs:
+                return None
+            return intfs[0]
+        return self._intf_index.get((vnf_name, vnf_interface))
+
     def addSwitch( self, name, add_to_graph=True, **params ):
         """
         Wrapper for addSwitch method to store switch also in graph.
@@ -292,7 +498,9 @@ class DCNetwork(Containernet):
 
         # add this switch to the global topology overview
         if add_to_graph:
-            self.DCNetwork_graph.add_node(name, type=params.get('type','switch'))
+            with self.topology_lock:
+                self._addGraphNode(name, params.get('type','switch'))
+            self.path_cache.add_switch(name)
 
         # set the learning switch behavior
         if 'failMode' in params :
@@ -314,10 +522,22 @@ class DCNetwork(Containernet):
         return all_containers
 
     def start(self):
+        # the switches and all REST calls need the controller
+        with self.startup_timer.phase("ryu_wait"):
+            self.waitRyuReady()
         # start
-        for dc in self.dcs.itervalues():
-            dc.start()
-        Containernet.start(self)
+        with self.startup_timer.phase("start"):
+            for dc in self.dcs.itervalues():
+                dc.start()
+            Containernet.start(self)
+        LOG.info(str(self.startup_timer))
+
+    def getStartupTimes(self):
+        """
+        Duration of the startup phases (some of them overlap, e.g. the Ryu boot runs in the background).
+        :return: dict: phase -> {start, duration} in seconds since the DCNetwork was created
+        """
+        return self.startup_timer.report()
 
     def stop(self):
 
@@ -340,42 +560,45 @@ class DCNetwork(Containernet):
         setup an E-LAN network by assigning the same VLAN tag to each DC interface of the VNFs in the E-LAN
 
         :param vnf_list: names of the VNFs in this E-LAN  [{name:,interface:},...]
-        :return:
+        :return: vlan tag of the E-LAN (give it back with releaseLAN)
         """
         src_sw = None
         src_sw_inport_nr = 0
         src_sw_inport_name = None
 
         # get a vlan tag for this E-LAN
-        vlan = self.vlans.pop()
+        vlan = self.vlan_pool.allocate()
+        self.installed_lans[vlan] = [vnf['name'] for vnf in vnf_list]
 
         for vnf in vnf_list:
             vnf_src_name = vnf['name']
             vnf_src_interface = vnf['interface']
 
-            # check if port is specified (vnf:port)
-            if vnf_src_interface is None:
-                # take first interface by default
-                connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                vnf_src_interface = link_dict[0]['src_port_id']
-
-            for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                for link in link_dict:
-                    if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                                link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                        # found the right link and connected switch
-                        src_sw = connected_sw
-                        src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                        src_sw_inport_name = link_dict[link]['dst_port_name']
-                        break
+            # find the connected switch port (first interface by default)
+            src_port = self.find_connected_switch_port(vnf_src_name, vnf_src_interface)
+            if src_port is not None:
+                if vnf_src_interface is None:
+                    vnf_src_interface = src_port.intf_id
+                src_sw = src_port.switch
+                src_sw_inport_nr = src_port.port_nr
+                src_sw_inport_name = src_port.port_name
 
             # set the tag on the dc switch interface
             LOG.debug('set E-LAN: vnf name: {0} interface: {1} tag: {2}'.format(vnf_src_name, vnf_src_interface,vlan))
             switch_node = self.getNodeByName(src_sw)
             self._set_vlan_tag(switch_node, src_sw_inport_name, vlan)
 
+        return vlan
+
+    def releaseLAN(self, vlan):
+        """
+        Give the vlan tag of an E-LAN back to the pool (the VNFs of the E-LAN should be stopped already).
+        :param vlan: vlan tag returned by setLAN
+        :return: True if the tag was in use
+        """
+        self.installed_lans.pop(vlan, None)
+        return self.vlan_pool.release(vlan)
+
     def _addMonitorFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None,
                        tag=None, **kwargs):
         """
@@ -400,41 +623,24 @@ class DCNetwork(Containernet):
         LOG.debug("call AddMonitorFlow vnf_src_name=%r, vnf_src_interface=%r, vnf_dst_name=%r, vnf_dst_interface=%r",
                   vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
 
-        #check if port is specified (vnf:port)
-        if vnf_src_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
-
-        if vnf_dst_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+        # find the connected switch ports (vnf:port), take first interface by default
+        # (we might get interface ids or names, e.g, from a son-emu-cli call)
+        src_port = self.find_connected_switch_port(vnf_src_name, vnf_src_interface)
+        if src_port is not None:
+            if vnf_src_interface is None:
+                vnf_src_interface = src_port.intf_id
+            src_sw = src_port.switch
+            src_sw_inport_nr = src_port.port_nr
+            src_sw_inport_name = src_port.port_name
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        dst_port = self.find_connected_switch_port(vnf_dst_name, vnf_dst_interface)
+        if dst_port is not None:
+            if vnf_dst_interface is None:
+                vnf_dst_interface = dst_port.intf_id
+            dst_sw = dst_port.switch
+            dst_sw_outport_nr = dst_port.port_nr
+            dst_sw_outport_name = dst_port.port_name
 
         if not tag >= 0:
             LOG.exception('tag not valid: {0}'.format(tag))
@@ -443,7 +649,7 @@ class DCNetwork(Containernet):
         try:
             # returns the first found shortest path
             # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+            path = self.getShortestPath(src_sw, dst_sw, weight=kwargs.get('weight'))
         except:
             LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -541,6 +747,8 @@ class DCNetwork(Containernet):
         :param tag: vlan tag to be used for this chain (pre-defined or new one if none is specified)
         :param skip_vlan_tag: boolean to indicate if a vlan tag should be appointed to this flow or not
         :param path: custom path between the two VNFs (list of switches)
+        :param batch: RyuFlowBatch to collect the flowrules in, the caller has to commit it (see newFlowBatch)
+        :param batch_mode: 'best-effort' or 'all-or-nothing' to install all flowrules of this chain in one batch
         :return: output log string
         """
 
@@ -548,11 +756,13 @@ class DCNetwork(Containernet):
         if kwargs.get('monitor'):
 
             # check if chain already exists
-            found_chains = [chain_dict for chain_dict in self.installed_chains if
-             (chain_dict['vnf_src_name'] == vnf_src_name and chain_dict['vnf_src_interface'] == vnf_src_interface
-             and chain_dict['vnf_dst_name'] == vnf_dst_name and chain_dict['vnf_dst_interface'] == vnf_dst_interface)]
+            found_chains = self._findChains(vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface,
+                                            monitor=False)
+            # a monitoring chain that was installed without pre-defined chain is removed like a normal chain
+            own_chain = kwargs.get('cmd') == 'del-flows' and len(self._findChains(
+                vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface, monitor=True)) > 0
 
-            if len(found_chains) > 0:
+            if len(found_chains) > 0 and not own_chain:
                 # this chain exists, so need an extra monitoring flow
                 # assume only 1 chain per vnf/interface pair
                 LOG.debug('*** installing monitoring chain on top of pre-defined chain from {0}:{1} -> {2}:{3}'.
@@ -568,6 +778,12 @@ class DCNetwork(Containernet):
                 pass
 
 
+        # collect all flowrules of this chain (both directions) and install them at once
+        own_batch = None
+        if kwargs.get('batch') is None and kwargs.get('batch_mode') is not None \
+                and self.controller == RemoteController:
+            own_batch = kwargs['batch'] = self.newFlowBatch(mode=kwargs.get('batch_mode'))
+
         cmd = kwargs.get('cmd', 'add-flow')
         if cmd == 'add-flow' or cmd == 'del-flows':
             ret = self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
@@ -579,8 +795,109 @@ class DCNetwork(Containernet):
         else:
             ret = "Command unknown"
 
+        if own_batch is not None:
+            result = own_batch.commit()
+            ret = ret + '\n' + "flow batch ({0}): {1} of {2} flowrules installed, {3} failed, {4} rolled back".format(
+                result['mode'], result['installed'], result['total'], len(result['failed']), result['rolled_back'])
+
         return ret
 
+    def releaseChain(self, vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface):
+        """
+        Forget an installed chain and give its vlan tag back to the pool
+        (used if the flowrules of the chain are removed by other means than setChain, e.g. by cookie).
+        """
+        self._forgetChains(self._findChains(vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface))
+
+    def _findChains(self, vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface, monitor=None):
+        """
+        Installed chains between the given vnf interfaces.
+        :param monitor: True/False to only return monitoring chains/normal chains, None = all chains
+        """
+        return [c for c in self.installed_chains if
+                (c['vnf_src_name'] == vnf_src_name and c['vnf_src_interface'] == vnf_src_interface
+                 and c['vnf_dst_name'] == vnf_dst_name and c['vnf_dst_interface'] == vnf_dst_interface
+                 and (monitor is None or c['monitor'] == monitor))]
+
+    def _releaseChainsOf(self, vnf_name):
+        """
+        Forget all chains and E-LAN memberships of a removed VNF (or SAP) and give unused vlan tags back to the pool.
+        """
+        removed = [c for c in self.installed_chains if vnf_name in (c['vnf_src_name'], c['vnf_dst_name'])]
+        self._forgetChains(removed)
+        for vlan, vnfs in self.installed_lans.items():
+            if vnf_name in vnfs:
+                vnfs.remove(vnf_name)
+                if not vnfs:
+                    self.releaseLAN(vlan)
+
+    def _forgetChains(self, chains):
+        for c in chains:
+            self.installed_chains.remove(c)
+        # a tag can be shared by both directions of a chain and by monitor flows,
+        # give it back once no other chain uses it anymore
+        in_use = set(c['tag'] for c in self.installed_chains)
+        for tag in set(c['tag'] for c in chains):
+            if tag in self.chain_tags and tag not in in_use:
+                self.chain_tags.discard(tag)
+                self.vlan_pool.release(tag)
+
+    def getIdPoolStats(self):
+        """
+        Utilization counters of the id pools (vlan tags, cookies, flow groups, ...).
+        """
+        return get_pool_stats()
+
+    def getTopologyVersion(self):
+        """
+        Version of the DCNetwork graph, incremented on every added or removed node or edge.
+        """
+        return self.topology.version
+
+    def getTopologyChanges(self, since):
+        """
+        Nodes and edges that have been added or removed after the given topology version.
+        :param since: topology version known by the caller
+        :return: see TopologyJournal.changes_since, None if the version is unknown (caller needs a full snapshot)
+        """
+        return self.topology.changes_since(since)
+
+    def getTopologyView(self, name, build):
+        """
+        Cached view of the topology (e.g. serialized JSON), only rebuilt if the topology has changed.
+        :param name: name of the view
+        :param build: function() that creates the view from DCNetwork_graph
+        :return: (version, view)
+        """
+        with self.topology_lock:
+            return self.topology.view(name, build)
+
+    def getShortestPath(self, src_sw, dst_sw, weight=None):
+        """
+        Shortest path between two switches (served from the path cache).
+        Raises a networkx exception if no path can be found.
+        :param src_sw: name of the first switch
+        :param dst_sw: name of the last switch
+        :param weight: link attribute used as weight (e.g. 'delay'), None = hop count
+        :return: list of switch names
+        """
+        return self.path_cache.shortest_path(src_sw, dst_sw, weight=weight)
+
+    def getPathCacheStats(self):
+        """
+        Hit/miss counters of the path cache.
+        """
+        return self.path_cache.stats()
+
+    def newFlowBatch(self, mode='best-effort', **kwargs):
+        """
+        Create a batch to collect the flowrules of one or more setChain calls (pass it as batch=... argument).
+        All collected flowrules are pushed to the Ryu controller by calling commit() on the returned batch.
+        :param mode: 'best-effort' or 'all-or-nothing'
+        :return: RyuFlowBatch
+        """
+        return RyuFlowBatch(self.ryu_REST_api, mode=mode, **kwargs)
+
 
     def _chainAddFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None, **kwargs):
 
@@ -594,41 +911,24 @@ class DCNetwork(Containernet):
         LOG.debug("call chainAddFlow vnf_src_name=%r, vnf_src_interface=%r, vnf_dst_name=%r, vnf_dst_interface=%r",
                   vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
 
-        #check if port is specified (vnf:port)
-        if vnf_src_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
-
-        if vnf_dst_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+        # find the connected switch ports (vnf:port), take first interface by default
+        # (we might get interface ids or names, e.g, from a son-emu-cli call)
+        src_port = self.find_connected_switch_port(vnf_src_name, vnf_src_interface)
+        if src_port is not None:
+            if vnf_src_interface is None:
+                vnf_src_interface = src_port.intf_id
+            src_sw = src_port.switch
+            src_sw_inport_nr = src_port.port_nr
+            src_sw_inport_name = src_port.port_name
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        dst_port = self.find_connected_switch_port(vnf_dst_name, vnf_dst_interface)
+        if dst_port is not None:
+            if vnf_dst_interface is None:
+                vnf_dst_interface = dst_port.intf_id
+            dst_sw = dst_port.switch
+            dst_sw_outport_nr = dst_port.port_nr
+            dst_sw_outport_name = dst_port.port_name
 
         path = kwargs.get('path')
         if path is None:
@@ -636,7 +936,7 @@ class DCNetwork(Containernet):
             try:
                 # returns the first found shortest path
                 # if all shortest paths are wanted, use: all_shortest_paths
-                path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+                path = self.getShortestPath(src_sw, dst_sw, weight=kwargs.get('weight'))
             except:
                 LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                     vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -656,19 +956,29 @@ class DCNetwork(Containernet):
         vlan = None
         if cmd == 'add-flow':
             if kwargs.get('tag'):
-                # use pre-defined tag
+                # use pre-defined tag, it is only given back by the chains if they took it from the pool
+                # (not if it is e.g. the tag of an E-LAN or already used by another chain)
                 vlan = kwargs.get('tag')
+                if self.vlan_pool.reserve(vlan):
+                    self.chain_tags.add(vlan)
             else:
-                vlan = self.vlans.pop()
+                vlan = self.vlan_pool.allocate()
+                self.chain_tags.add(vlan)
 
         # store the used vlan tag to identify this chain
-        if not kwargs.get('monitor'):
+        # (monitoring chains as well, they are not used as pre-defined chains but their tags have to be given back)
+        monitor = bool(kwargs.get('monitor'))
+        if cmd == 'del-flows':
+            self._forgetChains(self._findChains(vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface,
+                                                monitor=monitor))
+        else:
             chain_dict = {}
             chain_dict['vnf_src_name'] = vnf_src_name
             chain_dict['vnf_dst_name'] = vnf_dst_name
             chain_dict['vnf_src_interface'] = vnf_src_interface
             chain_dict['vnf_dst_interface'] = vnf_dst_interface
             chain_dict['tag'] = vlan
+            chain_dict['monitor'] = monitor
             self.installed_chains.append(chain_dict)
 
         #iterate through the path to install the flow-entries
@@ -817,7 +1127,12 @@ class DCNetwork(Containernet):
             flow['actions'].append(action)
 
         flow['match'] = self._parse_match(match)
-        self.ryu_REST(prefix, data=flow)
+        batch = kwargs.get('batch')
+        if batch is not None:
+            # installed later on, when the batch is committed
+            batch.add(prefix, flow)
+        else:
+            self.ryu_REST(prefix, data=flow)
 
     def _set_vlan_tag(self, node, switch_port, tag):
         node.vsctl('set', 'port {0} tag={1}'.format(switch_port,tag))
@@ -874,9 +1189,11 @@ class DCNetwork(Containernet):
         # change the default Openflow controller port to 6653 (official IANA-assigned port number), as used by Mininet
         # Ryu still uses 6633 as default
         ryu_option = '--ofp-tcp-listen-port'
-        ryu_of_port = '6653'
+        ryu_of_port = str(RYU_OF_PORT)
         ryu_cmd = 'ryu-manager'
         FNULL = open("/tmp/ryu.log", 'w')
+        self.ryu_ready.clear()
+        self.startup_timer.begin("ryu_boot")
         if learning_switch:
             self.ryu_process = Popen([ryu_cmd, ryu_path, ryu_path2, ryu_option, ryu_of_port], stdout=FNULL, stderr=FNULL)
             LOG.debug('starting ryu-controller with {0}'.format(ryu_path))
@@ -885,7 +1202,32 @@ class DCNetwork(Containernet):
             # no learning switch, but with rest api
             self.ryu_process = Popen([ryu_cmd, ryu_path2, ryu_option, ryu_of_port], stdout=FNULL, stderr=FNULL)
             LOG.debug('starting ryu-controller with {0}'.format(ryu_path2))
-        time.sleep(1)
+        # do not block, the readiness of Ryu is probed in the background (see waitRyuReady)
+        self._ryu_probe_thread = threading.Thread(target=self._probeRyu, args=(self.ryu_process,))
+        self._ryu_probe_thread.daemon = True
+        self._ryu_probe_thread.start()
+
+    def _probeRyu(self, process):
+        of_ready = wait_for_port('127.0.0.1', RYU_OF_PORT, timeout=RYU_STARTUP_TIMEOUT, process=process)
+        rest_ready = of_ready and wait_for_http('http://localhost:{0}/stats/switches'.format(RYU_REST_PORT),
+                                                timeout=RYU_STARTUP_TIMEOUT, process=process)
+        self.startup_timer.end("ryu_boot")
+        if rest_ready:
+            LOG.debug('ryu-controller is ready')
+        else:
+            LOG.error('ryu-controller did not come up, see /tmp/ryu.log')
+        # also set if Ryu failed, so nobody waits forever (the REST calls will fail)
+        self.ryu_ready.set()
+
+    def waitRyuReady(self, timeout=None):
+        """
+        Wait until the Ryu controller accepts OpenFlow connections and REST calls.
+        :param timeout: max. seconds to wait, default: RYU_STARTUP_TIMEOUT (+ slack for the probes)
+        :return: True if the controller is ready (or no Ryu is used)
+        """
+        if timeout is None:
+            timeout = 2 * RYU_STARTUP_TIMEOUT + 1
+        return self.ryu_ready.wait(timeout)
 
     def killRyu(self):
         """
@@ -896,19 +1238,27 @@ class DCNetwork(Containernet):
         if self.ryu_process is not None:
             self.ryu_process.terminate()
             self.ryu_process.kill()
-        # ensure its death ;-)
-        Popen(['pkill', '-f', 'ryu-manager'])
+        # ensure its death ;-) (and wait for it, so a new Ryu is not hit)
+        Popen(['pkill', '-f', 'ryu-manager']).wait()
 
-    def ryu_REST(self, prefix, dpid=None, data=None):
+    def ryu_REST(self, prefix, dpid=None, data=None, session=None):
+        """
+        Call the Ryu REST API.
+        :param session: requests.Session to be used (e.g. one per thread), default: shared RyuSession
+        """
+        if session is None:
+            session = self.RyuSession
+        if not self.ryu_ready.is_set():
+            self.waitRyuReady()
 
         if dpid:
             url = self.ryu_REST_api + '/' + str(prefix) + '/' + str(dpid)
         else:
             url = self.ryu_REST_api + '/' + str(prefix)
         if data:
-            req = self.RyuSession.post(url, json=data)
+            req = session.post(url, json=data)
         else:
-            req = self.RyuSession.get(url)
+            req = session.get(url)
 
 
         # do extra logging if status code is not 200 (OK)
@@ -947,20 +1297,9 @@ class DCNetwork(Containernet):
         return dict
 
     def find_connected_dc_interface(self, vnf_src_name, vnf_src_interface=None):
-
-        if vnf_src_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    return src_sw_inport_name
+        """
+        Name of the switch interface the given vnf interface is connected to (first interface by default).
+        """
+        src_port = self.find_connected_switch_port(vnf_src_name, vnf_src_interface)
+        if src_port is not None:
+            return src_port.port_name
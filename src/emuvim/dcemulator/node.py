@@ -28,6 +28,8 @@ partner consortium (www.sonata-nfv.eu).
 from mininet.node import Docker, OVSBridge
 from mininet.link import Link
 from emuvim.dcemulator.resourcemodel import NotEnoughResourcesAvailable
+from emuvim.dcemulator.tracing import TRACER
+from emuvim.dcemulator.statuscache import STATUS_CACHE
 import logging
 
 
@@ -72,10 +74,13 @@ class EmulatorCompute(Docker):
 
         return networkStatusList
 
-    def getStatus(self):
+    def getStatus(self, max_age=None):
         """
         Helper method to receive information about this compute instance.
+        :param max_age: max. age in seconds of the docker inspect snapshot that is used
+            (default: see statuscache.STATUS_MAX_AGE, 0 = inspect the container now)
         """
+        info = STATUS_CACHE.inspect(self.dcli, self.dc, max_age=max_age)
         status = {}
         status["name"] = self.name
         status["network"] = self.getNetworkStatus()
@@ -88,10 +93,10 @@ class EmulatorCompute(Docker):
         status["cpuset"] = self.resources.get('cpuset_cpus')
         status["mem_limit"] = self.resources.get('mem_limit')
         status["memswap_limit"] = self.resources.get('memswap_limit')
-        status["state"] = self.dcli.inspect_container(self.dc)["State"]
-        status["id"] = self.dcli.inspect_container(self.dc)["Id"]
-        status["short_id"] = self.dcli.inspect_container(self.dc)["Id"][:12]
-        status["hostname"] = self.dcli.inspect_container(self.dc)["Config"]['Hostname']
+        status["state"] = info["State"]
+        status["id"] = info["Id"]
+        status["short_id"] = info["Id"][:12]
+        status["hostname"] = info["Config"]['Hostname']
         status["datacenter"] = (None if self.datacenter is None
                                 else self.datacenter.label)
 
@@ -244,23 +249,26 @@ class Datacenter(object):
         env = properties
         properties['VNF_NAME'] = name
         # create the container
-        d = self.net.addDocker(
-            "%s" % (name),
-            dimage=image,
-            dcmd=command,
-            datacenter=self,
-            flavor_name=flavor_name,
-            environment = env,
-            **params
-        )
+        with TRACER.span("addDocker", name=name, image=image):
+            d = self.net.addDocker(
+                "%s" % (name),
+                dimage=image,
+                dcmd=command,
+                datacenter=self,
+                flavor_name=flavor_name,
+                environment = env,
+                **params
+            )
 
 
 
         # apply resource limits to container if a resource model is defined
         if self._resource_model is not None:
             try:
-                self._resource_model.allocate(d)
-                self._resource_model.write_allocation_log(d, self.resource_log_path)
+                # the resource models share state (registrar), allocations must not run in parallel
+                with self.net.topology_lock, TRACER.span("resource_model_allocate", name=name):
+                    self._resource_model.allocate(d)
+                    self._resource_model.write_allocation_log(d, self.resource_log_path)
             except NotEnoughResourcesAvailable as ex:
                 LOG.warning("Allocation of container %r was blocked by resource model." % name)
                 LOG.info(ex.message)
@@ -276,7 +284,8 @@ class Datacenter(object):
             if nw.get("id") is not None:
                 nw["id"] = self._clean_ifname(nw["id"])
             # TODO we cannot use TCLink here (see: https://github.com/mpeuster/containernet/issues/3)
-            self.net.addLink(d, self.switch, params1=nw, cls=Link, intfName1=nw.get('id'))
+            with TRACER.span("addLink", name=name, intf=nw.get('id')):
+                self.net.addLink(d, self.switch, params1=nw, cls=Link, intfName1=nw.get('id'))
         # do bookkeeping
         self.containers[name] = d
 
@@ -297,14 +306,16 @@ class Datacenter(object):
 
         # call resource model and free resources
         if self._resource_model is not None:
-            self._resource_model.free(self.containers[name])
-            self._resource_model.write_free_log(self.containers[name], self.resource_log_path)
+            with self.net.topology_lock:
+                self._resource_model.free(self.containers[name])
+                self._resource_model.write_free_log(self.containers[name], self.resource_log_path)
 
         # remove links
         self.net.removeLink(
             link=None, node1=self.containers[name], node2=self.switch)
 
         # remove container
+        STATUS_CACHE.invalidate(self.containers[name].dc)
         self.net.removeDocker("%s" % (name))
         del self.containers[name]
 
@@ -0,0 +1,146 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+
+import networkx as nx
+
+LOG = logging.getLogger("dcemulator.pathcache")
+LOG.setLevel(logging.DEBUG)
+
+
+class SwitchPathCache(object):
+    """
+    Caches shortest paths between switches of the DCNetwork.
+
+    Paths are computed on a switch-only view of the topology (VNFs, SAPs and hosts
+    are not part of it) and stored per (src_sw, dst_sw, weight).
+    The view is updated by DCNetwork.addLink/removeLink, which only
+    invalidate the cached paths that can be affected by the change.
+    """
+
+    def __init__(self):
+        self.graph = nx.MultiDiGraph()
+        self._paths = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def add_switch(self, name):
+        with self._lock:
+            self.graph.add_node(name)
+
+    def remove_switch(self, name):
+        with self._lock:
+            if name not in self.graph:
+                return
+            for u, v in list(self.graph.in_edges(name)) + list(self.graph.out_edges(name)):
+                self._invalidate_edge(u, v)
+            self.graph.remove_node(name)
+
+    def add_edge(self, src, dst, attr_dict=None):
+        """
+        Add a directed switch-to-switch edge.
+        :param attr_dict: link attributes, numeric values are used as weights
+        """
+        attrs = dict()
+        for k, v in (attr_dict or dict()).iteritems():
+            try:
+                attrs[k] = float(v)
+            except (TypeError, ValueError):
+                attrs[k] = v
+        with self._lock:
+            existing = dict(self.graph[src][dst]) if self.graph.has_edge(src, dst) else dict()
+            self.graph.add_edge(src, dst, attr_dict=attrs)
+            if not existing:
+                # a new connection can shorten any path
+                self._invalidate_all()
+                return
+            # parallel edge: only weighted paths get shorter, if the new edge is cheaper
+            for key in list(self._paths.iterkeys()):
+                weight = key[2]
+                if weight is None:
+                    continue
+                old_min = min(e.get(weight, 1) for e in existing.itervalues())
+                if attrs.get(weight, 1) < old_min:
+                    del self._paths[key]
+                    self.invalidations += 1
+
+    def remove_edge(self, src, dst):
+        """
+        Remove one directed switch-to-switch edge (one of possibly many parallel edges).
+        """
+        with self._lock:
+            if not self.graph.has_edge(src, dst):
+                return
+            self.graph.remove_edge(src, dst)
+            self._invalidate_edge(src, dst)
+
+    def shortest_path(self, src, dst, weight=None):
+        """
+        Get the (cached) shortest path between two switches.
+        Raises networkx exceptions if no path exists (same as nx.shortest_path).
+        :return: list of switch names
+        """
+        key = (src, dst, weight)
+        with self._lock:
+            path = self._paths.get(key)
+            if path is not None:
+                self.hits += 1
+                return list(path)
+            self.misses += 1
+            if src == dst:
+                path = [src]
+            else:
+                path = nx.shortest_path(self.graph, src, dst, weight=weight)
+            self._paths[key] = path
+            return list(path)
+
+    def stats(self):
+        """
+        Counters of the cache.
+        """
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "invalidations": self.invalidations,
+                    "cached_paths": len(self._paths),
+                    "switches": self.graph.number_of_nodes(),
+                    "switch_links": self.graph.number_of_edges()}
+
+    def _invalidate_edge(self, src, dst):
+        # only paths that use this edge are affected
+        for key, path in list(self._paths.iteritems()):
+            if any(path[i] == src and path[i + 1] == dst for i in range(0, len(path) - 1)):
+                del self._paths[key]
+                self.invalidations += 1
+
+    def _invalidate_all(self):
+        self.invalidations += len(self._paths)
+        self._paths.clear()
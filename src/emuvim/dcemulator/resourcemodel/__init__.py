@@ -44,6 +44,9 @@ class ResourceModelRegistrar(object):
         self.e_mem = dc_emulation_max_mem
         # pointer to all resource models assigned to DCs
         self._resource_models = dict()
+        # cached sums over all resource models (see: invalidate)
+        self._sum_max_cu = None
+        self._sum_max_mu = None
         LOG.info("Resource model registrar created with dc_emulation_max_cpu=%r and dc_emulation_max_mem=%r"
                  % (dc_emulation_max_cpu, dc_emulation_max_mem))
 
@@ -59,8 +62,37 @@ class ResourceModelRegistrar(object):
         self._resource_models[dc] = rm
         rm.registrar = self
         rm.dcs.append(dc)
+        self.invalidate()
         LOG.info("Registrar: Added resource model: %r" % rm)
 
+    def invalidate(self):
+        """
+        Drop the cached sums, has to be called if the capacity of a registered resource model changes.
+        :return: None
+        """
+        self._sum_max_cu = None
+        self._sum_max_mu = None
+
+    @property
+    def sum_max_cu(self):
+        """
+        Sum of the compute units of all registered resource models (cached)
+        :return:
+        """
+        if self._sum_max_cu is None:
+            self._sum_max_cu = sum([rm.dc_max_cu for rm in self.resource_models])
+        return self._sum_max_cu
+
+    @property
+    def sum_max_mu(self):
+        """
+        Sum of the memory units of all registered resource models (cached)
+        :return:
+        """
+        if self._sum_max_mu is None:
+            self._sum_max_mu = sum([rm.dc_max_mu for rm in self.resource_models])
+        return self._sum_max_mu
+
     @property
     def resource_models(self):
         """
@@ -0,0 +1,277 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Experiment log of the resource models.
+
+Every allocate and free is written as one JSON line. The full state of a resource model is only written
+as "snapshot" (first event of a model, then every SNAPSHOT_EVERY events or SNAPSHOT_INTERVAL seconds),
+all other lines are "delta"s that only contain what has changed. ResourceLogReader rebuilds the full
+state at any point in time; it also reads logs written in the old format (full state on every line).
+
+Line format:
+{"t": <time>, "type": "snapshot"|"delta", "rm": <data centers of the model>, "action": "allocate"|"free",
+ "name": <container>, "container_state": {...},
+ "rm_state": {...} (snapshot) or "rm_delta": {"set": {...}, "alloc": {name: {...}}, "dealloc": [names]} (delta)}
+"""
+import atexit
+import copy
+import json
+import logging
+import threading
+import time
+
+LOG = logging.getLogger("resourcemodel.resourcelog")
+LOG.setLevel(logging.DEBUG)
+
+# write the full state of a resource model after this many events ...
+SNAPSHOT_EVERY = 1000
+# ... or after this many seconds
+SNAPSHOT_INTERVAL = 60.0
+# lines are buffered and written in batches of this size ...
+FLUSH_BATCH = 100
+# ... or when the oldest buffered line is older than this (seconds)
+FLUSH_INTERVAL = 1.0
+# "compact": container limits as known by the emulator, "full": getStatus() of the container (docker inspect)
+CONTAINER_STATE = "compact"
+
+_writers = dict()
+_writers_lock = threading.Lock()
+
+
+def get_resource_log(path):
+    """
+    The log writer of the given file, shared by all resource models that log into it.
+    """
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = ResourceLogWriter(path)
+        return _writers[path]
+
+
+def container_state(d):
+    """
+    State of a container for the log, see CONTAINER_STATE.
+    :param d: container
+    :return: dict
+    """
+    if CONTAINER_STATE == "full":
+        return d.getStatus()
+    resources = getattr(d, "resources", dict())
+    datacenter = getattr(d, "datacenter", None)
+    return {"name": d.name,
+            "image": getattr(d, "dimage", None),
+            "flavor_name": getattr(d, "flavor_name", None),
+            "cpu_quota": resources.get("cpu_quota"),
+            "cpu_period": resources.get("cpu_period"),
+            "cpu_shares": resources.get("cpu_shares"),
+            "cpuset": resources.get("cpuset_cpus"),
+            "mem_limit": resources.get("mem_limit"),
+            "memswap_limit": resources.get("memswap_limit"),
+            "datacenter": None if datacenter is None else datacenter.label}
+
+
+def state_delta(old, new):
+    """
+    Changes between two states of a resource model (see get_state_dict).
+    :return: dict {set: {key: value}, alloc: {name: state}, dealloc: [names]}, empty parts are left out
+    """
+    delta = dict()
+    changed = dict((k, v) for k, v in new.iteritems()
+                   if k != "allocation_state" and (k not in old or old[k] != v))
+    if changed:
+        delta["set"] = changed
+    old_alloc = old.get("allocation_state", dict())
+    new_alloc = new.get("allocation_state", dict())
+    alloc = dict((k, v) for k, v in new_alloc.iteritems() if old_alloc.get(k) != v)
+    if alloc:
+        delta["alloc"] = alloc
+    dealloc = sorted(k for k in old_alloc if k not in new_alloc)
+    if dealloc:
+        delta["dealloc"] = dealloc
+    return delta
+
+
+def apply_delta(state, delta):
+    """
+    Apply a delta (see state_delta) to a state of a resource model (in place).
+    :return: the state
+    """
+    state.update(delta.get("set", dict()))
+    alloc = state.setdefault("allocation_state", dict())
+    alloc.update(copy.deepcopy(delta.get("alloc", dict())))
+    for name in delta.get("dealloc", list()):
+        alloc.pop(name, None)
+    return state
+
+
+class ResourceLogWriter(object):
+    """
+    Writes the resource model events of one log file. The file stays open, lines are written in batches.
+    A timer writes the buffered lines after flush_interval seconds if no further event fills the batch.
+    """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY, snapshot_interval=SNAPSHOT_INTERVAL,
+                 flush_batch=FLUSH_BATCH, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        # resource model -> [last written state, events since the last snapshot, time of the last snapshot]
+        self._models = dict()
+        self._buffer = list()
+        self._buffer_since = None
+        self._timer = None
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, rm, action, name, container_state, rm_state, t=None):
+        """
+        Log one event of a resource model.
+        :param rm: name of the resource model (e.g. the labels of its data centers)
+        :param action: "allocate" or "free"
+        :param name: container name
+        :param container_state: dict
+        :param rm_state: full state of the resource model after the event (see get_state_dict)
+        :param t: time of the event, default: now
+        """
+        t = time.time() if t is None else t
+        entry = {"t": t, "rm": rm, "action": action, "name": name, "container_state": container_state}
+        with self._lock:
+            if self._file is None:
+                return
+            model = self._models.get(rm)
+            if (model is None or model[1] >= self.snapshot_every
+                    or t - model[2] >= self.snapshot_interval):
+                entry["type"] = "snapshot"
+                entry["rm_state"] = rm_state
+                self._models[rm] = [rm_state, 0, t]
+            else:
+                entry["type"] = "delta"
+                entry["rm_delta"] = state_delta(model[0], rm_state)
+                model[0] = rm_state
+                model[1] += 1
+            self._buffer.append(json.dumps(entry, separators=(",", ":")))
+            if self._buffer_since is None:
+                self._buffer_since = time.time()
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            if len(self._buffer) >= self.flush_batch or time.time() - self._buffer_since >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer and self._file is not None:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+        self._buffer = list()
+        self._buffer_since = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ResourceLogReader(object):
+    """
+    Reads a resource log and rebuilds the states of the resource models.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def events(self):
+        """
+        All events of the log, lines of the old format are returned as snapshots.
+        :return: generator of dicts
+        """
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if "type" not in entry:
+                    entry["type"] = "snapshot"
+                    entry.setdefault("rm", None)
+                yield entry
+
+    def replay(self):
+        """
+        The full states after each event.
+        :return: generator of (event, {rm: state}), the states are updated in place by the next event
+        """
+        states = dict()
+        for entry in self.events():
+            if self._apply(states, entry):
+                yield entry, states
+
+    def state_at(self, t=None):
+        """
+        The full states of all resource models at the given time.
+        :param t: time, default: end of the log
+        :return: dict: rm -> state (see get_state_dict)
+        """
+        states = dict()
+        for entry in self.events():
+            if t is not None and entry["t"] > t:
+                break
+            self._apply(states, entry)
+        return states
+
+    @staticmethod
+    def _apply(states, entry):
+        if entry["type"] == "snapshot":
+            states[entry["rm"]] = entry["rm_state"]
+        elif entry["rm"] in states:
+            apply_delta(states[entry["rm"]], entry["rm_delta"])
+        else:
+            LOG.warning("Delta for %r without a previous snapshot at t=%r" % (entry["rm"], entry["t"]))
+            return False
+        return True
+
+
+if __name__ == '__main__':
+    # print the states of all resource models: resourcelog.py <log file> [<time>]
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: %s <resource log> [<time>]" % sys.argv[0])
+        sys.exit(1)
+    at = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(json.dumps(ResourceLogReader(sys.argv[1]).state_at(at), indent=2, sort_keys=True))
@@ -28,10 +28,9 @@ partner consortium (www.sonata-nfv.eu).
 """
 Playground for resource models created by University of Paderborn.
 """
-import time
-import json
 import logging
 from emuvim.dcemulator.resourcemodel import BaseResourceModel, NotEnoughResourcesAvailable
+from emuvim.dcemulator.resourcemodel.resourcelog import get_resource_log, container_state
 
 LOG = logging.getLogger("rm.upb.simple")
 LOG.setLevel(logging.DEBUG)
@@ -70,6 +69,27 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         self.raise_no_mem_resources_left = True
         super(UpbSimpleCloudDcRM, self).__init__()
 
+    @property
+    def dc_max_cu(self):
+        return self._dc_max_cu
+
+    @dc_max_cu.setter
+    def dc_max_cu(self, value):
+        self._dc_max_cu = value
+        # the registrar caches the sum over all resource models
+        if getattr(self, "registrar", None) is not None:
+            self.registrar.invalidate()
+
+    @property
+    def dc_max_mu(self):
+        return self._dc_max_mu
+
+    @dc_max_mu.setter
+    def dc_max_mu(self, value):
+        self._dc_max_mu = value
+        if getattr(self, "registrar", None) is not None:
+            self.registrar.invalidate()
+
     def allocate(self, d):
         """
         Allocate resources for the given container.
@@ -82,7 +102,7 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
             self._allocate_cpu(d)
         if not self.deactivate_mem_limit:
             self._allocate_mem(d)
-        self._apply_limits()
+        self._apply_limits(changed=[d])
 
     def _allocate_cpu(self, d):
         """
@@ -119,7 +139,7 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
             self._free_cpu(d)
         if not self.deactivate_mem_limit:
             self._free_mem(d)
-        self._apply_limits()
+        self._apply_limits(changed=[])
 
     def _free_cpu(self, d):
         """
@@ -137,14 +157,27 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         """
         self.dc_alloc_mu -= self._get_flavor(d).get("memory")
 
-    def _apply_limits(self):
+    def _apply_limits(self, changed=None):
         """
-        Recalculate real resource limits for all allocated containers and apply them
-        to their cgroups.
-        We have to recalculate for all containers to allow e.g. over provisioning models.
+        Recalculate real resource limits and apply them to the cgroups of the containers.
+        The share of a single CU/MU is calculated once per call. If it did not change
+        (e.g. no over provisioning), only the limits of the changed containers are applied,
+        otherwise (e.g. over provisioning models) all allocated containers are recalculated.
+        :param changed: containers that were allocated (None: recalculate all containers)
         :return:
         """
-        for d in self._allocated_compute_instances.itervalues():
+        single_cu = self.single_cu
+        single_mu = self.single_mu
+        if not self.deactivate_cpu_limit:
+            single_cu = self._compute_single_cu()
+        if not self.deactivate_mem_limit:
+            single_mu = self._compute_single_mu()
+        if changed is None or single_cu != self.single_cu or single_mu != self.single_mu:
+            changed = list(self._allocated_compute_instances.itervalues())
+        self.single_cu = single_cu
+        self.single_mu = single_mu
+
+        for d in changed:
             if not self.deactivate_cpu_limit:
                 self._apply_cpu_limits(d)
             if not self.deactivate_mem_limit:
@@ -157,8 +190,7 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         :return:
         """
         number_cu = self._get_flavor(d).get("compute")
-        # calculate cpu time fraction of a single compute unit
-        self.single_cu = self._compute_single_cu()
+        # cpu time fraction of a single compute unit is calculated by _apply_limits
         # calculate cpu time fraction for container with given flavor
         cpu_time_percentage = self.single_cu * number_cu
         # calculate input values for CFS scheduler bandwidth limitation
@@ -177,7 +209,17 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         # get cpu time fraction for entire emulation
         e_cpu = self.registrar.e_cpu
         # calculate
-        return float(e_cpu) / sum([rm.dc_max_cu for rm in list(self.registrar.resource_models)])
+        return float(e_cpu) / self.registrar.sum_max_cu
+
+    def _compute_single_mu(self):
+        """
+        Calculate amount of memory of a single MU unit.
+        :return:
+        """
+        # get memory amount for entire emulation
+        e_mem = self.registrar.e_mem
+        # calculate
+        return float(e_mem) / self.registrar.sum_max_mu
 
     def _calculate_cpu_cfs_values(self, cpu_time_percentage):
         """
@@ -202,10 +244,7 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         :return:
         """
         number_mu = self._get_flavor(d).get("memory")
-        # get memory amount for entire emulation
-        e_mem = self.registrar.e_mem
-        # calculate amount of memory for a single mu
-        self.single_mu = float(e_mem) / sum([rm.dc_max_mu for rm in list(self.registrar.resource_models)])
+        # amount of memory for a single mu is calculated by _apply_limits
         # calculate mem for given flavor
         mem_limit = self.single_mu * number_mu
         mem_limit = self._calculate_mem_limit_value(mem_limit)
@@ -280,15 +319,9 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
         """
         if path is None:
             return
-        # we have a path: write out RM info
-        l = dict()
-        l["t"] = time.time()
-        l["container_state"] = d.getStatus()
-        l["action"] = action
-        l["rm_state"] = self.get_state_dict()
-        # append to logfile
-        with open(path, "a") as f:
-            f.write("%s\n" % json.dumps(l))
+        # we have a path: write out RM info (only the changes, see resourcelog)
+        rm = ",".join(sorted(dc.label for dc in self.dcs)) or repr(self)
+        get_resource_log(path).write(rm, action, d.name, container_state(d), self.get_state_dict())
 
 
 class UpbOverprovisioningCloudDcRM(UpbSimpleCloudDcRM):
@@ -314,7 +347,7 @@ class UpbOverprovisioningCloudDcRM(UpbSimpleCloudDcRM):
         # calculate over provisioning scale factor
         self.cpu_op_factor = float(self.dc_max_cu) / (max(self.dc_max_cu, self.dc_alloc_cu))
         # calculate
-        return float(e_cpu) / sum([rm.dc_max_cu for rm in list(self.registrar.resource_models)]) * self.cpu_op_factor
+        return float(e_cpu) / self.registrar.sum_max_cu * self.cpu_op_factor
 
 
 class UpbDummyRM(UpbSimpleCloudDcRM):
@@ -325,7 +358,7 @@ class UpbDummyRM(UpbSimpleCloudDcRM):
         super(UpbDummyRM, self).__init__(*args, **kvargs)
         self.raise_no_cpu_resources_left = False
 
-    def _apply_limits(self):
+    def _apply_limits(self, changed=None):
         # do nothing here
         pass
 
@@ -0,0 +1,176 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+LOG = logging.getLogger("dcemulator.startup")
+LOG.setLevel(logging.DEBUG)
+
+# default max. seconds to wait until a service is ready
+PROBE_TIMEOUT = 15.0
+# first delay between two probes, doubled after each failed probe up to PROBE_MAX_DELAY
+PROBE_INITIAL_DELAY = 0.01
+PROBE_MAX_DELAY = 0.25
+# timeout of a single connection attempt
+PROBE_CONNECT_TIMEOUT = 0.5
+
+
+def _probe(check, what, timeout, process):
+    """
+    Call check() with exponential backoff until it returns True.
+    :param process: Popen of the service, stop waiting if it has terminated
+    :return: True if the service became ready within timeout seconds
+    """
+    end = time.time() + timeout
+    delay = PROBE_INITIAL_DELAY
+    while True:
+        if check():
+            return True
+        if process is not None and process.poll() is not None:
+            LOG.warning("%s: process terminated with exit code %r" % (what, process.returncode))
+            return False
+        remaining = end - time.time()
+        if remaining <= 0:
+            LOG.warning("%s: not ready after %.1fs" % (what, timeout))
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, PROBE_MAX_DELAY)
+
+
+def wait_for_port(ip, port, timeout=PROBE_TIMEOUT, process=None):
+    """
+    Wait until a TCP port accepts connections.
+    :param ip: ip to connect to (0.0.0.0 is probed on localhost)
+    :param port: TCP port
+    :param timeout: max. seconds to wait
+    :param process: optional Popen of the listening service, stop waiting if it has terminated
+    :return: True if the port is open
+    """
+    if ip in ["0.0.0.0", ""]:
+        ip = "127.0.0.1"
+
+    def check():
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(PROBE_CONNECT_TIMEOUT)
+        try:
+            return s.connect_ex((ip, int(port))) == 0
+        finally:
+            s.close()
+
+    return _probe(check, "%s:%s" % (ip, port), timeout, process)
+
+
+def wait_for_http(url, timeout=PROBE_TIMEOUT, process=None):
+    """
+    Wait until a HTTP service answers a GET request (with any status below 500).
+    :param url: url to probe
+    :param timeout: max. seconds to wait
+    :param process: optional Popen of the service, stop waiting if it has terminated
+    :return: True if the service is ready
+    """
+    session = requests.Session()
+
+    def check():
+        try:
+            return session.get(url, timeout=PROBE_CONNECT_TIMEOUT).status_code < 500
+        except requests.RequestException:
+            return False
+
+    try:
+        return _probe(check, url, timeout, process)
+    finally:
+        session.close()
+
+
+class StartupTimer(object):
+    """
+    Records the duration of the (possibly overlapping) phases of the emulator startup.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.t0 = time.time()
+        # phase name -> [start offset, end offset or None]
+        self._phases = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, phase):
+        with self._lock:
+            self._phases[phase] = [time.time() - self.t0, None]
+
+    def end(self, phase):
+        with self._lock:
+            if phase in self._phases and self._phases[phase][1] is None:
+                self._phases[phase][1] = time.time() - self.t0
+
+    def phase(self, phase):
+        """
+        Context manager to time a phase: with timer.phase("cleanup"): ...
+        """
+        return _Phase(self, phase)
+
+    def report(self):
+        """
+        :return: OrderedDict: phase -> {start, duration} (seconds since the timer was created, None if still
+            running), and the total time until the last finished phase
+        """
+        with self._lock:
+            phases = OrderedDict((name, {"start": start, "duration": None if end is None else end - start})
+                                 for name, (start, end) in self._phases.items())
+            ends = [end for start, end in self._phases.values() if end is not None]
+        phases["total"] = {"start": 0.0, "duration": max(ends) if ends else 0.0}
+        return phases
+
+    def __str__(self):
+        parts = list()
+        for name, p in self.report().items():
+            if p["duration"] is None:
+                parts.append("%s=running" % name)
+            else:
+                parts.append("%s=%.3fs@%.3f" % (name, p["duration"], p["start"]))
+        return "%s startup: %s" % (self.name, " ".join(parts))
+
+
+class _Phase(object):
+
+    def __init__(self, timer, phase):
+        self.timer = timer
+        self.phase = phase
+
+    def __enter__(self):
+        self.timer.begin(self.phase)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.timer.end(self.phase)
+        return False
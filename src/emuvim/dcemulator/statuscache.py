@@ -0,0 +1,144 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+import time
+
+LOG = logging.getLogger("dcemulator.statuscache")
+LOG.setLevel(logging.DEBUG)
+
+DOCKER_URL = 'unix://var/run/docker.sock'
+# max. age (seconds) of a cached inspect result, also if no docker event was seen for the container
+STATUS_MAX_AGE = 10.0
+# delay before the event watcher reconnects after the event stream broke
+EVENT_RECONNECT_DELAY = 5
+
+
+def _container_id(container):
+    # containers are referenced by the dict returned by create_container or by their id/name
+    if isinstance(container, dict):
+        return container.get('Id')
+    return str(container)
+
+
+class ContainerStatusCache(object):
+    """
+    Snapshot of the 'docker inspect' results of the emulated containers.
+
+    Each container is inspected once, the snapshot is updated when a docker event
+    for the container is seen (start, die, pause, rename, ...) or when it is older
+    than max_age, so status and list requests are served from memory.
+    """
+
+    def __init__(self, max_age=STATUS_MAX_AGE, base_url=DOCKER_URL):
+        self.max_age = max_age
+        self.base_url = base_url
+        # container id -> (timestamp, inspect result)
+        self._snapshots = dict()
+        # bumped by every invalidation, an inspect that was started before an invalidation
+        # must not store its (possibly outdated) result
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.hits = 0
+        self.misses = 0
+
+    def inspect(self, dcli, container, max_age=None):
+        """
+        Inspect result of a container, served from the snapshot if it is recent enough.
+
+        :param dcli: docker APIClient used to inspect the container if needed
+        :param container: container (dict returned by create_container, id or name)
+        :param max_age: max. accepted age of the snapshot in seconds (default: the max_age of the cache,
+            0 = always inspect)
+        :return: dict as returned by docker inspect
+        """
+        self._start_watcher()
+        cid = _container_id(container)
+        if max_age is None:
+            max_age = self.max_age
+        snapshot = self._snapshots.get(cid)
+        if snapshot is not None and time.time() - snapshot[0] <= max_age:
+            self.hits += 1
+            return snapshot[1]
+        self.misses += 1
+        with self._lock:
+            generation = self._generation
+        info = dcli.inspect_container(container)
+        with self._lock:
+            if generation == self._generation:
+                self._snapshots[cid] = (time.time(), info)
+        return info
+
+    def invalidate(self, container=None):
+        """
+        Drop the snapshot of a container (or of all containers), it is inspected again on the next request.
+        """
+        with self._lock:
+            self._generation += 1
+            if container is None:
+                self._snapshots.clear()
+                return
+            self._snapshots.pop(_container_id(container), None)
+
+    def stats(self):
+        return {"containers": len(self._snapshots), "hits": self.hits, "misses": self.misses}
+
+    def _start_watcher(self):
+        if self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_events, name="container-status-events")
+            self._watcher.daemon = True
+            self._watcher.start()
+
+    def _watch_events(self):
+        try:
+            from docker import APIClient
+            dcli = APIClient(base_url=self.base_url)
+        except Exception:
+            LOG.exception("Could not connect to docker, container status snapshots expire after %.1fs only."
+                          % self.max_age)
+            return
+        while True:
+            try:
+                for event in dcli.events(decode=True, filters={"type": "container"}):
+                    cid = event.get("id") or event.get("Actor", dict()).get("ID")
+                    if cid:
+                        self.invalidate(cid)
+            except Exception as ex:
+                LOG.debug("Docker event stream broke: %s" % ex)
+            # we might have missed events
+            self.invalidate()
+            time.sleep(EVENT_RECONNECT_DELAY)
+
+
+# shared by all data centers
+STATUS_CACHE = ContainerStatusCache()
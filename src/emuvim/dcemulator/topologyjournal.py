@@ -0,0 +1,143 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import logging
+import threading
+from collections import deque, Counter
+
+LOG = logging.getLogger("dcemulator.topologyjournal")
+LOG.setLevel(logging.DEBUG)
+
+# max. number of topology changes that are kept to answer delta requests
+DEFAULT_MAX_CHANGES = 10000
+
+NODE = "node"
+EDGE = "edge"
+ADDED = "added"
+REMOVED = "removed"
+
+
+class TopologyJournal(object):
+    """
+    Monotonically increasing version of the DCNetwork graph plus a bounded log of its changes.
+
+    Every node or edge that is added to or removed from the graph increments the version.
+    Views of the graph (e.g. the JSON of the REST APIs) are cached per version and only rebuilt
+    after the topology has changed. Clients that know an older version can ask for the changes since then.
+    """
+
+    def __init__(self, max_changes=DEFAULT_MAX_CHANGES):
+        """
+        :param max_changes: number of changes that are kept, older versions get a full snapshot
+        """
+        self.version = 0
+        # (version, op, kind, item), item: (name, type) for nodes, (src, dst, src_type, dst_type) for edges
+        self._changes = deque(maxlen=max(1, int(max_changes)))
+        # view name -> (version, data)
+        self._views = dict()
+        self._lock = threading.Lock()
+
+    def _record(self, op, kind, item):
+        with self._lock:
+            self.version += 1
+            self._changes.append((self.version, op, kind, item))
+
+    def node_added(self, name, node_type):
+        self._record(ADDED, NODE, (name, node_type))
+
+    def node_removed(self, name, node_type):
+        self._record(REMOVED, NODE, (name, node_type))
+
+    def edge_added(self, src, dst, src_type, dst_type):
+        self._record(ADDED, EDGE, (src, dst, src_type, dst_type))
+
+    def edge_removed(self, src, dst, src_type, dst_type):
+        self._record(REMOVED, EDGE, (src, dst, src_type, dst_type))
+
+    def changes_since(self, since):
+        """
+        Net changes of the topology after the given version. Nodes or edges that were added
+        and removed again within this period do not show up.
+        :param since: version known by the client
+        :return: dict {version, since, nodes: {added: [(name, type)], removed: [(name, type)]},
+                 edges: {added: [(src, dst, src_type, dst_type)], removed: [...]}}
+                 or None if the changes since this version are no longer (or not yet) known
+        """
+        with self._lock:
+            version = self.version
+            changes = [c for c in self._changes if c[0] > since]
+            oldest = self._changes[0][0] - 1 if self._changes else version
+        if since < oldest or since > version:
+            return None
+
+        # name -> [first op, last op, type], parallel edges are counted
+        nodes = dict()
+        edges = Counter()
+        for _, op, kind, item in changes:
+            if kind == NODE:
+                entry = nodes.setdefault(item[0], [op, op, item[1]])
+                entry[1] = op
+                entry[2] = item[1]
+            else:
+                edges[item] += 1 if op == ADDED else -1
+
+        result = {"version": version, "since": since,
+                  "nodes": {ADDED: list(), REMOVED: list()},
+                  "edges": {ADDED: list(), REMOVED: list()}}
+        for name in sorted(nodes):
+            first, last, node_type = nodes[name]
+            if last == ADDED:
+                # new, or removed and added again (the client has to replace its copy)
+                result["nodes"][ADDED].append((name, node_type))
+            elif first == REMOVED:
+                result["nodes"][REMOVED].append((name, node_type))
+            # added and removed again: the client has never seen it
+        for edge in sorted(edges):
+            count = edges[edge]
+            if count > 0:
+                result["edges"][ADDED].extend([edge] * count)
+            elif count < 0:
+                result["edges"][REMOVED].extend([edge] * -count)
+        return result
+
+    def view(self, name, build):
+        """
+        Cached view of the topology, rebuilt only if the topology has changed.
+        The caller is responsible for holding the topology lock while the view is built.
+        :param name: name of the view
+        :param build: function() that creates the view from the current graph
+        :return: (version, view)
+        """
+        with self._lock:
+            version = self.version
+            cached = self._views.get(name)
+        if cached is not None and cached[0] == version:
+            return cached
+        data = build()
+        with self._lock:
+            self._views[name] = (version, data)
+        return version, data
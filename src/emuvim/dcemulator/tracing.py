@@ -0,0 +1,227 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+LOG = logging.getLogger("dcemulator.tracing")
+LOG.setLevel(logging.DEBUG)
+
+# number of finished traces that are kept in memory
+MAX_TRACES = 100
+
+
+class Trace(object):
+    """
+    Spans recorded during one deployment operation (e.g. a service or stack instantiation).
+    """
+
+    def __init__(self, kind, name, **attributes):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.end = None
+        self.spans = list()
+        self._lock = threading.Lock()
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            spans = [dict(s) for s in self.spans]
+        end = self.end if self.end is not None else time.time()
+        return {"id": self.id,
+                "kind": self.kind,
+                "name": self.name,
+                "attributes": self.attributes,
+                "start": self.start,
+                "duration": end - self.start,
+                "finished": self.end is not None,
+                "spans": spans}
+
+
+class _Span(object):
+    """
+    Context manager that records a single span in the active trace of the current thread.
+    """
+
+    def __init__(self, tracer, trace, name, attributes):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        self.parent = self.tracer._push(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.time()
+        self.tracer._pop()
+        if self.trace is None:
+            return False
+        span = {"name": self.name,
+                "parent": self.parent,
+                "thread": threading.current_thread().name,
+                "start": self.start - self.trace.start,
+                "duration": end - self.start,
+                "attributes": self.attributes}
+        if exc_type is not None:
+            span["error"] = "%s: %s" % (exc_type.__name__, exc_val)
+        self.trace.add_span(span)
+        return False
+
+
+class Tracer(object):
+    """
+    Records where the time of service/stack instantiations goes.
+
+    A trace is started for each deployment operation and activated in the calling thread,
+    every span() opened by this thread (also in deeper layers like Datacenter.startCompute
+    or DCNetwork.setChain) is recorded in it. Without an active trace, span() does nothing.
+    Worker threads have to activate the trace of their caller with activate().
+    """
+
+    def __init__(self, max_traces=MAX_TRACES):
+        self.max_traces = max_traces
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def trace(self, kind, name, **attributes):
+        """
+        Start a new trace and activate it in the current thread.
+        :param kind: type of the operation, e.g. 'service' or 'stack'
+        :param name: name of the operation, e.g. the service uuid
+        :return: context manager returning the Trace
+        """
+        trace = Trace(kind, name, **attributes)
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return _ActiveTrace(self, trace, finish=True)
+
+    def activate(self, trace):
+        """
+        Activate an existing trace in the current thread (e.g. in a worker thread).
+        :return: context manager returning the Trace
+        """
+        return _ActiveTrace(self, trace, finish=False)
+
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    def span(self, name, **attributes):
+        """
+        Record a span in the active trace of the current thread.
+        :param name: name of the phase, e.g. 'addDocker'
+        :param attributes: additional information, e.g. vnf_name
+        :return: context manager
+        """
+        return _Span(self, self.current(), name, attributes)
+
+    def get_traces(self):
+        with self._lock:
+            traces = list(self._traces.values())
+        return [t.to_dict() for t in traces]
+
+    def get_trace(self, trace_id):
+        with self._lock:
+            trace = self._traces.get(trace_id)
+        if trace is None:
+            return None
+        return trace.to_dict()
+
+    def export_json(self, path, trace_id=None):
+        """
+        Write the recorded traces to a JSON file.
+        :param path: file to write
+        :param trace_id: only export this trace (default: all traces)
+        :return: number of exported traces
+        """
+        if trace_id is not None:
+            trace = self.get_trace(trace_id)
+            traces = [trace] if trace is not None else []
+        else:
+            traces = self.get_traces()
+        with open(path, "w") as f:
+            json.dump({"traces": traces}, f, indent=2)
+        LOG.info("Exported %d traces to %r" % (len(traces), path))
+        return len(traces)
+
+    def _push(self, name):
+        stack = getattr(self._local, "spans", None)
+        if stack is None:
+            stack = list()
+            self._local.spans = stack
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        return parent
+
+    def _pop(self):
+        self._local.spans.pop()
+
+
+class _ActiveTrace(object):
+
+    def __init__(self, tracer, trace, finish):
+        self.tracer = tracer
+        self.trace = trace
+        self.finish = finish
+        self.previous = None
+        self.previous_spans = None
+
+    def __enter__(self):
+        self.previous = self.tracer.current()
+        self.previous_spans = getattr(self.tracer._local, "spans", None)
+        self.tracer._local.trace = self.trace
+        self.tracer._local.spans = list()
+        return self.trace
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.tracer._local.trace = self.previous
+        self.tracer._local.spans = self.previous_spans
+        if self.finish:
+            self.trace.end = time.time()
+            if exc_type is not None:
+                self.trace.attributes["error"] = "%s: %s" % (exc_type.__name__, exc_val)
+        return False
+
+
+# tracer used by the emulator (gatekeeper, OpenStack API, data centers, network)
+TRACER = Tracer()
@@ -0,0 +1,125 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from emuvim.dcemulator.cgroupstats import find_container_cgroup, find_container_cgroups, ContainerCounters, \
+    ContainerStatsSampler
+
+CID = "a" * 64
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo: %d       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0
+  eth0: 1000       1    0    0    0     0          0         0     %d       1    0    0    0     0       0          0
+"""
+
+
+class testCgroupStats(unittest.TestCase):
+    """
+    Test the cgroup/netns container stats sampler on a fake cgroup v1 and proc tree.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, "cgroup")
+        self.proc = os.path.join(self.tmp, "proc")
+        self._write("cgroup/cpuacct/docker/%s/cpuacct.usage_percpu" % CID, "100 200\n")
+        self._write("cgroup/cpuacct/docker/%s/tasks" % CID, "4242\n4243\n")
+        self._write("cgroup/memory/docker/%s/memory.usage_in_bytes" % CID, "1024\n")
+        self._write("cgroup/memory/docker/%s/memory.limit_in_bytes" % CID, "4096\n")
+        self._write("cgroup/blkio/docker/%s/blkio.throttle.io_service_bytes" % CID,
+                    "8:0 Read 10\n8:0 Write 20\n8:16 Read 5\n8:16 Write 0\nTotal 35\n")
+        self._net(100, 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, path, content):
+        path = os.path.join(self.tmp, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # rewrite in place, the counters keep their file handles open
+        with open(path, "r+" if os.path.exists(path) else "w") as f:
+            f.write(content)
+            f.truncate()
+
+    def _net(self, rx, tx):
+        self._write("proc/4242/net/dev", NET_DEV % (rx, tx))
+
+    def testCounters(self):
+        cgroups = find_container_cgroups(self.root)
+        self.assertEqual(cgroups.keys(), [CID])
+        c = ContainerCounters(CID, cgroups[CID], root=self.root, proc_root=self.proc)
+        self.assertEqual(c.cpu(), (300, 2))
+        self.assertEqual(c.memory(), (1024, 4096))
+        self.assertEqual(c.block_io(), (15, 20))
+        self.assertEqual(c.network(), (1100, 300))
+        self.assertEqual(c.processes(), 2)
+        # the same handles see new values
+        self._net(200, 400)
+        self.assertEqual(c.network(), (1200, 500))
+        c.close()
+
+    def testFindContainer(self):
+        self.assertEqual(find_container_cgroup(CID, self.root), os.path.join(self.root, "cpuacct", "docker", CID))
+        self.assertIsNone(find_container_cgroup("b" * 64, self.root))
+
+    def testTickScansOnce(self):
+        import emuvim.dcemulator.cgroupstats as cgroupstats
+        scans = []
+        find = cgroupstats.find_container_cgroups
+
+        def counting_find(root):
+            scans.append(root)
+            return find(root)
+
+        self._write("cgroup/cpuacct/docker/%s/cpuacct.usage_percpu" % ("b" * 64), "1 2\n")
+        cgroupstats.find_container_cgroups = counting_find
+        try:
+            s = ContainerStatsSampler(root=self.root, proc_root=self.proc)
+            s._tick()
+        finally:
+            cgroupstats.find_container_cgroups = find
+        self.assertEqual(len(scans), 1)
+        self.assertEqual(sorted(s._counters.keys()), [CID, "b" * 64])
+
+    def testRates(self):
+        s = ContainerStatsSampler(interval=0.05, root=self.root, proc_root=self.proc)
+        self.assertIsNone(s.rates("b" * 64, timeout=0.2))
+        r = s.rates(CID, timeout=2)
+        self.assertEqual(r["CPU_cores"], 2)
+        self.assertEqual(r["MEM_used"], 1024)
+        self.assertEqual(r["NET_in/s"], 0)
+        self.assertIn("BLOCK_write/s", r)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from mininet.node import OVSSwitch
+from emuvim.dcemulator.net import DCNetwork
+from emuvim.dcemulator.idpool import IdPool
+from emuvim.dcemulator.pathcache import SwitchPathCache
+
+
+class _ChainNet(DCNetwork):
+    """
+    DCNetwork with the chain bookkeeping only (no Mininet), two VNFs connected to one switch.
+    The flowrules are recorded instead of being installed.
+    """
+
+    def __init__(self):
+        self.controller = None
+        self.installed_chains = []
+        self.installed_lans = dict()
+        self.chain_tags = set()
+        self.vlan_pool = IdPool("test-vlan", 1, 4094)
+        self._intf_index = dict()
+        self._node_intfs = dict()
+        self.path_cache = SwitchPathCache()
+        self.path_cache.add_switch("s1")
+        switch = OVSSwitch.__new__(OVSSwitch)
+        switch.name = "s1"
+        self.nodes = {"s1": switch, "vnf1": object(), "vnf2": object()}
+        self._index_intf("vnf1", "intf1", "vnf1-eth0", "s1", 1, "s1-eth1")
+        self._index_intf("vnf2", "intf2", "vnf2-eth0", "s1", 2, "s1-eth2")
+        self.flows = list()
+
+    def getNodeByName(self, name):
+        return self.nodes[name]
+
+    def _set_vlan_tag(self, node, switch_port, tag):
+        pass
+
+    def _set_flow_entry_dpctl(self, node, switch_inport_nr, switch_outport_nr, **kwargs):
+        self.flows.append((kwargs.get('cmd'), kwargs.get('vlan')))
+
+    def in_use(self):
+        return self.vlan_pool.stats()["in_use"]
+
+
+class testChainTags(unittest.TestCase):
+    """
+    Test that the vlan tags of chains are given back to the pool when the chains are removed.
+    """
+
+    def setUp(self):
+        self.net = _ChainNet()
+
+    def _chain(self, cmd, **kwargs):
+        self.net.setChain("vnf1", "vnf2", "intf1", "intf2", cmd=cmd, **kwargs)
+
+    def testChain(self):
+        self._chain("add-flow")
+        self.assertEqual(self.net.in_use(), 1)
+        self._chain("del-flows")
+        self.assertEqual(self.net.in_use(), 0)
+        self.assertEqual(self.net.installed_chains, [])
+
+    def testMonitorChain(self):
+        used = self.net.in_use()
+        # no chain between the vnfs: the monitoring chain gets its own tag
+        self._chain("add-flow", monitor=True, monitor_placement="tx")
+        self.assertEqual(self.net.in_use(), used + 1)
+        self._chain("del-flows", monitor=True, monitor_placement="tx")
+        self.assertEqual(self.net.in_use(), used)
+        self.assertEqual(self.net.installed_chains, [])
+        self.assertEqual(self.net.chain_tags, set())
+
+    def testMonitorChainAndChain(self):
+        self._chain("add-flow", monitor=True, monitor_placement="tx")
+        self._chain("add-flow")
+        self.assertEqual(self.net.in_use(), 2)
+        # removing the monitoring chain leaves the normal chain (and its tag) alone
+        self._chain("del-flows", monitor=True, monitor_placement="tx")
+        self.assertEqual(self.net.in_use(), 1)
+        self.assertEqual([c["monitor"] for c in self.net.installed_chains], [False])
+        self._chain("del-flows")
+        self.assertEqual(self.net.in_use(), 0)
+
+    def testPredefinedTag(self):
+        lan_tag = self.net.vlan_pool.allocate()
+        # a tag that is already in use (e.g. by an E-LAN) is not given back by the chain
+        self._chain("add-flow", tag=lan_tag)
+        self._chain("del-flows")
+        self.assertEqual(self.net.in_use(), 1)
+        # a free tag is taken from the pool and given back
+        self._chain("add-flow", tag=100)
+        self.assertEqual(self.net.in_use(), 2)
+        self._chain("del-flows")
+        self.assertEqual(self.net.in_use(), 1)
+
+    def testLANReleasedWithLastMember(self):
+        vlan = self.net.setLAN([{"name": "vnf1", "interface": "intf1"}, {"name": "vnf2", "interface": "intf2"}])
+        self.net._releaseChainsOf("vnf1")
+        self.assertEqual(self.net.in_use(), 1)
+        self.net._releaseChainsOf("vnf2")
+        self.assertEqual(self.net.in_use(), 0)
+        self.assertNotIn(vlan, self.net.installed_lans)
+        # the tag is in use by someone else now, removing more members must not release it again
+        self.assertTrue(self.net.vlan_pool.reserve(vlan))
+        self.net._releaseChainsOf("vnf1")
+        self.assertEqual(self.net.in_use(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import threading
+import unittest
+import emuvim.dcemulator.flowbatch as flowbatch
+from emuvim.dcemulator.flowbatch import RyuFlowBatch, BEST_EFFORT, ALL_OR_NOTHING
+
+
+class _Response(object):
+
+    def __init__(self, status_code, reason):
+        self.status_code = status_code
+        self.reason = reason
+
+
+class _FakeRyu(object):
+    """
+    Replaces requests.Session of the flow batch, records the flow-mods and fails the ones of the given switches.
+    """
+
+    def __init__(self, fail_dpids=(), fail_after=0):
+        self.fail_dpids = set(fail_dpids)
+        # number of flow-mods that are accepted by a failing switch before it fails
+        self.fail_after = fail_after
+        self.posts = list()
+        self._accepted = dict()
+        self._lock = threading.Lock()
+
+    def Session(self):
+        return _Session(self)
+
+    def post(self, url, json):
+        prefix = url.split('/', 3)[3]
+        dpid = json['dpid']
+        with self._lock:
+            if prefix.endswith('flowentry/add') and dpid in self.fail_dpids:
+                accepted = self._accepted.get(dpid, 0)
+                if accepted >= self.fail_after:
+                    return _Response(400, "Bad Request")
+                self._accepted[dpid] = accepted + 1
+            self.posts.append((prefix, json))
+            return _Response(200, "OK")
+
+    def added(self):
+        return [(f['dpid'], f['priority']) for p, f in self.posts if p == 'stats/flowentry/add']
+
+    def deleted(self):
+        return [(f['dpid'], f['priority']) for p, f in self.posts if p == 'stats/flowentry/delete_strict']
+
+
+class _Session(object):
+
+    def __init__(self, ryu):
+        self.ryu = ryu
+
+    def post(self, url, json=None):
+        return self.ryu.post(url, json)
+
+    def close(self):
+        pass
+
+
+class testRyuFlowBatch(unittest.TestCase):
+    """
+    Test the commit of flow batches against a fake Ryu REST API.
+    """
+
+    def setUp(self):
+        self._session = flowbatch.requests.Session
+
+    def tearDown(self):
+        flowbatch.requests.Session = self._session
+
+    def _commit(self, ryu, mode, max_workers=flowbatch.DEFAULT_MAX_WORKERS):
+        flowbatch.requests.Session = ryu.Session
+        batch = RyuFlowBatch("http://localhost:8080", mode=mode, max_workers=max_workers)
+        # 3 flow-mods on each of the switches 1, 2 and 3
+        for dpid in [1, 2, 3]:
+            for priority in [1, 2, 3]:
+                batch.add('stats/flowentry/add', {'dpid': dpid, 'priority': priority, 'cookie': 10,
+                                                  'match': {'in_port': priority}, 'actions': [{'type': 'OUTPUT'}]})
+        return batch.commit()
+
+    def testSuccess(self):
+        ryu = _FakeRyu()
+        result = self._commit(ryu, ALL_OR_NOTHING)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["installed"], 9)
+        self.assertEqual(result["rolled_back"], 0)
+        # the order of the flow-mods of a switch is kept
+        for dpid in [1, 2, 3]:
+            self.assertEqual([p for d, p in ryu.added() if d == dpid], [1, 2, 3])
+        self.assertEqual(ryu.deleted(), [])
+
+    def testBestEffort(self):
+        ryu = _FakeRyu(fail_dpids=[2], fail_after=1)
+        result = self._commit(ryu, BEST_EFFORT)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["total"], 9)
+        self.assertEqual(result["installed"], 7)
+        self.assertEqual(result["rolled_back"], 0)
+        self.assertEqual([(f["dpid"], f["flow"]["priority"], f["status"]) for f in result["failed"]],
+                         [(2, 2, 400), (2, 3, 400)])
+        self.assertEqual(ryu.deleted(), [])
+
+    def testAllOrNothing(self):
+        ryu = _FakeRyu(fail_dpids=[2], fail_after=1)
+        result = self._commit(ryu, ALL_OR_NOTHING, max_workers=1)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["installed"], 0)
+        # switch 1 and the first flow-mod of switch 2 were installed, switch 3 was not started
+        self.assertEqual(len(result["failed"]), 1)
+        self.assertEqual(result["rolled_back"], 4)
+        self.assertEqual(ryu.added(), [(1, 1), (1, 2), (1, 3), (2, 1)])
+        # exactly the installed flow entries are deleted, in reverse order
+        self.assertEqual(ryu.deleted(), [(2, 1), (1, 3), (1, 2), (1, 1)])
+        delete = [f for p, f in ryu.posts if p == 'stats/flowentry/delete_strict'][0]
+        self.assertNotIn('actions', delete)
+        self.assertEqual(delete['cookie_mask'], 0xffffffffffffffff)
+        self.assertEqual(delete['match'], {'in_port': 1})
+
+    def testAllOrNothingParallel(self):
+        ryu = _FakeRyu(fail_dpids=[2])
+        result = self._commit(ryu, ALL_OR_NOTHING)
+        self.assertEqual(result["installed"], 0)
+        self.assertEqual(sorted(ryu.deleted()), sorted(ryu.added()))
+        self.assertEqual(result["rolled_back"], len(ryu.added()))
+
+    def testCommitOnce(self):
+        flowbatch.requests.Session = _FakeRyu().Session
+        batch = RyuFlowBatch("http://localhost:8080")
+        batch.commit()
+        self.assertRaises(Exception, batch.commit)
+        self.assertRaises(Exception, batch.add, 'stats/flowentry/add', {'dpid': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import json
+import threading
+import time
+import unittest
+from emuvim.api.openstack.compute import OpenstackCompute
+from emuvim.api.openstack.openstack_dummies.heat_dummy_api import HeatDummyApi
+import emuvim.api.openstack.ip_handler as IP
+
+# parallel requests
+CLIENTS = 8
+
+
+class _Container(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.intfs = dict()
+        self.dcinfo = dict()
+
+
+class _Net(object):
+
+    def __init__(self):
+        self.links = list()
+
+
+class _Datacenter(object):
+    """
+    Starts the containers of a stack slowly, so that parallel requests overlap.
+    """
+
+    def __init__(self):
+        self.label = "dc1"
+        self.net = _Net()
+        self.containers = dict()
+
+    def startCompute(self, name, **kwargs):
+        time.sleep(0.05)
+        self.containers[name] = _Container(name)
+        return self.containers[name]
+
+    def stopCompute(self, name):
+        self.containers.pop(name, None)
+
+
+def _template(name):
+    return {"stack_name": name, "template": {
+        "heat_template_version": "2015-04-30",
+        "resources": {
+            "vnf": {"type": "OS::Nova::Server",
+                    "properties": {"name": "vnf", "image": "ubuntu:trusty", "flavor": "m1.tiny",
+                                   "networks": [{"port": {"get_resource": "port"}}]}},
+            "port": {"type": "OS::Neutron::Port",
+                     "properties": {"name": "port", "network": {"get_resource": "net"}}},
+            "net": {"type": "OS::Neutron::Net", "properties": {"name": "net"}},
+            "subnet": {"type": "OS::Neutron::Subnet",
+                       "properties": {"name": "subnet", "network": {"get_resource": "net"}}}
+        }}}
+
+
+class testHeatConcurrency(unittest.TestCase):
+    """
+    Test that the heat API keeps the stacks consistent when its requests are served in parallel.
+    """
+
+    def setUp(self):
+        self.compute = OpenstackCompute()
+        self.compute.dc = _Datacenter()
+        self.api = HeatDummyApi("127.0.0.1", 0, self.compute)
+
+    def tearDown(self):
+        for stack in self.compute.stacks.values():
+            for net in stack.nets.values():
+                IP.free_cidr(net.get_cidr(), net.subnet_id)
+
+    def _parallel(self, method, path, data=None):
+        """
+        Sends the same request from CLIENTS threads at the same time.
+        :return: list of the response status codes
+        """
+        start = threading.Event()
+        codes = list()
+
+        def client():
+            c = self.api.app.test_client()
+            start.wait()
+            codes.append(getattr(c, method)(path, data=data).status_code)
+
+        threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+        for t in threads:
+            t.start()
+        start.set()
+        for t in threads:
+            t.join(30)
+        return sorted(codes)
+
+    def testCreateSameName(self):
+        codes = self._parallel("post", "/v1/tenant/stacks", json.dumps(_template("stack1")))
+        self.assertEqual(codes, [201] + [409] * (CLIENTS - 1))
+        self.assertEqual([s.stack_name for s in self.compute.stacks.values()], ["stack1"])
+        self.assertEqual(len(self.compute.computeUnits), 1)
+        self.assertEqual(len(self.compute.ports), 1)
+
+    def testDeleteParallel(self):
+        c = self.api.app.test_client()
+        self.assertEqual(c.post("/v1/tenant/stacks", data=json.dumps(_template("stack1"))).status_code, 201)
+        self._parallel("delete", "/v1/tenant/stacks/stack1")
+        self.assertEqual(self.compute.stacks, dict())
+        self.assertEqual(len(self.compute.ports), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from emuvim.api.openstack import heat_parser
+from emuvim.api.openstack.heat_parser import HeatParser
+
+
+class testHeatResourceOrder(unittest.TestCase):
+    """
+    Test the dependency ordering of heat template resources and the plan cache.
+    """
+
+    def setUp(self):
+        heat_parser._plan_cache.clear()
+        self.parser = HeatParser(None)
+
+    def tearDown(self):
+        heat_parser._plan_cache.clear()
+
+    def _template(self):
+        return {
+            'server': {'type': 'OS::Nova::Server',
+                       'properties': {'networks': [{'port': {'get_resource': 'port'}}]}},
+            'port': {'type': 'OS::Neutron::Port',
+                     'properties': {'network': {'get_resource': 'net'}}},
+            'subnet': {'type': 'OS::Neutron::Subnet',
+                       'properties': {'network': {'get_resource': 'net'}}},
+            'net': {'type': 'OS::Neutron::Net'}
+        }
+
+    def testOrder(self):
+        order, errors = self.parser.resolve_order(self._template())
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(order), ['net', 'port', 'server', 'subnet'])
+        # ports need the net and its subnets, servers need their ports
+        self.assertLess(order.index('net'), order.index('port'))
+        self.assertLess(order.index('subnet'), order.index('port'))
+        self.assertLess(order.index('port'), order.index('server'))
+
+    def testCycle(self):
+        resources = {
+            'a': {'type': 'OS::Neutron::Net', 'properties': {'x': {'get_resource': 'b'}}},
+            'b': {'type': 'OS::Neutron::Net', 'properties': {'x': {'get_resource': 'a'}}},
+            'c': {'type': 'OS::Neutron::Net', 'properties': {'x': {'get_resource': 'a'}}},
+            'd': {'type': 'OS::Neutron::Net'}
+        }
+        order, errors = self.parser.resolve_order(resources)
+        self.assertEqual(order, ['d'])
+        self.assertEqual(errors, ["dependency cycle: a -> b -> a",
+                                  "resource c depends on a dependency cycle"])
+
+    def testPlanCache(self):
+        order, errors = self.parser.resolve_order(self._template())
+        self.assertEqual(len(heat_parser._plan_cache), 1)
+        # an identical template hits the cache
+        self.assertEqual(HeatParser(None).resolve_order(self._template()), (order, errors))
+        self.assertEqual(len(heat_parser._plan_cache), 1)
+        digest = list(heat_parser._plan_cache)[0]
+        heat_parser._plan_cache[digest] = (['cached'], [])
+        self.assertEqual(self.parser.resolve_order(self._template()), (['cached'], []))
+        heat_parser._plan_cache[digest] = (list(order), list(errors))
+        # the cached plan is not changed by callers modifying the result
+        order.append('foo')
+        self.assertNotIn('foo', self.parser.resolve_order(self._template())[0])
+        # a different template gets its own plan
+        template = self._template()
+        del template['server']
+        self.assertEqual(sorted(self.parser.resolve_order(template)[0]), ['net', 'port', 'subnet'])
+        self.assertEqual(len(heat_parser._plan_cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
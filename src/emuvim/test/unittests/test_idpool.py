@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.idpool import IdPool, IdPoolExhausted
+
+
+class testIdPool(unittest.TestCase):
+    """
+    Test the recyclable id pools used for vlan tags, cookies and flow groups.
+    """
+
+    def testAllocateRelease(self):
+        p = IdPool("test", 1, 3)
+        self.assertEqual([p.allocate(), p.allocate(), p.allocate()], [1, 2, 3])
+        self.assertRaises(IdPoolExhausted, p.allocate)
+        self.assertTrue(p.release(2))
+        # unknown or already released ids are ignored
+        self.assertFalse(p.release(2))
+        self.assertFalse(p.release(42))
+        self.assertEqual(p.allocate(), 2)
+        s = p.stats()
+        self.assertEqual(s["in_use"], 3)
+        self.assertEqual(s["free"], 0)
+        self.assertEqual(s["releases"], 1)
+        self.assertEqual(s["peak"], 3)
+
+    def testFreshIdsFirst(self):
+        p = IdPool("test", 1, 10)
+        a = p.allocate()
+        p.release(a)
+        # a released id is only reused once the fresh ids are exhausted
+        self.assertNotEqual(p.allocate(), a)
+
+    def testRecycleFirst(self):
+        p = IdPool("test", 1, 10, recycle_first=True)
+        a = p.allocate()
+        p.allocate()
+        p.release(a)
+        self.assertEqual(p.allocate(), a)
+
+    def testReserve(self):
+        p = IdPool("test", 1, 3)
+        self.assertTrue(p.reserve(1))
+        self.assertFalse(p.reserve(1))
+        # ids outside of the range are not tracked
+        self.assertFalse(p.reserve(100))
+        self.assertEqual(p.allocate(), 2)
+        p.release(2)
+        p.reserve(2)
+        self.assertEqual(p.allocate(), 3)
+        self.assertRaises(IdPoolExhausted, p.allocate)
+
+
+if __name__ == '__main__':
+    unittest.main()
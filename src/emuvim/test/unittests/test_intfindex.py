@@ -0,0 +1,173 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import threading
+import unittest
+import networkx as nx
+from mininet.node import Docker, OVSSwitch
+from emuvim.dcemulator import net as dcnet
+from emuvim.dcemulator.net import DCNetwork
+from emuvim.dcemulator.idpool import IdPool
+from emuvim.dcemulator.pathcache import SwitchPathCache
+from emuvim.dcemulator.topologyjournal import TopologyJournal
+
+
+class _Intf(object):
+
+    def __init__(self, node, port_nr):
+        self.node = node
+        self.name = "%s-eth%d" % (node.name, port_nr)
+
+    def __str__(self):
+        return self.name
+
+
+class _Link(object):
+
+    def __init__(self, intf1, intf2):
+        self.intf1 = intf1
+        self.intf2 = intf2
+
+
+def _node(cls, name):
+    node = cls.__new__(cls)
+    node.name = name
+    node.ports = dict()
+    return node
+
+
+def _addLink(net, node1, node2, **params):
+    intfs = list()
+    for node in [node1, node2]:
+        port_nr = len(node.ports) + 1
+        intf = _Intf(node, port_nr)
+        node.ports[intf] = port_nr
+        intfs.append(intf)
+    link = _Link(*intfs)
+    net.links.append(link)
+    return link
+
+
+def _removeLink(net, link=None, node1=None, node2=None):
+    net.links.remove(link)
+
+
+def _removeDocker(net, name, **params):
+    pass
+
+
+class _IndexNet(DCNetwork):
+    """
+    DCNetwork with the topology bookkeeping only, Mininet links are replaced by _addLink/_removeLink.
+    """
+
+    def __init__(self):
+        self.dcs = dict()
+        self.links = list()
+        self.topology_lock = threading.RLock()
+        self.DCNetwork_graph = nx.MultiDiGraph()
+        self.topology = TopologyJournal()
+        self._intf_index = dict()
+        self._node_intfs = dict()
+        self.path_cache = SwitchPathCache()
+        self.installed_chains = []
+        self.installed_lans = dict()
+        self.chain_tags = set()
+        self.vlan_pool = IdPool("test-vlan", 1, 4094)
+
+
+class testIntfIndex(unittest.TestCase):
+    """
+    Test that the interface index follows added and removed links and containers.
+    """
+
+    def setUp(self):
+        self._containernet = dict((name, getattr(dcnet.Containernet, name))
+                                  for name in ["addLink", "removeLink", "removeDocker"])
+        dcnet.Containernet.addLink = _addLink
+        dcnet.Containernet.removeLink = _removeLink
+        dcnet.Containernet.removeDocker = _removeDocker
+        self.net = _IndexNet()
+        self.vnf1 = _node(Docker, "vnf1")
+        self.vnf2 = _node(Docker, "vnf2")
+        self.s1 = _node(OVSSwitch, "s1")
+        self.s2 = _node(OVSSwitch, "s2")
+        self.net.addLink(self.vnf1, self.s1, params1={"ip": "10.0.0.1/24", "id": "in"})
+        self.net.addLink(self.vnf1, self.s1, params1={"ip": "10.0.1.1/24", "id": "out"})
+        self.net.addLink(self.s1, self.s2)
+        self.net.addLink(self.vnf2, self.s2, params1={"ip": "10.0.1.2/24", "id": "in"})
+
+    def tearDown(self):
+        for name, method in self._containernet.items():
+            setattr(dcnet.Containernet, name, method)
+
+    def _port(self, node_name, intf=None):
+        return self.net.find_connected_switch_port(node_name, intf)
+
+    def testAddLink(self):
+        port = self._port("vnf1", "in")
+        self.assertEqual(port, dcnet.SwitchPort("s1", 1, "s1-eth1", "in", "vnf1-eth1"))
+        # by interface name, and the first interface by default
+        self.assertIs(self._port("vnf1", "vnf1-eth1"), port)
+        self.assertIs(self._port("vnf1"), port)
+        self.assertEqual(self._port("vnf1", "out"), dcnet.SwitchPort("s1", 2, "s1-eth2", "out", "vnf1-eth2"))
+        # reverse entries at the switch and switch-to-switch links
+        self.assertEqual(self._port("s1", "s1-eth1").switch, "vnf1")
+        self.assertEqual(self._port("s1", "s1-eth3"), dcnet.SwitchPort("s2", 1, "s2-eth1", 3, "s1-eth3"))
+        self.assertEqual(self._port("s2", 1).switch, "s1")
+        self.assertEqual(self._port("vnf2", "in").switch, "s2")
+        self.assertIsNone(self._port("vnf1", "foo"))
+        self.assertIsNone(self._port("vnf3"))
+
+    def testRemoveLink(self):
+        self.net.removeLink(link=self.net.links[0])
+        self.assertIsNone(self._port("vnf1", "in"))
+        self.assertIsNone(self._port("vnf1", "vnf1-eth1"))
+        self.assertIsNone(self._port("s1", "s1-eth1"))
+        # the next interface is the default now
+        self.assertEqual(self._port("vnf1").intf_id, "out")
+        # lookup of the link by its nodes
+        self.net.removeLink(node1=self.s1, node2=self.s2)
+        self.assertIsNone(self._port("s1", "s1-eth3"))
+        self.assertIsNone(self._port("s2", "s2-eth1"))
+        self.assertEqual(self._port("vnf2").switch, "s2")
+
+    def testRemoveDocker(self):
+        self.net.removeDocker("vnf1")
+        self.assertIsNone(self._port("vnf1"))
+        self.assertIsNone(self._port("vnf1", "out"))
+        self.assertIsNone(self._port("s1", "s1-eth1"))
+        self.assertIsNone(self._port("s1", "s1-eth2"))
+        self.assertNotIn("vnf1", self.net._node_intfs)
+        # other links are not touched
+        self.assertEqual(self._port("s1", "s1-eth3").switch, "s2")
+        self.assertEqual(self._port("vnf2", "in").switch, "s2")
+        self.assertEqual(sorted(self.net._node_intfs), ["s1", "s2", "vnf2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
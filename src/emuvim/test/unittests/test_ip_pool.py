@@ -0,0 +1,106 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from emuvim.api.openstack.ip_pool import AddressPool
+
+
+class testAddressPool(unittest.TestCase):
+    """
+    Test the address pools used for the IPs of ports and the subnets of networks.
+    """
+
+    def testLowestFreeFirst(self):
+        p = AddressPool(10, 20)
+        self.assertEqual([p.allocate("a"), p.allocate("b"), p.allocate("c"), p.allocate("d")], [10, 11, 12, 13])
+        self.assertTrue(p.withdraw(12))
+        self.assertTrue(p.withdraw(11))
+        self.assertFalse(p.withdraw(11))
+        # withdrawn addresses are reused lowest first, before the rest of the range
+        self.assertEqual([p.allocate("e"), p.allocate("f"), p.allocate("g")], [11, 12, 14])
+        self.assertEqual(p.owner(11), "e")
+        self.assertEqual(len(p), 5)
+
+    def testWithdrawOwner(self):
+        p = AddressPool(10, 20)
+        a = p.allocate("a")
+        self.assertFalse(p.withdraw(a, owner="b"))
+        self.assertTrue(a in p)
+        self.assertTrue(p.withdraw(a, owner="a"))
+        self.assertFalse(a in p)
+
+    def testAssignBelowCounter(self):
+        p = AddressPool(10, 20)
+        for owner in "abc":
+            p.allocate(owner)
+        p.withdraw(10)
+        p.withdraw(11)
+        # an address that was withdrawn below the counter is assigned again
+        self.assertTrue(p.assign(10, "x"))
+        self.assertFalse(p.assign(10, "y"))
+        self.assertEqual(p.owner(10), "x")
+        # allocate skips it
+        self.assertEqual(p.allocate("d"), 11)
+        self.assertEqual(p.allocate("e"), 13)
+        # addresses assigned above the counter are skipped as well
+        self.assertTrue(p.assign(15, "z"))
+        self.assertEqual([p.allocate("f"), p.allocate("g")], [14, 16])
+
+    def testStep(self):
+        p = AddressPool(0, 1024, step=256)
+        self.assertEqual([p.allocate("a"), p.allocate("b")], [0, 256])
+        p.withdraw(0)
+        self.assertEqual(p.allocate("c"), 0)
+        self.assertEqual(p.allocate("d"), 512)
+
+    def testAllocateMany(self):
+        p = AddressPool(1, 5)
+        self.assertEqual(p.allocate_many(["a", "b"]), [1, 2])
+        p.withdraw(1)
+        # not enough addresses left: nothing is allocated
+        self.assertIsNone(p.allocate_many(["c", "d", "e", "f", "g"]))
+        self.assertEqual(len(p), 1)
+        self.assertFalse(1 in p)
+        self.assertFalse(3 in p)
+        self.assertEqual(p.allocate_many(["c", "d", "e", "f"]), [1, 3, 4, 5])
+        self.assertEqual(p.owner(3), "d")
+
+    def testExhausted(self):
+        p = AddressPool(1, 3)
+        self.assertEqual(p.allocate_many(["a", "b", "c"]), [1, 2, 3])
+        self.assertIsNone(p.allocate("d"))
+        self.assertIsNone(p.allocate_many(["d"]))
+        p.withdraw(2)
+        self.assertEqual(p.allocate("d"), 2)
+        self.assertIsNone(p.allocate("e"))
+        p.reset()
+        self.assertEqual(len(p), 0)
+        self.assertEqual(p.allocate("e"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
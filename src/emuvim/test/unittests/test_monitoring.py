@@ -0,0 +1,442 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from collections import namedtuple
+from mininet.node import OVSSwitch
+from emuvim.dcemulator.monitoring import DCNetworkMonitor, EXPORT_SCRAPE, RATE_SAMPLES, RATE_STATS
+
+SwitchPort = namedtuple('SwitchPort', ['switch', 'port_nr', 'port_name', 'intf_id', 'intf_name'])
+
+
+class _FakeNet(object):
+    """
+    VNFs connected to switches, Ryu replies are served from the port counters set by the test.
+    """
+
+    def __init__(self):
+        self.dcs = dict()
+        self.ports = dict()
+        self.switches = dict()
+        # dpid -> {port_nr: rx_packets}
+        self.counters = dict()
+        self.queries = list()
+        # called with the query before it is answered
+        self.on_query = None
+        self._lock = threading.Lock()
+
+    def connect(self, vnf_name, intf, switch, dpid, port_nr):
+        self.ports[(vnf_name, intf)] = SwitchPort(switch, port_nr, "%s-eth%d" % (switch, port_nr), intf, intf)
+        if switch not in self.switches:
+            sw = OVSSwitch.__new__(OVSSwitch)
+            sw.name = switch
+            sw.dpid = "%016x" % dpid
+            self.switches[switch] = sw
+        self.counters.setdefault(dpid, dict())[port_nr] = 0
+
+    def find_connected_switch_port(self, vnf_name, vnf_interface=None):
+        return self.ports.get((vnf_name, vnf_interface))
+
+    def getNodeByName(self, name):
+        return self.switches[name]
+
+    def ryu_REST(self, prefix, dpid=None, data=None, session=None):
+        with self._lock:
+            self.queries.append((prefix, dpid))
+        if self.on_query is not None:
+            self.on_query(prefix, dpid)
+        if prefix == 'stats/port':
+            return {str(dpid): [{'port_no': port_nr, 'rx_packets': count, 'tx_packets': 0,
+                                 'duration_sec': 10, 'duration_nsec': 0}
+                                for port_nr, count in self.counters[dpid].items()]}
+        return {str(dpid): []}
+
+    def count(self, prefix, dpid):
+        with self._lock:
+            return self.queries.count((prefix, dpid))
+
+
+class _Monitor(DCNetworkMonitor):
+    """
+    Monitor without helper containers and metrics server, the scheduler is only run by runLoop.
+    """
+
+    def __init__(self, net, **kwargs):
+        self._loop_thread = None
+        DCNetworkMonitor.__init__(self, net, export_mode=EXPORT_SCRAPE, container_stats=None, **kwargs)
+
+    def _monitor_loop(self):
+        pass
+
+    def start_metrics_server(self, port=None):
+        return None
+
+    def runLoop(self):
+        self._loop_thread = threading.Thread(target=DCNetworkMonitor._monitor_loop, args=(self,))
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+
+    def close(self):
+        self.start_monitoring = False
+        self._wakeup.set()
+        if self._loop_thread is not None:
+            self._loop_thread.join(5)
+        self._worker_pool.terminate()
+
+    def value(self, name, vnf_name, vnf_interface, flow_id=None):
+        return self.registry.get_sample_value(name, {'vnf_name': vnf_name, 'vnf_interface': vnf_interface,
+                                                     'flow_id': str(flow_id)})
+
+
+class testMonitorScheduler(unittest.TestCase):
+    """
+    Test the per-metric polling intervals of the monitoring loop.
+    """
+
+    def setUp(self):
+        self.net = _FakeNet()
+        self.net.connect("vnf1", "intf1", "s1", 1, 1)
+        self.net.connect("vnf2", "intf2", "s2", 2, 1)
+        self.monitor = _Monitor(self.net)
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def testTakeDue(self):
+        m = self.monitor
+        m.setup_metric("vnf1", "intf1", "tx_packets", interval=1.0)
+        m.setup_metric("vnf2", "intf2", "tx_packets", interval=3.0)
+        now = time.time()
+        for metric in m.network_metrics:
+            metric['next_poll'] = now
+        due, lag = m._take_due(m.network_metrics, now)
+        self.assertEqual(len(due), 2)
+        self.assertEqual([metric['vnf_name'] for metric in m._take_due(m.network_metrics, now + 1.0)[0]], ["vnf1"])
+        self.assertEqual(m._take_due(m.network_metrics, now + 1.5)[0], [])
+        # vnf1 missed its poll at now + 2.0, it is skipped
+        self.assertEqual(len(m._take_due(m.network_metrics, now + 3.0)[0]), 2)
+        self.assertEqual(m.monitor_stats['skipped_polls'], 1)
+        # missed polls are skipped, the cadence stays the same
+        due, lag = m._take_due(m.network_metrics, now + 6.5)
+        self.assertEqual(len(due), 2)
+        self.assertAlmostEqual(lag, 2.5)
+        self.assertEqual(m.monitor_stats['skipped_polls'], 3)
+        self.assertAlmostEqual(m.network_metrics[0]['next_poll'], now + 7.0)
+        self.assertAlmostEqual(m.network_metrics[1]['next_poll'], now + 9.0)
+
+    def testIntervals(self):
+        self.monitor.setup_metric("vnf1", "intf1", "tx_packets", interval=0.1)
+        self.monitor.setup_metric("vnf2", "intf2", "tx_packets", interval=0.5)
+        self.monitor.runLoop()
+        time.sleep(1.2)
+        fast = self.net.count('stats/port', 1)
+        slow = self.net.count('stats/port', 2)
+        self.assertGreaterEqual(fast, 8)
+        self.assertLessEqual(fast, 14)
+        self.assertGreaterEqual(slow, 2)
+        self.assertLessEqual(slow, 4)
+        self.assertGreater(self.monitor.get_monitor_stats()['cycles'], 0)
+
+    def testRemoveDuringCycle(self):
+        self.net.counters[1][1] = 42
+        self.net.counters[2][1] = 43
+        self.monitor.setup_metric("vnf1", "intf1", "tx_packets")
+        self.monitor.setup_metric("vnf2", "intf2", "tx_packets")
+        network_due, _ = self.monitor._take_due(self.monitor.network_metrics, time.time() + 1)
+
+        # vnf1 is removed while the switches are queried
+        def remove(prefix, dpid):
+            if dpid == 1:
+                self.monitor.stop_metric("vnf1", "intf1", "tx_packets")
+        self.net.on_query = remove
+        self.monitor._monitor_cycle(network_due, [], 0.0)
+
+        self.assertIsNone(self.monitor.value('sonemu_tx_count_packets', "vnf1", "intf1"))
+        self.assertEqual(self.monitor.value('sonemu_tx_count_packets', "vnf2", "intf2"), 43)
+        self.assertEqual([m['vnf_name'] for m in self.monitor.network_metrics], ["vnf2"])
+
+
+# canned ofctl_rest /stats/flow reply of switch 1
+FLOW_STATS = {"1": [
+    {"cookie": 10, "match": {"in_port": 1, "dl_vlan": 100}, "actions": ["OUTPUT:2"],
+     "packet_count": 5, "byte_count": 500, "duration_sec": 4, "duration_nsec": 0},
+    {"cookie": 10, "match": {"in_port": 2}, "actions": ["POP_VLAN", "OUTPUT:1"],
+     "packet_count": 7, "byte_count": 700, "duration_sec": 3, "duration_nsec": 0},
+    {"cookie": 11, "match": {"in_port": 1}, "actions": [{"type": "OUTPUT", "port": 3}],
+     "packet_count": 9, "byte_count": 900, "duration_sec": 2, "duration_nsec": 0},
+    {"cookie": 0x100000000 + 10, "match": {"in_port": "1"}, "actions": ["OUTPUT:CONTROLLER", "OUTPUT:3"],
+     "packet_count": 11, "byte_count": 1100, "duration_sec": 1, "duration_nsec": 0},
+    {"cookie": 10, "match": {}, "actions": [],
+     "packet_count": 13, "byte_count": 1300, "duration_sec": 1, "duration_nsec": 0}
+]}
+
+
+class testFlowStatsFilter(unittest.TestCase):
+    """
+    Test the selection of the monitored flows from the flow-stats reply of their switch.
+    """
+
+    def setUp(self):
+        self.net = _FakeNet()
+        self.monitor = _Monitor(self.net)
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def _select(self, metric_key, cookie, mon_port):
+        flow_dict = {'switch_dpid': 1, 'metric_key': metric_key, 'cookie': cookie, 'mon_port': mon_port}
+        return [f['packet_count'] for f in self.monitor._filter_flow_stats(flow_dict, FLOW_STATS)["1"]]
+
+    def testInPort(self):
+        # tx: flows entering the switch at the monitored port, the cookie is compared with COOKIE_MASK
+        self.assertEqual(self._select('tx_packets', 10, 1), [5, 11])
+        self.assertEqual(self._select('tx_packets', 11, 1), [9])
+        self.assertEqual(self._select('tx_bytes', 10, 2), [7])
+        self.assertEqual(self._select('tx_packets', 12, 1), [])
+
+    def testOutputPort(self):
+        # rx: flows leaving the switch at the monitored port (string and dict actions)
+        self.assertEqual(self._select('rx_packets', 10, 1), [7])
+        self.assertEqual(self._select('rx_packets', 10, 3), [11])
+        self.assertEqual(self._select('rx_packets', 11, 3), [9])
+        self.assertEqual(self._select('rx_packets', 10, 4), [])
+
+    def testCookieString(self):
+        self.assertEqual(self._select('tx_packets', "0xa", 1), [5, 11])
+
+    def testOtherSwitch(self):
+        flow_dict = {'switch_dpid': 2, 'metric_key': 'tx_packets', 'cookie': 10, 'mon_port': 1}
+        self.assertEqual(self.monitor._filter_flow_stats(flow_dict, FLOW_STATS), {"2": []})
+
+    def testOutputPorts(self):
+        self.assertEqual(DCNetworkMonitor._output_ports(FLOW_STATS["1"][3]), [3])
+        self.assertEqual(DCNetworkMonitor._output_ports({"actions": ["OUTPUT:IN_PORT", {"type": "DROP"}]}), [])
+
+    def testOneQueryPerSwitch(self):
+        self.net.connect("vnf1", "intf1", "s1", 1, 1)
+        self.net.connect("vnf2", "intf2", "s1", 1, 2)
+        self.monitor.setup_flow("vnf1", "intf1", "tx_packets", cookie=10)
+        self.monitor.setup_flow("vnf2", "intf2", "rx_packets", cookie=10)
+        queries = list()
+        self.monitor._query_ryu = lambda job: queries.append(job) or FLOW_STATS
+        self.monitor._monitor_cycle([], list(self.monitor.flow_metrics), 0.0)
+        # one flow-stats request for both flows, filtered on their common cookie by the switch
+        self.assertEqual(queries, [('stats/flow', 1, {'cookie': 10, 'cookie_mask': 0xffffffff})])
+        self.assertEqual(self.monitor.value('sonemu_tx_count_packets', "vnf1", "intf1", 10), 16)
+        self.assertEqual(self.monitor.value('sonemu_rx_count_packets', "vnf2", "intf2", 10), 5)
+
+
+class testRates(unittest.TestCase):
+    """
+    Test the rates calculated from the switch counters and timestamps, and their statistics.
+    """
+
+    def setUp(self):
+        self.monitor = _Monitor(_FakeNet())
+
+    def tearDown(self):
+        self.monitor.close()
+
+    def _metric(self, metric_key='tx_packets'):
+        metric_dict = {'vnf_name': 'vnf1', 'vnf_interface': 'intf1', 'metric_key': metric_key,
+                       'previous_measurement': 0, 'previous_monitor_time': 0}
+        self.monitor.network_metrics.append(metric_dict)
+        return metric_dict
+
+    def _feed(self, metric_dict, samples):
+        return [self.monitor._update_rate(metric_dict, measurement, timestamp, None)
+                for timestamp, measurement in samples]
+
+    def testRates(self):
+        m = self._metric()
+        rates = self._feed(m, [(1.0, 0), (2.0, 100), (4.0, 300), (4.5, 450),
+                               # same switch timestamp: no rate
+                               (4.5, 500),
+                               # counter reset (e.g. port re-created): no rate
+                               (6.0, 50),
+                               (7.0, 250)])
+        self.assertEqual(rates, [None, 100.0, 100.0, 300.0, None, None, 200.0])
+        self.assertEqual(len(m['rate_samples']), 4)
+        self.assertEqual(m['rate_stats'], {'current': 200.0, 'min': 100.0, 'max': 300.0,
+                                           'p50': 100.0, 'p90': 300.0, 'p99': 300.0})
+        labels = {'vnf_name': 'vnf1', 'vnf_interface': 'intf1', 'flow_id': 'None', 'stat': 'p50'}
+        self.assertEqual(self.monitor.registry.get_sample_value('sonemu_tx_rate_packets', labels), 100.0)
+
+    def testBitRate(self):
+        m = self._metric('rx_bytes')
+        self.assertEqual(self._feed(m, [(1.0, 1000), (1.5, 2000)]), [None, 16000.0])
+        rate = self.monitor.get_rates(metric='rx_bytes')[0]
+        self.assertEqual(rate['unit'], 'bits/s')
+        self.assertEqual(rate['current'], 16000.0)
+        self.assertEqual(rate['samples'], 1)
+
+    def testWindow(self):
+        m = self._metric()
+        self._feed(m, [(1.0, 0), (2.0, 100)])
+        # samples older than the rate window are kept in the ring buffer, but not used for the statistics
+        m['rate_samples'].appendleft((time.time() - self.monitor.rate_window - 10, 1000.0))
+        self._feed(m, [(3.0, 150)])
+        self.assertEqual(len(m['rate_samples']), 3)
+        self.assertEqual(m['rate_stats']['max'], 100.0)
+        self.assertEqual(m['rate_stats']['min'], 50.0)
+
+    def testRingBuffer(self):
+        m = self._metric()
+        self._feed(m, [(float(t), t * 10) for t in range(1, RATE_SAMPLES + 20)])
+        self.assertEqual(len(m['rate_samples']), RATE_SAMPLES)
+        self.assertEqual(m['rate_stats']['p99'], 10.0)
+
+    def testGetRates(self):
+        self._feed(self._metric(), [(1.0, 0), (2.0, 10)])
+        self.assertEqual(self.monitor.get_rates(vnf_name='vnf2'), [])
+        rate = self.monitor.get_rates(vnf_name='vnf1', vnf_interface='intf1')[0]
+        self.assertEqual(rate['unit'], 'packets/s')
+        self.assertEqual(rate['window'], self.monitor.rate_window)
+        self.assertEqual([rate[stat] for stat in RATE_STATS], [10.0] * len(RATE_STATS))
+        # no rate yet: all statistics are None
+        self._metric('rx_packets')
+        rate = self.monitor.get_rates(metric='rx_packets')[0]
+        self.assertEqual([rate[stat] for stat in RATE_STATS], [None] * len(RATE_STATS))
+
+
+class _Datacenter(object):
+
+    def __init__(self, label):
+        self.label = label
+        self.containers = dict()
+
+
+class _Container(object):
+
+    def __init__(self, did):
+        self.did = did
+
+
+class testContainerStats(unittest.TestCase):
+    """
+    Test the built-in container stats exporter on a fake cgroup v1 tree.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.net = _FakeNet()
+        self.net.dcs["dc1"] = _Datacenter("dc1")
+        self.monitor = _Monitor(self.net)
+        self.monitor.cgroup_root = self.tmp
+
+    def tearDown(self):
+        self.monitor.close()
+        shutil.rmtree(self.tmp)
+
+    def _write(self, path, content):
+        path = os.path.join(self.tmp, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # rewrite in place, the counters keep their file handles open
+        with open(path, "r+" if os.path.exists(path) else "w") as f:
+            f.write(content)
+            f.truncate()
+
+    def _cgroup(self, cid, cpu_ns, mem_used, mem_limit=4096):
+        self._write("cpuacct/docker/%s/cpuacct.usage_percpu" % cid, "%d 0\n" % cpu_ns)
+        self._write("memory/docker/%s/memory.usage_in_bytes" % cid, "%d\n" % mem_used)
+        self._write("memory/docker/%s/memory.limit_in_bytes" % cid, "%d\n" % mem_limit)
+
+    def _deploy(self, vnf_name, cid):
+        self.net.dcs["dc1"].containers[vnf_name] = _Container(cid)
+
+    def value(self, name, vnf_name):
+        return self.monitor.registry.get_sample_value(name, {'vnf_name': vnf_name, 'datacenter': 'dc1'})
+
+    def testSample(self):
+        cid = "a" * 64
+        self._cgroup(cid, 2 * 10 ** 9, 1024)
+        self._deploy("vnf1", cid)
+        self.monitor._sample_containers()
+        self.assertEqual(self.value('sonemu_container_cpu_usage_seconds', "vnf1"), 2.0)
+        self.assertEqual(self.value('sonemu_container_memory_usage_bytes', "vnf1"), 1024)
+        self.assertEqual(self.value('sonemu_container_memory_limit_bytes', "vnf1"), 4096)
+        # the load needs two samples
+        self.assertIsNone(self.value('sonemu_container_cpu_load', "vnf1"))
+
+        # one core used for two seconds
+        self.monitor._containers[cid]['time'] -= 2.0
+        self._cgroup(cid, 4 * 10 ** 9, 2048)
+        self.monitor._sample_containers()
+        self.assertEqual(self.value('sonemu_container_cpu_usage_seconds', "vnf1"), 4.0)
+        self.assertAlmostEqual(self.value('sonemu_container_cpu_load', "vnf1"), 1.0, places=2)
+        self.assertEqual(self.value('sonemu_container_memory_usage_bytes', "vnf1"), 2048)
+
+    def testNotStarted(self):
+        cid = "b" * 64
+        self.net.dcs["dc1"].containers["vnf2"] = _Container(None)
+        self._deploy("vnf1", cid)
+        self.monitor._sample_containers()
+        self.assertEqual(self.monitor._containers, dict())
+        # the cgroup shows up once the container is running
+        self._cgroup(cid, 10 ** 9, 1024)
+        self.monitor._sample_containers()
+        self.assertEqual(self.monitor._containers.keys(), [cid])
+        self.assertEqual(self.value('sonemu_container_cpu_usage_seconds', "vnf1"), 1.0)
+
+    def testRemove(self):
+        cid1 = "a" * 64
+        cid2 = "b" * 64
+        self._cgroup(cid1, 10 ** 9, 1024)
+        self._cgroup(cid2, 10 ** 9, 1024)
+        self._deploy("vnf1", cid1)
+        self._deploy("vnf2", cid2)
+        self.monitor._sample_containers()
+        self.monitor._containers[cid1]['time'] -= 1.0
+        self.monitor._sample_containers()
+        counters = self.monitor._containers[cid1]['counters']
+        self.assertIsNotNone(self.value('sonemu_container_cpu_load', "vnf1"))
+
+        del self.net.dcs["dc1"].containers["vnf1"]
+        self.monitor._sample_containers()
+        self.assertEqual(self.monitor._containers.keys(), [cid2])
+        # all series of the removed container are gone, its files are closed
+        for name in ['sonemu_container_cpu_usage_seconds', 'sonemu_container_cpu_load',
+                     'sonemu_container_memory_usage_bytes', 'sonemu_container_memory_limit_bytes']:
+            self.assertIsNone(self.value(name, "vnf1"), name)
+        self.assertEqual(counters._files, dict())
+        self.assertEqual(self.value('sonemu_container_memory_usage_bytes', "vnf2"), 1024)
+
+        # a container that is deployed again under the same name starts without a load
+        self._deploy("vnf1", cid1)
+        self.monitor._sample_containers()
+        self.assertEqual(self.value('sonemu_container_cpu_usage_seconds', "vnf1"), 1.0)
+        self.assertIsNone(self.value('sonemu_container_cpu_load', "vnf1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
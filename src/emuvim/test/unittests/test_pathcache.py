@@ -0,0 +1,111 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.pathcache import SwitchPathCache
+
+
+class testSwitchPathCache(unittest.TestCase):
+    """
+    Test that cached switch paths are recomputed after topology changes.
+    """
+
+    def setUp(self):
+        # s1 - s2 - s3 - s4 and a longer detour s1 - s5 - s6 - s7 - s4
+        self.cache = SwitchPathCache()
+        for sw in ["s1", "s2", "s3", "s4", "s5", "s6", "s7"]:
+            self.cache.add_switch(sw)
+        for path in [["s1", "s2", "s3", "s4"], ["s1", "s5", "s6", "s7", "s4"]]:
+            for src, dst in zip(path, path[1:]):
+                self._link(src, dst)
+
+    def _link(self, src, dst, **attrs):
+        self.cache.add_edge(src, dst, attr_dict=attrs)
+        self.cache.add_edge(dst, src, attr_dict=attrs)
+
+    def _unlink(self, src, dst):
+        self.cache.remove_edge(src, dst)
+        self.cache.remove_edge(dst, src)
+
+    def testCacheHit(self):
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def testRemoveLink(self):
+        self.cache.shortest_path("s1", "s4")
+        self.cache.shortest_path("s5", "s6")
+        self._unlink("s2", "s3")
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s5", "s6", "s7", "s4"])
+        # a path that did not use the removed link stays cached
+        self.cache.shortest_path("s5", "s6")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def testRemoveParallelLink(self):
+        self._link("s2", "s3")
+        self.cache.shortest_path("s1", "s4")
+        # one of the two parallel links is left, the path is still valid
+        self._unlink("s2", "s3")
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        self._unlink("s2", "s3")
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s5", "s6", "s7", "s4"])
+
+    def testAddLink(self):
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        self._link("s1", "s4")
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s4"])
+
+    def testAddSwitch(self):
+        self.cache.shortest_path("s1", "s4")
+        self.cache.add_switch("s8")
+        self._link("s1", "s8")
+        self._link("s8", "s4")
+        path = self.cache.shortest_path("s1", "s4")
+        self.assertEqual(path, ["s1", "s8", "s4"])
+
+    def testRemoveSwitch(self):
+        self.cache.shortest_path("s1", "s4")
+        self.cache.remove_switch("s3")
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s5", "s6", "s7", "s4"])
+        self.assertEqual(self.cache.stats()["switches"], 6)
+
+    def testWeightedPaths(self):
+        self._unlink("s2", "s3")
+        self._link("s2", "s3", delay=10)
+        self.assertEqual(self.cache.shortest_path("s1", "s4", weight="delay"), ["s1", "s5", "s6", "s7", "s4"])
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        # a cheaper parallel link only changes the weighted path
+        self._link("s2", "s3", delay=0.5)
+        self.assertEqual(self.cache.shortest_path("s1", "s4", weight="delay"), ["s1", "s2", "s3", "s4"])
+        self.assertEqual(self.cache.shortest_path("s1", "s4"), ["s1", "s2", "s3", "s4"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
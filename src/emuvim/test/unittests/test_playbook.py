@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from emuvim.api.openstack.playbook import PlaybookWriter
+
+
+class testPlaybookWriter(unittest.TestCase):
+    """
+    Test the background writer of the request playbook.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "requests.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testRecordAndReset(self):
+        w = PlaybookWriter(self.path, flush_interval=10)
+        w.record("HeatDummyApi", "POST", '{"a": 1}', "http://localhost:18004/v1/x/stacks")
+        self.assertTrue(w.flush())
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "# HeatDummyApi API\n"
+                                       "curl -X POST -H \"Content-type: application/json\" "
+                                       "-d '{\"a\": 1}' http://localhost:18004/v1/x/stacks\n")
+        w.reset()
+        w.record("CHAIN", "PUT", "{}", "http://localhost:4000/v1/chain")
+        w.close()
+        with open(self.path) as f:
+            self.assertEqual(f.read().splitlines()[0], "# CHAIN API")
+        self.assertEqual(w.written, 2)
+
+    def testDisabled(self):
+        w = PlaybookWriter(self.path, enabled=False)
+        w.record("HeatDummyApi", "POST", "{}", "http://localhost")
+        w.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def testRotation(self):
+        w = PlaybookWriter(self.path, flush_interval=10, max_bytes=100, backup_count=2)
+        for i in range(3):
+            w.record("NovaDummyApi", "POST", '{"server": %d}' % i, "http://localhost:18774")
+            w.flush()
+        w.close()
+        self.assertTrue(os.path.exists(self.path + ".1"))
+        self.assertTrue(os.path.exists(self.path + ".2"))
+        self.assertFalse(os.path.exists(self.path + ".3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import json
+import unittest
+from emuvim.api.openstack.compute import OpenstackCompute
+from emuvim.api.openstack.resource_index import ResourceIndex
+from emuvim.api.openstack.resources.image import Image
+from emuvim.api.openstack.resources.server import Server
+from emuvim.api.openstack.openstack_dummies.heat_dummy_api import HeatDummyApi
+from emuvim.api.openstack.openstack_dummies.neutron_dummy_api import NeutronDummyApi
+from emuvim.api.openstack.openstack_dummies.nova_dummy_api import NovaDummyApi
+from emuvim.test.unittests.test_heat_concurrency import _Datacenter
+import emuvim.api.openstack.ip_handler as IP
+
+
+class _Resource(object):
+
+    def __init__(self, id, name, template_name=None):
+        self.id = id
+        self.name = name
+        self.template_name = template_name
+
+
+class testResourceIndex(unittest.TestCase):
+    """
+    Test the secondary indexes of the ResourceIndex dictionary.
+    """
+
+    def setUp(self):
+        self.index = ResourceIndex('name', 'template_name')
+        self.a = _Resource("id-a", "a", "tmpl")
+        self.b = _Resource("id-b", "b", "tmpl")
+        self.index["id-a"] = self.a
+        self.index["id-b"] = self.b
+
+    def testFind(self):
+        self.assertIs(self.index.find("a"), self.a)
+        self.assertIs(self.index.find("b"), self.b)
+        self.assertIn(self.index.find("tmpl"), [self.a, self.b])
+        self.assertIs(self.index.find("a", attrs=['name']), self.a)
+        self.assertIsNone(self.index.find("a", attrs=['template_name']))
+        self.assertIsNone(self.index.find("id-a"))
+        self.assertIsNone(self.index.find("c"))
+
+    def testRename(self):
+        self.a.name = "c"
+        # a changed attribute is not found by its old value, not even before the reindex
+        self.assertIsNone(self.index.find("a"))
+        self.index.reindex("id-a")
+        self.assertIs(self.index.find("c"), self.a)
+        self.assertIsNone(self.index.find("a"))
+        # a new resource may use the old name
+        d = _Resource("id-d", "a")
+        self.index["id-d"] = d
+        self.assertIs(self.index.find("a"), d)
+        self.index.reindex("unknown")
+
+    def testReplace(self):
+        c = _Resource("id-a", "c")
+        self.index["id-a"] = c
+        self.assertIsNone(self.index.find("a"))
+        self.assertIs(self.index.find("c"), c)
+        self.assertIs(self.index.find("tmpl"), self.b)
+
+    def testDelete(self):
+        del self.index["id-a"]
+        self.assertIsNone(self.index.find("a"))
+        self.assertIs(self.index.find("tmpl"), self.b)
+        self.assertIs(self.index.pop("id-b"), self.b)
+        self.assertIsNone(self.index.pop("id-b", None))
+        self.assertIsNone(self.index.find("tmpl"))
+        self.assertEqual(self.index._indexes, {'name': {}, 'template_name': {}})
+        self.assertEqual(self.index._indexed, {})
+
+    def testDictMethods(self):
+        key, resource = self.index.popitem()
+        self.assertIsNone(self.index.find(resource.name))
+        self.index.update({"id-c": _Resource("id-c", "c")})
+        self.assertEqual(self.index.find("c").id, "id-c")
+        self.assertIs(self.index.setdefault("id-c"), self.index["id-c"])
+        self.index.clear()
+        self.assertIsNone(self.index.find("c"))
+        self.assertEqual(self.index._indexed, {})
+
+    def testUnhashable(self):
+        self.index["id-l"] = _Resource("id-l", ["l"])
+        self.assertIs(self.index.find("b"), self.b)
+        del self.index["id-l"]
+
+
+def _stack_template(name, server_name="vnf"):
+    return {"stack_name": name, "template": {
+        "heat_template_version": "2015-04-30",
+        "resources": {
+            "vnf": {"type": "OS::Nova::Server",
+                    "properties": {"name": server_name, "image": "ubuntu:trusty", "flavor": "m1.tiny",
+                                   "networks": [{"port": {"get_resource": "port1"}},
+                                                {"port": {"get_resource": "port2"}}]}},
+            "port1": {"type": "OS::Neutron::Port",
+                      "properties": {"name": "port1", "network": {"get_resource": "net"}}},
+            "port2": {"type": "OS::Neutron::Port",
+                      "properties": {"name": "port2", "network": {"get_resource": "net"}}},
+            "net": {"type": "OS::Neutron::Net", "properties": {"name": "net"}},
+            "subnet": {"type": "OS::Neutron::Subnet",
+                       "properties": {"name": "subnet", "network": {"get_resource": "net"}}}
+        }}}
+
+
+class _ImageCatalog(object):
+
+    def __init__(self, *names):
+        self.images = dict((name, Image(name)) for name in names)
+
+
+class testComputeLookup(unittest.TestCase):
+    """
+    Test the find_*_by_name_or_id lookups of OpenstackCompute after the dummy APIs renamed or deleted
+    resources.
+    """
+
+    def setUp(self):
+        self.compute = OpenstackCompute()
+        self.compute.dc = _Datacenter()
+        self.compute.image_catalog = _ImageCatalog("ubuntu:trusty")
+        self.compute.add_flavor("m1.tiny", 1, 512, "MB", 1, "GB")
+        self.heat = HeatDummyApi("127.0.0.1", 0, self.compute).app.test_client()
+        self.neutron = NeutronDummyApi("127.0.0.1", 0, self.compute).app.test_client()
+        self.nova = NovaDummyApi("127.0.0.1", 0, self.compute).app.test_client()
+
+    def tearDown(self):
+        for stack in self.compute.stacks.values():
+            for net in stack.nets.values():
+                IP.free_cidr(net.get_cidr(), net.subnet_id)
+
+    def _create_stack(self, name, server_name="vnf"):
+        r = self.heat.post("/v1/tenant/stacks", data=json.dumps(_stack_template(name, server_name)))
+        self.assertEqual(r.status_code, 201)
+        return json.loads(r.data)["stack"]["id"]
+
+    def testHeatServer(self):
+        stack_id = self._create_stack("stack1", server_name="server-with-long-name")
+        # the heat parser names the server after it was stored
+        server = self.compute.find_server_by_name_or_id("server-with-long-name")
+        self.assertIsNotNone(server)
+        self.assertIs(self.compute.find_server_by_name_or_id(server.name), server)
+        self.assertIs(self.compute.find_server_by_name_or_id("dc1_stack1_server-with-long-name"), server)
+        self.assertIs(self.compute.find_server_by_name_or_id(server.id), server)
+        self.assertEqual(self.heat.delete("/v1/tenant/stacks/%s" % stack_id).status_code, 204)
+        self.assertIsNone(self.compute.find_server_by_name_or_id("server-with-long-name"))
+        self.assertIsNone(self.compute.find_server_by_name_or_id("dc1_stack1_server-with-long-name"))
+        self.assertIsNone(self.compute.find_server_by_name_or_id(server.name))
+
+    def testHeatUpdate(self):
+        stack_id = self._create_stack("stack1", server_name="vnf")
+        old = self.compute.find_server_by_name_or_id("vnf")
+        r = self.heat.put("/v1/tenant/stacks/stack1/%s" % stack_id,
+                          data=json.dumps(_stack_template("stack1", server_name="vnf2")))
+        self.assertEqual(r.status_code, 202)
+        server = self.compute.find_server_by_name_or_id("vnf2")
+        self.assertIsNotNone(server)
+        self.assertIs(self.compute.find_server_by_name_or_id("dc1_stack1_vnf2"), server)
+        self.assertIsNone(self.compute.find_server_by_name_or_id("vnf"))
+        self.assertIsNone(self.compute.find_server_by_name_or_id("dc1_stack1_vnf"))
+        self.assertNotIn(old.id, self.compute.computeUnits)
+
+    def testNovaServer(self):
+        r = self.nova.post("/v2.1/tenant/servers", data=json.dumps({"server": {
+            "name": "server-with-long-name", "imageRef": self.compute.images["ubuntu:trusty"].id,
+            "flavorRef": self.compute.flavors["m1.tiny"].id}}))
+        self.assertEqual(r.status_code, 200)
+        server = self.compute.find_server_by_name_or_id(json.loads(r.data)["server"]["id"])
+        self.assertIsNotNone(server)
+        self.assertIs(self.compute.find_server_by_name_or_id("server-with-long-name"), server)
+        self.assertIs(self.compute.find_server_by_name_or_id("dc1_man_server-with-long-name"), server)
+        self.assertIs(self.compute.find_server_by_name_or_id(server.name), server)
+        # the name is shortened, the full name is still known
+        r = self.nova.post("/v2.1/tenant/servers", data=json.dumps({"server": {"name": "server-with-long-name"}}))
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(self.nova.delete("/v2.1/tenant/servers/%s" % server.id).status_code, 204)
+        self.assertIsNone(self.compute.find_server_by_name_or_id("server-with-long-name"))
+        self.assertIsNone(self.compute.find_server_by_name_or_id("dc1_man_server-with-long-name"))
+
+    def testShortNameKey(self):
+        # the key of a server is its id, which may equal the shortened form of another name
+        server = Server("short")
+        server.id = "long-name"[-9:]
+        self.compute.computeUnits[server.id] = server
+        self.assertIs(self.compute.find_server_by_name_or_id("a-very-long-name"), server)
+        self.assertIs(self.compute.find_server_by_name_or_id("short"), server)
+        self.assertIsNone(self.compute.find_server_by_name_or_id("other"))
+
+    def testNetworkRename(self):
+        net = self.compute.create_network("net1")
+        r = self.neutron.put("/v2.0/networks/%s" % net.id, data=json.dumps({"network": {"name": "net2"}}))
+        self.assertEqual(r.status_code, 200)
+        self.assertIs(self.compute.find_network_by_name_or_id("net2"), net)
+        self.assertIsNone(self.compute.find_network_by_name_or_id("net1"))
+        # the old name is free again
+        self.assertIsNot(self.compute.create_network("net1"), net)
+        self.compute.delete_network("net2")
+        self.assertIsNone(self.compute.find_network_by_name_or_id("net2"))
+        self.assertIsNone(self.compute.find_network_by_name_or_id(net.id))
+
+    def testStackPortRename(self):
+        self._create_stack("stack1")
+        port1 = self.compute.find_port_by_name_or_id("port1")
+        port2 = self.compute.find_port_by_name_or_id("port2")
+        self.assertIsNot(port1, port2)
+        r = self.neutron.put("/v2.0/ports/%s" % port1.id, data=json.dumps({"port": {"name": "renamed"}}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(port1.name, "renamed")
+        self.assertEqual(port2.name, "port2")
+        self.assertIs(self.compute.find_port_by_name_or_id("renamed"), port1)
+        self.assertIs(self.compute.find_port_by_name_or_id("port2"), port2)
+        # the template name does not change
+        self.assertIs(self.compute.find_port_by_name_or_id("port1"), port1)
+        self.assertEqual(sorted(self.compute.stacks.values()[0].ports.keys()), ["port2", "renamed"])
+        r = self.neutron.put("/v2.0/ports/%s" % port2.id, data=json.dumps({"port": {"name": "renamed2"}}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual((port1.name, port2.name), ("renamed", "renamed2"))
+        self.assertIs(self.compute.find_port_by_name_or_id("renamed2"), port2)
+        self.assertIs(self.compute.find_port_by_name_or_id("renamed"), port1)
+        self.assertEqual(self.neutron.delete("/v2.0/ports/%s" % port1.id).status_code, 204)
+        self.assertIsNone(self.compute.find_port_by_name_or_id("renamed"))
+        self.assertIsNone(self.compute.find_port_by_name_or_id("port1"))
+
+    def testPortPairRename(self):
+        ingress = self.compute.create_port("in")
+        egress = self.compute.create_port("out")
+        r = self.neutron.post("/v2.0/sfc/port_pairs", data=json.dumps(
+            {"port_pair": {"name": "pp1", "ingress": ingress.id, "egress": egress.id}}))
+        self.assertEqual(r.status_code, 201)
+        pair_id = json.loads(r.data)["port_pair"]["id"]
+        r = self.neutron.put("/v2.0/sfc/port_pairs/%s" % pair_id, data=json.dumps({"port_pair": {"name": "pp2"}}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.compute.find_port_pair_by_name_or_id("pp2").id, pair_id)
+        self.assertIsNone(self.compute.find_port_pair_by_name_or_id("pp1"))
+        self.assertEqual(self.neutron.delete("/v2.0/sfc/port_pairs/%s" % pair_id).status_code, 204)
+        self.assertIsNone(self.compute.find_port_pair_by_name_or_id("pp2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from emuvim.dcemulator.resourcemodel.resourcelog import ResourceLogWriter, ResourceLogReader
+
+
+def _state(alloc_cu, allocations):
+    return {"dc_max_cu": 32, "dc_alloc_cu": alloc_cu,
+            "allocation_state": dict((name, {"cpu_quota": quota}) for name, quota in allocations.items())}
+
+
+class testResourceLog(unittest.TestCase):
+    """
+    Test the delta-based resource model log and its reader.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "rm.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def testDeltasAndStateAt(self):
+        w = ResourceLogWriter(self.path, snapshot_every=3, snapshot_interval=1000)
+        states = [_state(1, {"vnf1": 100}),
+                  _state(2, {"vnf1": 50, "vnf2": 50}),
+                  _state(1, {"vnf2": 100}),
+                  _state(2, {"vnf2": 50, "vnf3": 50}),
+                  _state(3, {"vnf2": 33, "vnf3": 33, "vnf4": 33})]
+        for i, s in enumerate(states):
+            w.write("dc1", "allocate", "vnf%d" % i, {"name": "vnf%d" % i}, s, t=float(i))
+        w.close()
+
+        with open(self.path) as f:
+            lines = [json.loads(l) for l in f]
+        self.assertEqual([l["type"] for l in lines], ["snapshot", "delta", "delta", "delta", "snapshot"])
+        self.assertEqual(lines[2]["rm_delta"], {"set": {"dc_alloc_cu": 1},
+                                                "alloc": {"vnf2": {"cpu_quota": 100}},
+                                                "dealloc": ["vnf1"]})
+        r = ResourceLogReader(self.path)
+        for i, s in enumerate(states):
+            self.assertEqual(r.state_at(i + 0.5), {"dc1": s})
+        self.assertEqual(r.state_at(), {"dc1": states[-1]})
+        self.assertEqual(r.state_at(-1), {})
+
+    def testFlushInterval(self):
+        w = ResourceLogWriter(self.path, flush_batch=100, flush_interval=0.2)
+        w.write("dc1", "allocate", "vnf1", {"name": "vnf1"}, _state(1, {"vnf1": 100}))
+        # a single event is written without waiting for further events
+        deadline = time.time() + 2.0
+        while time.time() < deadline and not ResourceLogReader(self.path).state_at():
+            time.sleep(0.05)
+        self.assertEqual(ResourceLogReader(self.path).state_at(), {"dc1": _state(1, {"vnf1": 100})})
+        w.close()
+
+    def testLegacyFormat(self):
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"t": 1.0, "action": "allocate", "container_state": {},
+                                "rm_state": _state(1, {"vnf1": 100})}) + "\n")
+        self.assertEqual(ResourceLogReader(self.path).state_at(), {None: _state(1, {"vnf1": 100})})
+
+
+if __name__ == '__main__':
+    unittest.main()
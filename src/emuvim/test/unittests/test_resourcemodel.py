@@ -247,6 +247,30 @@ class testUpbSimpleCloudDcRM(SimpleTestTopology):
         rm.free(c1)
         self.assertTrue(rm.dc_alloc_cu == 0)
 
+    def testIncrementalLimitUpdates(self):
+        """
+        Test that only containers with changed limits are updated.
+        :return:
+        """
+        reg = ResourceModelRegistrar(dc_emulation_max_cpu=1.0, dc_emulation_max_mem=512)
+        rm = UpbSimpleCloudDcRM(max_cu=100, max_mu=2048)
+        reg.register("test_dc", rm)
+        c1 = createDummyContainerObject("c1", flavor="small")
+        rm.allocate(c1)
+        # the share of a CU does not change, so c1 should not be touched anymore
+        c1.resources['cpu_quota'] = -1
+        c2 = createDummyContainerObject("c2", flavor="small")
+        rm.allocate(c2)
+        self.assertEqual(c1.resources['cpu_quota'], -1)
+        self.assertEqual(float(c2.resources['cpu_quota']) / c2.resources['cpu_period'], 1.0 / 100)
+        # a new resource model changes the share of a CU, all containers are updated
+        reg.register("test_dc2", UpbSimpleCloudDcRM(max_cu=100, max_mu=2048))
+        self.assertEqual(reg.sum_max_cu, 200)
+        c3 = createDummyContainerObject("c3", flavor="small")
+        rm.allocate(c3)
+        for c in [c1, c2, c3]:
+            self.assertEqual(float(c.resources['cpu_quota']) / c.resources['cpu_period'], 1.0 / 200)
+
     @unittest.skipIf(os.environ.get("SON_EMU_IN_DOCKER") is not None,
                      "skipping test when running inside Docker container")
     def testInRealTopo(self):
@@ -0,0 +1,104 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.api.openstack.resources import Net, Port, Server, Stack
+from emuvim.api.openstack.stack_diff import StackDiff, ADD, REMOVE, MODIFY, UNCHANGED
+
+
+def _stack(servers, ports):
+    """
+    :param servers: server name -> (image, [port names])
+    :param ports: port name -> (net name, ip address)
+    """
+    stack = Stack()
+    for net_name in set(net_name for net_name, ip in ports.values()):
+        stack.add_net(Net(net_name))
+    for name, (net_name, ip) in ports.items():
+        port = Port(name)
+        port.net_name = net_name
+        port.ip_address = ip
+        stack.add_port(port)
+    for name, (image, port_names) in servers.items():
+        server = Server(name, image=image, command="/bin/sh")
+        server.port_names = list(port_names)
+        stack.add_server(server)
+    return stack
+
+
+class testStackDiff(unittest.TestCase):
+    """
+    Test the plan that OpenstackCompute.update_stack executes.
+    """
+
+    def setUp(self):
+        self.old = _stack({"a": ("img", ["pa"]), "b": ("img", ["pb"]), "c": ("img", ["pc"])},
+                          {"pa": ("n1", "10.0.0.2/24"), "pb": ("n1", "10.0.0.3/24"), "pc": ("n1", "10.0.0.4/24")})
+
+    def testNoChanges(self):
+        new = _stack({"a": ("img", ["pa"]), "b": ("img", ["pb"]), "c": ("img", ["pc"])},
+                     {"pa": ("n1", "10.0.0.2/24"), "pb": ("n1", "10.0.0.3/24"), "pc": ("n1", "10.0.0.4/24")})
+        diff = StackDiff(self.old, new)
+        self.assertTrue(diff.is_empty())
+        self.assertEqual(diff.servers_to_stop(), [])
+        self.assertEqual(diff.servers_to_start(), [])
+        self.assertEqual(diff.servers[UNCHANGED], ["a", "b", "c"])
+        self.assertEqual(diff.operations(), [])
+
+    def testScaleOut(self):
+        # adding a VNF must not touch the running ones
+        new = _stack({"a": ("img", ["pa"]), "b": ("img", ["pb"]), "c": ("img", ["pc"]), "d": ("img", ["pd"])},
+                     {"pa": ("n1", "10.0.0.2/24"), "pb": ("n1", "10.0.0.3/24"), "pc": ("n1", "10.0.0.4/24"),
+                      "pd": ("n1", "10.0.0.5/24")})
+        diff = StackDiff(self.old, new)
+        self.assertEqual(diff.servers[ADD], ["d"])
+        self.assertEqual(diff.ports[ADD], ["pd"])
+        self.assertEqual(diff.servers_to_stop(), [])
+        self.assertEqual([s.name for s in diff.servers_to_start()], ["d"])
+        self.assertEqual(diff.relinks, {})
+
+    def testModifyRemoveRelink(self):
+        # a: new image -> restart, b: removed, c: port moved to another net -> relink only
+        new = _stack({"a": ("img:v2", ["pa"]), "c": ("img", ["pc", "pc2"])},
+                     {"pa": ("n1", "10.0.0.2/24"), "pc": ("n2", "10.0.1.2/24"), "pc2": ("n2", "10.0.1.3/24")})
+        diff = StackDiff(self.old, new)
+        self.assertEqual(diff.servers[MODIFY], ["a"])
+        self.assertEqual(diff.servers[REMOVE], ["b"])
+        self.assertEqual(diff.servers[UNCHANGED], ["c"])
+        self.assertEqual(sorted(s.name for s in diff.servers_to_stop()), ["a", "b"])
+        self.assertEqual([s.name for s in diff.servers_to_start()], ["a"])
+        self.assertEqual(diff.relinks, {"c": (["pc"], ["pc", "pc2"])})
+        self.assertEqual(diff.nets[ADD], ["n2"])
+        self.assertEqual(diff.ports[REMOVE], ["pb"])
+        report = diff.report()
+        self.assertEqual(report["servers"]["modified"], ["a"])
+        self.assertEqual(report["relinked"], ["c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import uuid
+from emuvim.api.openstack.compute import OpenstackCompute
+from emuvim.api.openstack.resources import Net, Port, Server, Stack
+import emuvim.api.openstack.ip_handler as IP
+
+
+class _Container(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.intfs = dict()
+        self.dcinfo = dict()
+
+
+class _Net(object):
+
+    def __init__(self):
+        self.links = list()
+
+
+class _Datacenter(object):
+    """
+    Records the started and stopped containers instead of running them.
+    """
+
+    def __init__(self):
+        self.label = "dc1"
+        self.net = _Net()
+        self.containers = dict()
+        self.started = list()
+        self.stopped = list()
+
+    def startCompute(self, name, **kwargs):
+        self.started.append(name)
+        self.containers[name] = _Container(name)
+        return self.containers[name]
+
+    def stopCompute(self, name):
+        self.stopped.append(name)
+        self.containers.pop(name, None)
+
+
+def _stack(servers, ports):
+    """
+    :param servers: server name -> [port names]
+    :param ports: port name -> net name
+    """
+    stack = Stack()
+    for net_name in set(ports.values()):
+        net = Net(net_name)
+        net.id = str(uuid.uuid4())
+        net.subnet_name = net_name + "-subnet"
+        net.subnet_id = str(uuid.uuid4())
+        stack.add_net(net)
+    for name, net_name in ports.items():
+        port = Port(name)
+        port.net_name = net_name
+        stack.add_port(port)
+    for name, port_names in servers.items():
+        server = Server(name, image="ubuntu:trusty", command="/bin/sh")
+        server.port_names = list(port_names)
+        stack.add_server(server)
+    return stack
+
+
+class testStackUpdate(unittest.TestCase):
+    """
+    Test OpenstackCompute.update_stack with a datacenter that does not start real containers.
+    """
+
+    def setUp(self):
+        self.compute = OpenstackCompute()
+        self.compute.dc = _Datacenter()
+        self.old = _stack({"a": ["p1", "p2"], "b": ["p3"]}, {"p1": "n1", "p2": "n1", "p3": "n1"})
+        self.compute.update_ip_addresses(Stack(), self.old)
+        for port in self.old.ports.values():
+            port.create_intf_name()
+        self.compute.add_stack(self.old)
+        self.compute.deploy_stack(self.old.id)
+
+    def testRemoveServerAndPort(self):
+        new = _stack({"b": ["p3"]}, {"p3": "n1"})
+        self.assertTrue(self.compute.update_stack(self.old.id, new))
+        self.assertEqual(self.compute.dc.stopped, ["a"])
+        self.assertIsNone(self.compute.find_port_by_name_or_id("p1"))
+        self.assertIsNone(self.compute.find_port_by_name_or_id("p2"))
+        self.assertEqual(sorted(new.update_report["ports"]["removed"]), ["p1", "p2"])
+
+    def tearDown(self):
+        for stack in self.compute.stacks.values():
+            for net in stack.nets.values():
+                IP.free_cidr(net.get_cidr(), net.subnet_id)
+
+    def testRemovePort(self):
+        new = _stack({"a": ["p1"], "b": ["p3"]}, {"p1": "n1", "p3": "n1"})
+        self.assertTrue(self.compute.update_stack(self.old.id, new))
+        # the server keeps running, only the link of the removed port is removed
+        self.assertEqual(self.compute.dc.stopped, [])
+        self.assertEqual(sorted(self.compute.dc.started), ["a", "b"])
+        self.assertEqual(new.update_report["relinked"], ["a"])
+        self.assertIsNone(self.compute.find_port_by_name_or_id("p2"))
+        self.assertIsNotNone(self.compute.find_port_by_name_or_id("p1"))
+        self.assertEqual(self.compute.stacks.keys(), [new.id])
+        self.assertEqual(new.update_report["ports"]["removed"], ["p2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import socket
+import subprocess
+import time
+import unittest
+from emuvim.dcemulator.startup import StartupTimer, wait_for_port
+
+
+class testStartup(unittest.TestCase):
+    """
+    Test the readiness probes and the startup timer.
+    """
+
+    def testWaitForPort(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("127.0.0.1", 0))
+        s.listen(1)
+        port = s.getsockname()[1]
+        try:
+            self.assertTrue(wait_for_port("0.0.0.0", port, timeout=1))
+        finally:
+            s.close()
+        start = time.time()
+        self.assertFalse(wait_for_port("127.0.0.1", port, timeout=0.3))
+        self.assertLess(time.time() - start, 1.0)
+
+    def testWaitForDeadProcess(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+        s.close()
+        p = subprocess.Popen(["true"])
+        p.wait()
+        start = time.time()
+        self.assertFalse(wait_for_port("127.0.0.1", port, timeout=10, process=p))
+        self.assertLess(time.time() - start, 1.0)
+
+    def testTimer(self):
+        t = StartupTimer("test")
+        with t.phase("a"):
+            time.sleep(0.01)
+        t.begin("b")
+        report = t.report()
+        self.assertGreater(report["a"]["duration"], 0)
+        self.assertIsNone(report["b"]["duration"])
+        self.assertIn("b=running", str(t))
+        t.end("b")
+        self.assertGreaterEqual(t.report()["total"]["duration"], report["a"]["duration"])
+
+
+if __name__ == '__main__':
+    unittest.main()
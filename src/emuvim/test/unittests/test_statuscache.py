@@ -0,0 +1,206 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import json
+import threading
+import time
+import unittest
+from flask import Flask
+from flask_restful import Api
+from emuvim.dcemulator.statuscache import ContainerStatusCache
+import emuvim.api.rest.compute as rest_compute
+
+
+class _DockerClient(object):
+    """
+    Answers inspect_container with a counter, so that each inspect result can be told apart.
+    """
+
+    def __init__(self):
+        self.inspects = 0
+        # called during an inspect, before the result is returned
+        self.on_inspect = None
+
+    def inspect_container(self, container):
+        self.inspects += 1
+        info = {"Id": str(container), "State": {"Running": True}, "inspect": self.inspects}
+        if self.on_inspect is not None:
+            self.on_inspect()
+        return info
+
+
+class _StatusCache(ContainerStatusCache):
+    """
+    Status cache without the docker event watcher, events are simulated by calling invalidate().
+    """
+
+    def _start_watcher(self):
+        pass
+
+
+class testContainerStatusCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = _StatusCache(max_age=60)
+        self.dcli = _DockerClient()
+
+    def testSnapshot(self):
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 1)
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 1)
+        # containers are identified by their id, also if given as the dict of create_container
+        self.assertEqual(self.cache.inspect(self.dcli, {"Id": "c1"})["inspect"], 1)
+        self.assertEqual(self.cache.inspect(self.dcli, "c2")["inspect"], 2)
+        self.assertEqual(self.cache.stats(), {"containers": 2, "hits": 2, "misses": 2})
+
+    def testMaxAge(self):
+        self.cache.inspect(self.dcli, "c1")
+        # 0 = always inspect
+        self.assertEqual(self.cache.inspect(self.dcli, "c1", max_age=0)["inspect"], 2)
+        self.assertEqual(self.cache.inspect(self.dcli, "c1", max_age=10)["inspect"], 2)
+        # the snapshot is outdated
+        self.cache._snapshots["c1"] = (time.time() - 20, self.cache._snapshots["c1"][1])
+        self.assertEqual(self.cache.inspect(self.dcli, "c1", max_age=10)["inspect"], 3)
+        self.cache._snapshots["c1"] = (time.time() - 61, self.cache._snapshots["c1"][1])
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 4)
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 4)
+
+    def testInvalidate(self):
+        self.cache.inspect(self.dcli, "c1")
+        self.cache.inspect(self.dcli, "c2")
+        self.cache.invalidate({"Id": "c1"})
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 3)
+        self.assertEqual(self.cache.inspect(self.dcli, "c2")["inspect"], 2)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()["containers"], 0)
+        self.assertEqual(self.cache.inspect(self.dcli, "c2")["inspect"], 4)
+        # unknown containers can be invalidated as well
+        self.cache.invalidate("c3")
+
+    def testInvalidateDuringInspect(self):
+        # a docker event arrives while the container is inspected, the result might be outdated already
+        self.dcli.on_inspect = lambda: self.cache.invalidate("c1")
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 1)
+        self.dcli.on_inspect = None
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 2)
+        self.assertEqual(self.cache.inspect(self.dcli, "c1")["inspect"], 2)
+        self.dcli.on_inspect = lambda: self.cache.invalidate()
+        self.assertEqual(self.cache.inspect(self.dcli, "c2")["inspect"], 3)
+        self.dcli.on_inspect = None
+        self.assertEqual(self.cache.inspect(self.dcli, "c2")["inspect"], 4)
+
+    def testInvalidateParallel(self):
+        # the inspect of one thread is still running when another thread sees the event
+        inspecting = threading.Event()
+        invalidated = threading.Event()
+
+        def slow_inspect():
+            inspecting.set()
+            invalidated.wait(5)
+
+        def watcher():
+            inspecting.wait(5)
+            self.cache.invalidate("c1")
+            invalidated.set()
+
+        self.dcli.on_inspect = slow_inspect
+        t = threading.Thread(target=watcher)
+        t.start()
+        self.cache.inspect(self.dcli, "c1")
+        t.join()
+        self.assertTrue(invalidated.is_set())
+        self.assertNotIn("c1", self.cache._snapshots)
+
+
+class _Container(object):
+
+    def __init__(self, name, cache, dcli):
+        self.name = name
+        self.cache = cache
+        self.dcli = dcli
+        self.max_ages = list()
+
+    def getStatus(self, max_age=None):
+        self.max_ages.append(max_age)
+        return {"name": self.name, "inspect": self.cache.inspect(self.dcli, self.name, max_age=max_age)["inspect"]}
+
+
+class _Datacenter(object):
+
+    def __init__(self, label, containers):
+        self.label = label
+        self.containers = dict((c.name, c) for c in containers)
+
+    def listCompute(self):
+        return self.containers.values()
+
+    def listExtSAPs(self):
+        return list()
+
+
+class testComputeStatusApi(unittest.TestCase):
+    """
+    Test the max_age parameter of the compute status requests.
+    """
+
+    def setUp(self):
+        self.cache = _StatusCache(max_age=60)
+        self.dcli = _DockerClient()
+        self.vnf1 = _Container("vnf1", self.cache, self.dcli)
+        self._dcs = dict(rest_compute.dcs)
+        rest_compute.dcs.clear()
+        rest_compute.dcs["dc1"] = _Datacenter("dc1", [self.vnf1])
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(rest_compute.Compute, "/restapi/compute/<dc_label>/<compute_name>")
+        api.add_resource(rest_compute.ComputeList, "/restapi/compute", "/restapi/compute/<dc_label>")
+        self.client = app.test_client()
+
+    def tearDown(self):
+        rest_compute.dcs.clear()
+        rest_compute.dcs.update(self._dcs)
+
+    def _get(self, url):
+        r = self.client.get(url)
+        return r.status_code, json.loads(r.data)
+
+    def testStatus(self):
+        self.assertEqual(self._get("/restapi/compute/dc1/vnf1"), (200, {"name": "vnf1", "inspect": 1}))
+        self.assertEqual(self._get("/restapi/compute/dc1/vnf1"), (200, {"name": "vnf1", "inspect": 1}))
+        self.assertEqual(self._get("/restapi/compute/dc1/vnf1?max_age=0"), (200, {"name": "vnf1", "inspect": 2}))
+        self.assertEqual(self._get("/restapi/compute/dc1/vnf1?max_age=0.5")[0], 200)
+        self.assertEqual(self.vnf1.max_ages, [None, None, 0.0, 0.5])
+        self.assertEqual(self._get("/restapi/compute/dc1/vnf1?max_age=old")[0], 500)
+
+    def testList(self):
+        self.assertEqual(self._get("/restapi/compute/dc1"), (200, [["vnf1", {"name": "vnf1", "inspect": 1}]]))
+        self.assertEqual(self._get("/restapi/compute?max_age=0"), (200, [["vnf1", {"name": "vnf1", "inspect": 2}]]))
+        self.assertEqual(self._get("/restapi/compute/dc1?max_age=10"), (200, [["vnf1", {"name": "vnf1", "inspect": 2}]]))
+        self.assertEqual(self.vnf1.max_ages, [None, 0.0, 10.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.topologyjournal import TopologyJournal
+
+
+class testTopologyJournal(unittest.TestCase):
+    """
+    Test the topology version and the delta computation used by the topology REST endpoints.
+    """
+
+    def testChangesSince(self):
+        j = TopologyJournal()
+        j.node_added("s1", "switch")
+        j.node_added("vnf1", "docker")
+        j.edge_added("vnf1", "s1", "docker", "switch")
+        self.assertEqual(j.version, 3)
+        c = j.changes_since(1)
+        self.assertEqual(c["version"], 3)
+        self.assertEqual(c["nodes"]["added"], [("vnf1", "docker")])
+        self.assertEqual(c["edges"]["added"], [("vnf1", "s1", "docker", "switch")])
+        # added and removed again: not part of the delta
+        j.node_added("vnf2", "docker")
+        j.node_removed("vnf2", "docker")
+        j.edge_removed("vnf1", "s1", "docker", "switch")
+        j.node_removed("vnf1", "docker")
+        c = j.changes_since(1)
+        self.assertEqual(c["nodes"], {"added": [], "removed": []})
+        self.assertEqual(c["edges"], {"added": [], "removed": []})
+        c = j.changes_since(3)
+        self.assertEqual(c["nodes"]["removed"], [("vnf1", "docker")])
+        self.assertEqual(c["edges"]["removed"], [("vnf1", "s1", "docker", "switch")])
+        # unknown versions need a full snapshot
+        self.assertIsNone(j.changes_since(j.version + 1))
+
+    def testTruncatedLog(self):
+        j = TopologyJournal(max_changes=2)
+        for i in range(4):
+            j.node_added("s%d" % i, "switch")
+        self.assertIsNone(j.changes_since(1))
+        self.assertEqual(j.changes_since(2)["nodes"]["added"], [("s2", "switch"), ("s3", "switch")])
+
+    def testViewCache(self):
+        j = TopologyJournal()
+        builds = list()
+
+        def build():
+            builds.append(j.version)
+            return "view-%d" % j.version
+
+        self.assertEqual(j.view("v", build), (0, "view-0"))
+        self.assertEqual(j.view("v", build), (0, "view-0"))
+        j.node_added("s1", "switch")
+        self.assertEqual(j.view("v", build), (1, "view-1"))
+        self.assertEqual(builds, [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
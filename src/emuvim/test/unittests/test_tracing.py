@@ -0,0 +1,184 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from flask import Flask
+from flask_restful import Api
+from emuvim.dcemulator.tracing import Tracer, TRACER
+import emuvim.api.rest.tracing as rest_tracing
+
+
+class testTracer(unittest.TestCase):
+    """
+    Test the recording of deployment traces and their spans.
+    """
+
+    def setUp(self):
+        self.tracer = Tracer(max_traces=3)
+
+    def testSpans(self):
+        with self.tracer.trace("service", "s1", instance="i1") as trace:
+            with self.tracer.span("placement"):
+                pass
+            with self.tracer.span("start", vnf_name="vnf1"):
+                with self.tracer.span("addDocker"):
+                    pass
+            try:
+                with self.tracer.span("setChain"):
+                    raise ValueError("no path")
+            except ValueError:
+                pass
+        t = self.tracer.get_trace(trace.id)
+        self.assertTrue(t["finished"])
+        self.assertEqual(t["attributes"], {"instance": "i1"})
+        # spans are recorded when they end
+        self.assertEqual([(s["name"], s["parent"]) for s in t["spans"]],
+                         [("placement", None), ("addDocker", "start"), ("start", None), ("setChain", None)])
+        self.assertEqual(t["spans"][2]["attributes"], {"vnf_name": "vnf1"})
+        self.assertEqual(t["spans"][3]["error"], "ValueError: no path")
+        self.assertIsNone(self.tracer.current())
+
+    def testNoActiveTrace(self):
+        with self.tracer.span("addDocker"):
+            pass
+        self.assertEqual(self.tracer.get_traces(), [])
+
+    def testError(self):
+        try:
+            with self.tracer.trace("stack", "stack1"):
+                raise Exception("failed")
+        except Exception:
+            pass
+        t = self.tracer.get_traces()[0]
+        self.assertTrue(t["finished"])
+        self.assertEqual(t["attributes"]["error"], "Exception: failed")
+
+    def testActivate(self):
+        with self.tracer.trace("service", "s1") as trace:
+            with self.tracer.span("start_vnfs"):
+
+                def worker(name):
+                    # spans of other threads are only recorded in an activated trace
+                    with self.tracer.span("lost"):
+                        pass
+                    with self.tracer.activate(trace):
+                        with self.tracer.span("addDocker", vnf_name=name):
+                            pass
+                    self.assertIsNone(self.tracer.current())
+
+                threads = [threading.Thread(target=worker, args=("vnf%d" % i,)) for i in range(4)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            # the worker threads do not change the active trace of this thread
+            self.assertIs(self.tracer.current(), trace)
+        spans = self.tracer.get_trace(trace.id)["spans"]
+        self.assertEqual(sorted(s["attributes"]["vnf_name"] for s in spans if s["name"] == "addDocker"),
+                         ["vnf0", "vnf1", "vnf2", "vnf3"])
+        # the spans of a worker start at the top level of the worker thread
+        self.assertEqual(set(s["parent"] for s in spans if s["name"] == "addDocker"), set([None]))
+        self.assertEqual([s["name"] for s in spans if s["name"] != "addDocker"], ["start_vnfs"])
+
+    def testNestedTrace(self):
+        with self.tracer.trace("service", "s1") as outer:
+            with self.tracer.trace("stack", "stack1") as inner:
+                with self.tracer.span("a"):
+                    pass
+            self.assertIs(self.tracer.current(), outer)
+            with self.tracer.span("b"):
+                pass
+        self.assertEqual([s["name"] for s in self.tracer.get_trace(inner.id)["spans"]], ["a"])
+        self.assertEqual([s["name"] for s in self.tracer.get_trace(outer.id)["spans"]], ["b"])
+
+    def testMaxTraces(self):
+        ids = list()
+        for i in range(5):
+            with self.tracer.trace("service", "s%d" % i) as trace:
+                ids.append(trace.id)
+        # the oldest traces are dropped
+        self.assertEqual([t["name"] for t in self.tracer.get_traces()], ["s2", "s3", "s4"])
+        self.assertIsNone(self.tracer.get_trace(ids[0]))
+        self.assertIsNotNone(self.tracer.get_trace(ids[4]))
+
+
+class testTraceExport(unittest.TestCase):
+    """
+    Test the REST export of the traces, which may only write to TRACE_EXPORT_DIR.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self._export_dir = rest_tracing.TRACE_EXPORT_DIR
+        rest_tracing.TRACE_EXPORT_DIR = os.path.join(self.tmp, "traces")
+        app = Flask(__name__)
+        api = Api(app)
+        api.add_resource(rest_tracing.TraceList, "/restapi/tracing")
+        api.add_resource(rest_tracing.TraceExport, "/restapi/tracing/export")
+        api.add_resource(rest_tracing.Trace, "/restapi/tracing/<trace_id>")
+        self.client = app.test_client()
+        with TRACER.trace("service", "export-test") as trace:
+            pass
+        self.trace_id = trace.id
+
+    def tearDown(self):
+        rest_tracing.TRACE_EXPORT_DIR = self._export_dir
+        shutil.rmtree(self.tmp)
+
+    def _export(self, **data):
+        return self.client.put("/restapi/tracing/export", data=json.dumps(data), content_type="application/json")
+
+    def testExport(self):
+        r = self._export(file="out.json", trace_id=self.trace_id)
+        self.assertEqual(r.status_code, 200)
+        with open(os.path.join(rest_tracing.TRACE_EXPORT_DIR, "out.json")) as f:
+            traces = json.load(f)["traces"]
+        self.assertEqual([t["id"] for t in traces], [self.trace_id])
+
+    def testInvalidFile(self):
+        for name in ["", "../out.json", "/tmp/out.json", "sub/out.json", "..\\out.json", ".hidden", ".."]:
+            self.assertEqual(self._export(file=name).status_code, 400, name)
+        self.assertEqual(self._export().status_code, 400)
+        self.assertEqual(self._export(file=["out.json"]).status_code, 400)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "out.json")))
+        self.assertFalse(os.path.exists(rest_tracing.TRACE_EXPORT_DIR))
+
+    def testGetTrace(self):
+        r = self.client.get("/restapi/tracing/%s" % self.trace_id)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(json.loads(r.data)["name"], "export-test")
+        self.assertEqual(self.client.get("/restapi/tracing/unknown").status_code, 404)
+        self.assertIn(self.trace_id, [t["id"] for t in json.loads(self.client.get("/restapi/tracing").data)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import socket
+import threading
+import time
+import unittest
+import urllib2
+from emuvim.api.openstack.wsgi_server import ApiServer
+from emuvim.dcemulator.startup import wait_for_port
+
+# seconds the slow requests take
+DELAY = 0.5
+
+
+def _app(environ, start_response):
+    path = environ["PATH_INFO"]
+    if path == "/slow":
+        time.sleep(DELAY)
+    elif path == "/shutdown":
+        environ["werkzeug.server.shutdown"]()
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [path]
+
+
+def _free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class testApiServer(unittest.TestCase):
+    """
+    Test the concurrent WSGI server of the OpenStack endpoints and the chain API.
+    """
+
+    def setUp(self):
+        self.port = _free_port()
+        self.server = None
+        self.thread = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.shutdown(timeout=2)
+
+    def _start(self, **kwargs):
+        self.server = ApiServer(_app, "127.0.0.1", self.port, shutdown_timeout=2, **kwargs)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.assertTrue(wait_for_port("127.0.0.1", self.port, timeout=5))
+
+    def _get(self, path):
+        return urllib2.urlopen("http://127.0.0.1:%d%s" % (self.port, path), timeout=5).read()
+
+    def _assertRebind(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("127.0.0.1", self.port))
+        finally:
+            s.close()
+
+    def testConcurrentRequests(self):
+        self._start(max_workers=16)
+        results = list()
+        clients = [threading.Thread(target=lambda: results.append(self._get("/slow"))) for _ in range(8)]
+        start = time.time()
+        for t in clients:
+            t.start()
+        # a slow request does not hold up the others
+        self.assertEqual(self._get("/fast"), "/fast")
+        self.assertLess(time.time() - start, DELAY)
+        for t in clients:
+            t.join(5)
+        # 8 slow requests at once take about as long as one
+        self.assertLess(time.time() - start, 4 * DELAY)
+        self.assertEqual(results, ["/slow"] * 8)
+
+    def testShutdown(self):
+        self._start()
+        self.assertEqual(self._get("/fast"), "/fast")
+        self.assertTrue(self.server.shutdown())
+        self.thread.join(2)
+        self.assertFalse(self.thread.is_alive())
+        self.assertRaises(urllib2.URLError, self._get, "/fast")
+        self._assertRebind()
+        # the port can be used by a new server right away
+        self._start()
+        self.assertEqual(self._get("/fast"), "/fast")
+
+    def testShutdownRequest(self):
+        self._start()
+        self.assertEqual(self._get("/shutdown"), "/shutdown")
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self._assertRebind()
+
+    def testShutdownBeforeStart(self):
+        server = ApiServer(_app, "127.0.0.1", self.port)
+        self.assertTrue(server.shutdown())
+        # serve_forever returns immediately
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    unittest.main()